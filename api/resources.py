@@ -0,0 +1,341 @@
+"""
+Read-only JSON resources.
+
+A Resource declares its fields once: where each value comes from, which
+columns it needs, the relations to join or prefetch for it, and the
+``updated_at`` columns its value depends on. Values from auth.User, which
+has no ``updated_at``, depend on their own columns instead. A request
+for ``?fields=`` then loads only what those fields need, and its ETag is
+a hash of the dependent version values, so api.views can answer
+If-None-Match from a query over those columns alone without building the
+response.
+"""
+from dataclasses import dataclass
+
+from django.db.models import Prefetch, Q
+
+from core.search import search_ids
+from courses.models import Course, CourseOffering, Enrollment
+from students.models import Student
+from teachers.models import Teacher
+
+
+class FieldError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Field:
+    """
+    One attribute of a resource. ``source`` is a ``__`` separated attribute
+    path, read from the instance unless ``get`` is given. ``columns`` are
+    the model fields to load (``source`` by default), ``related`` the
+    select_related paths, ``prefetch`` the prefetch_related lookups and
+    ``versions`` the extra columns the value depends on: ``updated_at``
+    of the related rows, or the columns themselves for models without one.
+    """
+    source: str = None
+    get: object = None
+    columns: tuple = None
+    related: tuple = ()
+    prefetch: tuple = ()
+    versions: tuple = ()
+
+    def get_columns(self):
+        if self.columns is not None:
+            return self.columns
+        return (self.source,)
+
+    def value(self, obj):
+        if self.get is not None:
+            return self.get(obj)
+        for attr in self.source.split('__'):
+            obj = getattr(obj, attr)
+            if obj is None:
+                break
+        return obj
+
+
+def _user_fields():
+    # auth.User has no updated_at
+    return {
+        name: Field(f'user__{name}', related=('user',), versions=(f'user__{name}',))
+        for name in ('first_name', 'last_name', 'email')
+    }
+
+
+def _department_field():
+    return Field('department__code', related=('department',), versions=('department__updated_at',))
+
+
+def _semester_fields(offering=None):
+    """``semester_id`` and ``semester`` of the offering, or of the offering on attribute ``offering``."""
+    prefix = f'{offering}__' if offering else ''
+
+    def label(obj):
+        semester = (getattr(obj, offering) if offering else obj).semester
+        return f"{semester.name} {semester.academic_year.year}"
+
+    return {
+        'semester_id': Field(f'{prefix}semester_id'),
+        'semester': Field(
+            get=label,
+            columns=(f'{prefix}semester__name', f'{prefix}semester__academic_year__year'),
+            related=(f'{prefix}semester__academic_year',),
+        ),
+    }
+
+
+def _bool(value):
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    if value.lower() in ('0', 'false', 'no'):
+        return False
+    raise FieldError(f"Expected true or false, got {value!r}.")
+
+
+class Resource:
+    """
+    Base class for the API's resources. Subclasses set ``model``,
+    ``fields`` and optionally ``filters`` (query parameter to ``(lookup,
+    converter)``) and ``search_kind``, and may narrow ``get_queryset()``
+    to what the user may see.
+    """
+    name = None
+    model = None
+    fields = {}
+    filters = {}
+    search_kind = None
+
+    def get_queryset(self, user):
+        return self.model.objects.all()
+
+    def select_fields(self, names=None):
+        """The requested field names, in declaration order; ``id`` is always included."""
+        if not names:
+            return list(self.fields)
+        names = set(names)
+        unknown = names - set(self.fields)
+        if unknown:
+            raise FieldError(
+                f"Unknown field(s): {', '.join(sorted(unknown))}. "
+                f"Available: {', '.join(self.fields)}."
+            )
+        return [name for name in self.fields if name == 'id' or name in names]
+
+    def filter(self, queryset, params):
+        for param, (lookup, convert) in self.filters.items():
+            if param in params:
+                try:
+                    value = convert(params[param])
+                except (TypeError, ValueError) as e:
+                    raise FieldError(f"Invalid {param}: {e}") from e
+                queryset = queryset.filter(**{lookup: value})
+        query = params.get('search', '').strip()
+        if query and self.search_kind:
+            queryset = queryset.filter(pk__in=search_ids(self.search_kind, query))
+        return queryset
+
+    def versions(self, names):
+        """The ``updated_at`` columns the representation of ``names`` depends on."""
+        versions = ['updated_at']
+        for name in names:
+            versions.extend(v for v in self.fields[name].versions if v not in versions)
+        return versions
+
+    def load(self, queryset, names):
+        """``queryset`` restricted to the columns and relations the fields need."""
+        columns, related, prefetch = ['pk'], [], []
+        for name in names:
+            f = self.fields[name]
+            columns.extend(f.get_columns())
+            related.extend(r for r in f.related if r not in related)
+            prefetch.extend(p for p in f.prefetch if p not in prefetch)
+        if related:
+            queryset = queryset.select_related(*related)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset.only(*columns)
+
+    def serialize(self, obj, names):
+        return {name: self.fields[name].value(obj) for name in names}
+
+
+class StudentResource(Resource):
+    name = 'students'
+    model = Student
+    search_kind = 'student'
+    fields = {
+        'id': Field('pk', columns=()),
+        'student_id': Field('student_id'),
+        **_user_fields(),
+        'department': _department_field(),
+        'admission_year': Field('admission_year__year', related=('admission_year',)),
+        'is_active': Field('is_active'),
+        'updated_at': Field('updated_at'),
+    }
+    filters = {
+        'department': ('department__code', str),
+        'is_active': ('is_active', _bool),
+    }
+
+
+class TeacherResource(Resource):
+    name = 'teachers'
+    model = Teacher
+    search_kind = 'teacher'
+    fields = {
+        'id': Field('pk', columns=()),
+        'teacher_id': Field('teacher_id'),
+        **_user_fields(),
+        'department': _department_field(),
+        'qualification': Field('qualification'),
+        'joining_date': Field('joining_date'),
+        'is_active': Field('is_active'),
+        'updated_at': Field('updated_at'),
+    }
+    filters = {
+        'department': ('department__code', str),
+        'is_active': ('is_active', _bool),
+    }
+
+
+class CourseResource(Resource):
+    name = 'courses'
+    model = Course
+    search_kind = 'course'
+    fields = {
+        'id': Field('pk', columns=()),
+        'code': Field('code'),
+        'name': Field('name'),
+        'department': _department_field(),
+        'credits': Field('credits'),
+        'description': Field('description'),
+        'prerequisites': Field(
+            get=lambda course: [c.code for c in course.prerequisites.all()], columns=(),
+            prefetch=(Prefetch('prerequisites', queryset=Course.objects.only('code').order_by('code')),),
+        ),
+        'updated_at': Field('updated_at'),
+    }
+    filters = {
+        'department': ('department__code', str),
+        'credits': ('credits', int),
+    }
+
+
+def _meetings(offering):
+    return [
+        {'weekday': m.weekday, 'start_time': m.start_time, 'end_time': m.end_time}
+        for m in offering.meetings.all()
+    ]
+
+
+class OfferingResource(Resource):
+    name = 'offerings'
+    model = CourseOffering
+    fields = {
+        'id': Field('pk', columns=()),
+        'course_id': Field('course_id'),
+        'course': Field('course__code', related=('course',), versions=('course__updated_at',)),
+        'course_name': Field('course__name', related=('course',), versions=('course__updated_at',)),
+        **_semester_fields(),
+        'teacher_id': Field('teacher_id'),
+        'teacher': Field(
+            get=lambda o: o.teacher and o.teacher.user.get_full_name(),
+            columns=('teacher__user__first_name', 'teacher__user__last_name'),
+            related=('teacher__user',), versions=('teacher__user__first_name', 'teacher__user__last_name'),
+        ),
+        'max_students': Field('max_students'),
+        'enrolled': Field('active_enrollment_count'),
+        'waitlisted': Field('waitlist_length'),
+        'is_active': Field('is_active'),
+        # MeetingTime rows are rewritten whenever the offering is saved
+        'schedule': Field('schedule'),
+        'meetings': Field(get=_meetings, columns=(), prefetch=('meetings',)),
+        'updated_at': Field('updated_at'),
+    }
+    filters = {
+        'semester': ('semester_id', int),
+        'course': ('course__code', str),
+        'teacher': ('teacher__teacher_id', str),
+        'is_active': ('is_active', _bool),
+    }
+
+
+class EnrollmentResource(Resource):
+    """
+    Enrollments are visible to staff, to the student enrolled and to the
+    teacher of the offering.
+    """
+    name = 'enrollments'
+    model = Enrollment
+    fields = {
+        'id': Field('pk', columns=()),
+        'student_id': Field('student_id'),
+        'student': Field('student__student_id', related=('student',), versions=('student__updated_at',)),
+        'offering_id': Field('course_offering_id'),
+        'course': Field(
+            'course_offering__course__code', related=('course_offering__course',),
+            versions=('course_offering__course__updated_at',),
+        ),
+        **_semester_fields('course_offering'),
+        'enrollment_date': Field('enrollment_date'),
+        'withdrawn': Field('withdrawn'),
+        'withdrawal_date': Field('withdrawal_date'),
+        'updated_at': Field('updated_at'),
+    }
+    filters = {
+        'student': ('student__student_id', str),
+        'offering': ('course_offering_id', int),
+        'semester': ('course_offering__semester_id', int),
+        'withdrawn': ('withdrawn', _bool),
+    }
+
+    def get_queryset(self, user):
+        queryset = super().get_queryset(user)
+        if user.is_staff:
+            return queryset
+        return queryset.filter(Q(student__user=user) | Q(course_offering__teacher__user=user))
+
+
+class GradeResource(EnrollmentResource):
+    """Scores and letter grades of the active enrollments."""
+    name = 'grades'
+    fields = {
+        'id': Field('pk', columns=()),
+        'student_id': Field('student_id'),
+        'student': Field('student__student_id', related=('student',), versions=('student__updated_at',)),
+        'offering_id': Field('course_offering_id'),
+        'course': EnrollmentResource.fields['course'],
+        'credits': Field(
+            'course_offering__course__credits', related=('course_offering__course',),
+            versions=('course_offering__course__updated_at',),
+        ),
+        **_semester_fields('course_offering'),
+        'assignment_score': Field('assignment_score'),
+        'midterm_score': Field('midterm_score'),
+        'final_score': Field('final_score'),
+        'total_score': Field(
+            get=Enrollment.calculate_total_score,
+            columns=('assignment_score', 'midterm_score', 'final_score'),
+        ),
+        'grade': Field('grade'),
+        'updated_at': Field('updated_at'),
+    }
+    filters = {
+        'student': ('student__student_id', str),
+        'offering': ('course_offering_id', int),
+        'semester': ('course_offering__semester_id', int),
+        'grade': ('grade', str),
+    }
+
+    def get_queryset(self, user):
+        return super().get_queryset(user).filter(withdrawn=False)
+
+
+RESOURCES = {
+    resource.name: resource()
+    for resource in (
+        StudentResource, TeacherResource, CourseResource, OfferingResource, EnrollmentResource, GradeResource,
+    )
+}
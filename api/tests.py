@@ -0,0 +1,155 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from core.testing import QueryAssertionsMixin
+from courses.models import Course, Enrollment
+from courses.tests import create_catalog, create_students
+
+
+class ResourceApiTests(QueryAssertionsMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.offering = create_catalog()
+        cls.offering.schedule = 'Mon/Wed 9:00-10:30'
+        cls.offering.save()
+        cls.course = cls.offering.course
+        cls.students = create_students(5, department=cls.course.department)
+        for student in cls.students:
+            Enrollment.objects.create(student=student, course_offering=cls.offering, grade='B')
+        cls.staff = User.objects.create_user('staff', is_staff=True)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def get(self, resource, pk=None, **params):
+        if pk is None:
+            url = reverse('api:resource_list', args=[resource])
+        else:
+            url = reverse('api:resource_detail', args=[resource, pk])
+        headers = {}
+        if 'etag' in params:
+            headers['HTTP_IF_NONE_MATCH'] = params.pop('etag')
+        return self.client.get(url, params, **headers)
+
+    def test_requires_login(self):
+        self.client.logout()
+        response = self.get('students')
+        self.assertEqual(response.status_code, 401)
+
+    def test_sparse_fieldsets(self):
+        response = self.get('students', fields='student_id,last_name')
+        self.assertEqual(response.status_code, 200)
+        first = response.json()['results'][0]
+        self.assertEqual(set(first), {'id', 'student_id', 'last_name'})
+
+        response = self.get('students', fields='student_id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_related_fields_are_joined(self):
+        with self.assertMaxQueries(5), self.assertNoNPlusOne():
+            # session and user, versions, rows, meeting prefetch
+            response = self.get('offerings')
+        offering = response.json()['results'][0]
+        self.assertEqual(offering['course'], 'CS101')
+        self.assertEqual(offering['semester'], 'FALL 2025-2026')
+        self.assertEqual(offering['enrolled'], 5)
+        self.assertEqual(offering['meetings'][0], {'weekday': 0, 'start_time': '09:00:00', 'end_time': '10:30:00'})
+
+        with self.assertNoNPlusOne():
+            response = self.get('grades', fields='student,course,semester,total_score,grade')
+        self.assertEqual(len(response.json()['results']), 5)
+        self.assertEqual(response.json()['results'][0]['grade'], 'B')
+
+    def test_cursor_pagination(self):
+        response = self.get('students', page_size=2, fields='student_id')
+        page = response.json()
+        self.assertEqual([s['id'] for s in page['results']], [s.pk for s in self.students[:2]])
+        self.assertIsNone(page['previous'])
+
+        seen = [s['id'] for s in page['results']]
+        while page['next']:
+            page = self.client.get(page['next']).json()
+            seen.extend(s['id'] for s in page['results'])
+        self.assertEqual(seen, [s.pk for s in self.students])
+        self.assertIsNotNone(page['previous'])
+
+    def test_if_none_match_returns_304_without_loading_rows(self):
+        response = self.get('offerings')
+        etag = response['ETag']
+        with self.assertMaxQueries(3):
+            # session and user, then the version query alone
+            response = self.get('offerings', etag=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # Other fields give another representation
+        self.assertEqual(self.get('offerings', fields='course', etag=etag).status_code, 200)
+
+    def test_etag_follows_updated_at(self):
+        url_etag = self.get('courses', self.course.pk)['ETag']
+        self.assertEqual(self.get('courses', self.course.pk, etag=url_etag).status_code, 304)
+
+        self.course.name = 'Programming I'
+        self.course.save()
+        response = self.get('courses', self.course.pk, etag=url_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'Programming I')
+
+        # Fields of related rows use their updated_at too
+        etag = self.get('offerings', self.offering.pk, fields='course')['ETag']
+        Course.objects.filter(pk=self.course.pk).update(code='CS111')
+        self.assertEqual(self.get('offerings', self.offering.pk, fields='course', etag=etag).status_code, 304)
+        self.course.refresh_from_db()
+        self.course.save()
+        response = self.get('offerings', self.offering.pk, fields='course', etag=etag)
+        self.assertEqual(response.json()['course'], 'CS111')
+
+    def test_user_renames_change_the_etag(self):
+        # auth.User has no updated_at; its columns are versions themselves
+        student = self.students[0]
+        etag = self.get('students', student.pk, fields='first_name')['ETag']
+        User.objects.filter(pk=student.user_id).update(first_name='Bob')
+        response = self.get('students', student.pk, fields='first_name', etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['first_name'], 'Bob')
+
+        etag = self.get('offerings', fields='teacher')['ETag']
+        User.objects.filter(pk=self.offering.teacher.user_id).update(last_name='Lovelace')
+        response = self.get('offerings', fields='teacher', etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['teacher'], 'Lovelace')
+
+    def test_grade_changes_change_the_etag(self):
+        enrollment = Enrollment.objects.filter(student=self.students[0]).get()
+        etag = self.get('grades', enrollment.pk)['ETag']
+        enrollment.grade = 'A'
+        enrollment.save()
+        self.assertEqual(self.get('grades', enrollment.pk, etag=etag).json()['grade'], 'A')
+
+    def test_prerequisite_changes_change_the_etag(self):
+        other = Course.objects.create(
+            code='CS201', name='Data Structures', department=self.course.department, credits=3, description=''
+        )
+        etag = self.get('courses', other.pk, fields='prerequisites')['ETag']
+        other.prerequisites.add(self.course)
+        response = self.get('courses', other.pk, fields='prerequisites', etag=etag)
+        self.assertEqual(response.json()['prerequisites'], ['CS101'])
+
+    def test_enrollments_are_scoped_to_the_user(self):
+        student = self.students[0]
+        self.client.force_login(student.user)
+        response = self.get('enrollments')
+        self.assertEqual([e['student_id'] for e in response.json()['results']], [student.pk])
+        other = Enrollment.objects.get(student=self.students[1])
+        self.assertEqual(self.get('enrollments', other.pk).status_code, 404)
+
+        self.client.force_login(self.offering.teacher.user)
+        self.assertEqual(len(self.get('grades').json()['results']), 5)
+
+    def test_filters(self):
+        self.assertEqual(len(self.get('enrollments', student=self.students[2].student_id).json()['results']), 1)
+        self.assertEqual(self.get('offerings', is_active='false').json()['results'], [])
+        self.assertEqual(self.get('offerings', semester='fall').status_code, 400)
+        self.assertEqual(self.get('nothing').status_code, 404)
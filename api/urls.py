@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('<str:resource>/', views.ResourceView.as_view(), name='resource_list'),
+    path('<str:resource>/<int:pk>/', views.ResourceView.as_view(), name='resource_detail'),
+]
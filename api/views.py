@@ -0,0 +1,122 @@
+"""
+JSON views over the resources in api.resources.
+
+Every response carries an ETag hashed from the request path and the
+version values behind the representation: mostly ``updated_at`` columns,
+see api.resources. Those values are read first, with a query that
+touches nothing else, and a matching If-None-Match is answered 304
+straight away; only otherwise are the rows loaded with the columns and
+relations the requested fields need and serialized. Lists use keyset pagination on the primary key (``?after=``
+/ ``?before=``) like the HTML list pages.
+"""
+import hashlib
+
+from django.db.models import F
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.http import require_safe
+
+from core.pagination import get_page_size, keyset_paginate
+
+from .resources import RESOURCES, FieldError
+
+
+def _etag(request, versions):
+    digest = hashlib.md5(request.get_full_path().encode(), usedforsecurity=False)
+    for row in versions:
+        digest.update(repr(row).encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def _error(status, detail):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def _page_url(request, **cursor):
+    params = request.GET.copy()
+    params.pop('after', None)
+    params.pop('before', None)
+    params.update(cursor)
+    return f"{request.path}?{params.urlencode()}"
+
+
+@method_decorator(require_safe, name='dispatch')
+class ResourceView(View):
+    """
+    List (``pk`` omitted) or detail view of one resource. Query parameters:
+    ``fields`` (comma separated), ``page_size``, ``after``/``before`` and
+    the resource's filters and ``search``.
+    """
+    resource = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _error(401, 'Authentication required.')
+        self.resource = RESOURCES.get(kwargs.pop('resource'))
+        if self.resource is None:
+            return _error(404, 'Not found.')
+        try:
+            self.fields = self.resource.select_fields(
+                [name.strip() for name in request.GET.get('fields', '').split(',') if name.strip()]
+            )
+            response = super().dispatch(request, *args, **kwargs)
+        except FieldError as e:
+            return _error(400, str(e))
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Cookie'])
+        return response
+
+    def get(self, request, pk=None):
+        queryset = self.resource.get_queryset(request.user)
+        if pk is not None:
+            return self.detail(request, queryset, pk)
+        return self.list(request, self.resource.filter(queryset, request.GET))
+
+    def not_modified(self, request, versions):
+        """The ETag for ``versions`` and a 304 response if the client already has it."""
+        etag = _etag(request, versions)
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            response['ETag'] = etag
+        return etag, response
+
+    def detail(self, request, queryset, pk):
+        versions = queryset.filter(pk=pk).values_list(*self.resource.versions(self.fields)).first()
+        if versions is None:
+            return _error(404, 'Not found.')
+        etag, response = self.not_modified(request, [versions])
+        if response is not None:
+            return response
+
+        obj = self.resource.load(queryset, self.fields).get(pk=pk)
+        response = JsonResponse(self.resource.serialize(obj, self.fields))
+        response['ETag'] = etag
+        return response
+
+    def list(self, request, queryset):
+        try:
+            after = int(request.GET['after']) if request.GET.get('after') else None
+            before = int(request.GET['before']) if request.GET.get('before') else None
+        except ValueError:
+            return _error(400, 'Invalid cursor.')
+        versions = self.resource.versions(self.fields)
+        page = keyset_paginate(
+            queryset.only('pk').annotate(**{f'version_{i}': F(v) for i, v in enumerate(versions)}),
+            'pk', get_page_size(request), after=after, before=before,
+        )
+        etag, response = self.not_modified(request, [(page.has_next, page.has_previous)] + [
+            (row.pk, *(getattr(row, f'version_{i}') for i in range(len(versions)))) for row in page
+        ])
+        if response is not None:
+            return response
+
+        objects = self.resource.load(queryset, self.fields).filter(pk__in=[row.pk for row in page]).order_by('pk')
+        response = JsonResponse({
+            'results': [self.resource.serialize(obj, self.fields) for obj in objects],
+            'next': _page_url(request, after=page.next_cursor) if page.has_next else None,
+            'previous': _page_url(request, before=page.previous_cursor) if page.has_previous else None,
+        })
+        response['ETag'] = etag
+        return response
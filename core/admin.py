@@ -1,6 +1,79 @@
-from django.contrib import admin
+import codecs
+import io
+
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
+from .imports import reset_link
 from .models import Department, AcademicYear, Semester
 
+
+class CSVImportForm(forms.Form):
+    csv_file = forms.FileField(label='CSV file')
+
+    def clean_csv_file(self):
+        # Rows are imported in batches as they are read, so a bad byte
+        # further down would leave the file half imported
+        csv_file = self.cleaned_data['csv_file']
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        try:
+            for chunk in csv_file.chunks():
+                decoder.decode(chunk)
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            # Excel's plain "CSV" is in the Windows code page
+            raise forms.ValidationError('The file is not UTF-8 text. Save it as "CSV UTF-8" and upload it again.')
+        csv_file.seek(0)
+        return csv_file
+
+
+class CSVImportMixin:
+    """
+    ModelAdmin mixin adding an "Import CSV" page that runs ``importer_class``
+    (see core.imports) on an uploaded file and lists the rows it skipped and
+    password reset links for the people created without a password.
+    """
+    importer_class = None
+    change_list_template = 'admin/csv_import_change_list.html'
+
+    def get_urls(self):
+        name = f'{self.opts.app_label}_{self.opts.model_name}_import'
+        return [path('import/', self.admin_site.admin_view(self.import_view), name=name)] + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        form = CSVImportForm(request.POST or None, request.FILES or None)
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.opts,
+            'title': f'Import {self.opts.verbose_name_plural}',
+            'form': form,
+            'columns': list(self.importer_class.form_class.base_fields),
+        }
+        if request.method == 'POST' and form.is_valid():
+            base_url = request.build_absolute_uri('/')
+            links = []
+
+            def created(profiles):
+                links.extend(
+                    (getattr(profile, importer.id_field), profile.user.username, reset_link(profile.user, base_url))
+                    for profile in profiles if not profile.user.has_usable_password()
+                )
+
+            importer = self.importer_class(on_created=created)
+            with io.TextIOWrapper(form.cleaned_data['csv_file'].file, encoding='utf-8-sig', newline='') as f:
+                result = importer.import_csv(f)
+            level = messages.WARNING if result.errors else messages.SUCCESS
+            self.message_user(
+                request, f'Imported {result.created} {self.opts.verbose_name_plural}, skipped {result.skipped} rows.',
+                level,
+            )
+            context.update(result=result, links=links)
+        return TemplateResponse(request, 'admin/csv_import.html', context)
+
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
     list_display = ('name', 'code', 'created_at')
@@ -0,0 +1,59 @@
+"""
+CACHES settings from environment variables.
+
+The dashboard counters (core.dashboard), fragment versions
+(core.fragments), timetables (courses.schedule) and the prerequisite
+graph (courses.prerequisites) are invalidated by deleting or bumping
+cache keys, so every process serving the site must share one cache.
+CACHE_BACKEND picks it:
+
+``redis``
+    a Redis server at CACHE_LOCATION (``redis://localhost:6379/1``); the
+    default of the ASGI profile (school_management.asgi)
+``database``
+    the CACHE_LOCATION table (``django_cache``) in the primary database,
+    created with ``python manage.py createcachetable``. Needs no other
+    server, but every cache call is a query (or several) on Oracle
+``memcached``
+    memcached at CACHE_LOCATION (``localhost:11211``); needs ``pymemcache``
+``local`` (default)
+    memory of the current process; only correct with a single worker
+    process, e.g. runserver or the test suite
+
+This module is imported by the settings, so it imports nothing from
+Django that needs them.
+"""
+from importlib.util import find_spec
+
+from django.core.exceptions import ImproperlyConfigured
+
+from core.db.config import _int
+
+BACKENDS = {
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://localhost:6379/1'),
+    'database': ('django.core.cache.backends.db.DatabaseCache', 'django_cache'),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', 'localhost:11211'),
+    'local': ('django.core.cache.backends.locmem.LocMemCache', 'school-management'),
+}
+
+# Client libraries that are not installed with Django
+REQUIRES = {'redis': 'redis', 'memcached': 'pymemcache'}
+
+
+def caches_from_env(env):
+    backend = env.get('CACHE_BACKEND', 'local')
+    if backend not in BACKENDS:
+        raise ImproperlyConfigured(f"CACHE_BACKEND must be one of {', '.join(BACKENDS)}, not {backend!r}")
+    # Fail at startup rather than on the first cache call of every request
+    if backend in REQUIRES and find_spec(REQUIRES[backend]) is None:
+        raise ImproperlyConfigured(f"CACHE_BACKEND={backend} needs 'pip install {REQUIRES[backend]}'")
+    engine, location = BACKENDS[backend]
+    cache = {
+        'BACKEND': engine,
+        'LOCATION': env.get('CACHE_LOCATION', location),
+    }
+    if backend in ('database', 'local'):
+        # Culling starts at MAX_ENTRIES; Django's default of 300 is below
+        # one fragment per student
+        cache['OPTIONS'] = {'MAX_ENTRIES': _int(env, 'CACHE_MAX_ENTRIES', 100000)}
+    return {'default': cache}
@@ -0,0 +1,74 @@
+"""
+Concurrent database work for async views.
+
+Django's async ORM methods (aget(), acount(), async iteration) run in
+the request's one sync thread, on its one database connection, so
+gathering them does not overlap their queries. gather() runs each
+callable in a thread of its own instead, out of ASYNC_QUERY_THREADS
+threads per process. Each thread has its own database connection,
+which is checked before the callable runs and afterwards closed, kept
+or returned to the pool as the connection settings (core.db.config)
+say, as at the end of a request. The routing state of core.db.routers
+goes along, so replica reads work as in the calling view.
+
+Work run this way cannot see uncommitted writes of the calling
+request, so it is meant for read-only views.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(settings.ASYNC_QUERY_THREADS, thread_name_prefix='query')
+        return _executor
+
+
+def _run(func):
+    close_old_connections()
+    try:
+        return func()
+    finally:
+        close_old_connections()
+
+
+async def gather(*funcs):
+    """Call ``funcs`` concurrently, each in a query thread, and return their results in order."""
+    executor = _get_executor()
+    return await asyncio.gather(*(
+        sync_to_async(_run, thread_sensitive=False, executor=executor)(func) for func in funcs
+    ))
+
+
+async def evaluate(*values):
+    """Load lazy values, e.g. querysets and SimpleLazyObjects, concurrently."""
+    await gather(*(lambda value=value: bool(value) for value in values))
+
+
+def once(func):
+    """
+    functools.cache for functions without arguments that gather() may call
+    from several threads at once: the first call runs ``func`` and the
+    others wait for its result.
+    """
+    lock = threading.Lock()
+    result = []
+
+    @wraps(func)
+    def wrapper():
+        with lock:
+            if not result:
+                result.append(func())
+        return result[0]
+    return wrapper
@@ -0,0 +1,187 @@
+"""
+Dashboard data shared by home_view and DashboardView.
+
+The admin system counters and the per-user student and teacher course
+lists are cached. Signal handlers in core.signals delete the affected
+entries once the transaction that changed the data commits; bulk
+operations that bypass signals are covered by DASHBOARD_CACHE_TIMEOUT.
+Cache hits and misses are counted per process and served to staff by
+the dashboard_metrics view. adashboard_context() is the version for async
+views, which counts the admin counters concurrently (core.concurrency).
+"""
+import threading
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from courses.models import Course, CourseOffering, Enrollment
+from students.models import Student
+from teachers.models import Teacher
+
+from . import concurrency
+from .models import Department
+
+COUNTERS_KEY = 'dashboard:counters'
+STUDENT_KEY = 'dashboard:student:{}'
+TEACHER_KEY = 'dashboard:teacher:{}'
+
+_metrics = Counter()
+_metrics_lock = threading.Lock()
+
+
+def _record(name, hit):
+    with _metrics_lock:
+        _metrics[f'{name}_hits' if hit else f'{name}_misses'] += 1
+
+
+def cache_metrics():
+    """Hit and miss counts per cached section, with hit ratios, for this process."""
+    with _metrics_lock:
+        metrics = dict(_metrics)
+    for name in ['counters', 'student', 'teacher']:
+        hits, misses = metrics.setdefault(f'{name}_hits', 0), metrics.setdefault(f'{name}_misses', 0)
+        metrics[f'{name}_hit_ratio'] = round(hits / (hits + misses), 3) if hits + misses else None
+    return metrics
+
+
+def _cached(name, key, compute):
+    value = cache.get(key)
+    _record(name, value is not None)
+    if value is None:
+        value = compute()
+        cache.set(key, value, settings.DASHBOARD_CACHE_TIMEOUT)
+    return value
+
+
+async def _acached(name, key, compute):
+    value = await cache.aget(key)
+    _record(name, value is not None)
+    if value is None:
+        value = await compute()
+        await cache.aset(key, value, settings.DASHBOARD_CACHE_TIMEOUT)
+    return value
+
+
+def _count_active_courses():
+    # EXISTS instead of a DISTINCT join over every offering
+    active_offerings = CourseOffering.objects.filter(course=OuterRef('pk'), is_active=True)
+    return Course.objects.filter(Exists(active_offerings)).count()
+
+
+COUNTERS = {
+    'total_students': lambda: Student.objects.count(),
+    'total_teachers': lambda: Teacher.objects.count(),
+    'active_courses': _count_active_courses,
+    'total_departments': lambda: Department.objects.count(),
+}
+
+
+def _system_counters():
+    return {name: count() for name, count in COUNTERS.items()}
+
+
+async def _asystem_counters():
+    return dict(zip(COUNTERS, await concurrency.gather(*COUNTERS.values())))
+
+
+def _student_courses(student_id):
+    enrollments = (
+        Enrollment.objects
+        .filter(student_id=student_id, withdrawn=False, course_offering__is_active=True)
+        .select_related('course_offering__course', 'course_offering__teacher__user')
+        .order_by('course_offering__course__code')
+    )
+    return [
+        {
+            'code': e.course_offering.course.code,
+            'name': e.course_offering.course.name,
+            'credits': e.course_offering.course.credits,
+            'instructor': e.course_offering.teacher.user.get_full_name() if e.course_offering.teacher else '',
+            'schedule': e.course_offering.schedule or '',
+        }
+        for e in enrollments
+    ]
+
+
+def _teacher_courses(teacher_id):
+    offerings = (
+        CourseOffering.objects
+        .filter(teacher_id=teacher_id, is_active=True)
+        .select_related('course')
+        .order_by('course__code')
+    )
+    return [
+        {
+            'offering_id': o.pk,
+            'code': o.course.code,
+            'name': o.course.name,
+            'enrolled': o.active_enrollment_count,
+        }
+        for o in offerings
+    ]
+
+
+def system_counters():
+    return _cached('counters', COUNTERS_KEY, _system_counters)
+
+
+async def asystem_counters():
+    return await _acached('counters', COUNTERS_KEY, _asystem_counters)
+
+
+def student_courses(student):
+    return _cached('student', STUDENT_KEY.format(student.pk), lambda: _student_courses(student.pk))
+
+
+def teacher_courses(teacher):
+    return _cached('teacher', TEACHER_KEY.format(teacher.pk), lambda: _teacher_courses(teacher.pk))
+
+
+def dashboard_context(user):
+    """Template context for the role-specific dashboard of ``user``."""
+    if not user.is_authenticated:
+        return {}
+    if user.is_superuser:
+        return {'dashboard_type': 'admin', **system_counters()}
+    if hasattr(user, 'student'):
+        return {
+            'dashboard_type': 'student',
+            'student': user.student,
+            'enrolled_courses': student_courses(user.student),
+        }
+    if hasattr(user, 'teacher'):
+        return {
+            'dashboard_type': 'teacher',
+            'teacher': user.teacher,
+            'teaching_courses': teacher_courses(user.teacher),
+        }
+    return {}
+
+
+async def adashboard_context(user):
+    """dashboard_context() for async views."""
+    if user.is_authenticated and user.is_superuser:
+        return {'dashboard_type': 'admin', **await asystem_counters()}
+    return await sync_to_async(dashboard_context)(user)
+
+
+def _delete_on_commit(*keys):
+    keys = [key for key in keys if key]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_counters():
+    _delete_on_commit(COUNTERS_KEY)
+
+
+def invalidate_student(*student_ids):
+    _delete_on_commit(*(STUDENT_KEY.format(pk) for pk in student_ids if pk))
+
+
+def invalidate_teacher(*teacher_ids):
+    _delete_on_commit(*(TEACHER_KEY.format(pk) for pk in teacher_ids if pk))
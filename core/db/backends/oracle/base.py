@@ -0,0 +1,47 @@
+"""
+Oracle backend whose connections are borrowed from a python-oracledb
+session pool.
+
+Django 5.1 has no pool for Oracle (the "pool" option arrived in 5.2), so
+this wrapper takes the pool settings from OPTIONS["pool"] and passes them
+to oracledb.create_pool(): ``min``, ``max``, ``increment``,
+``ping_interval`` (seconds) and ``wait_timeout`` (milliseconds). Opening a
+connection acquires a session from the pool and closing it releases the
+session, so with CONN_MAX_AGE = 0 each request borrows a session for its
+duration instead of logging in. Sessions idle for ``ping_interval``
+seconds or more are pinged by oracledb before they are handed out, and
+dead ones are replaced.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.oracle import base as oracle
+from django.db.backends.oracle.utils import dsn
+from django.utils.asyncio import async_unsafe
+
+from core.db.pool import get_pool
+
+
+class DatabaseWrapper(oracle.DatabaseWrapper):
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop('pool', None)
+        return conn_params
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        return self.get_pool(conn_params).acquire()
+
+    def get_pool(self, conn_params):
+        Database = oracle.Database
+        if not hasattr(Database, 'create_pool'):
+            raise ImproperlyConfigured('Pooled Oracle connections need python-oracledb')
+        settings_dict = self.settings_dict
+        # The test runner switches the same alias to the test user
+        key = ('oracle', self.alias, settings_dict['USER'], dsn(settings_dict))
+        pool_options = {'getmode': Database.POOL_GETMODE_TIMEDWAIT, **settings_dict['OPTIONS'].get('pool', {})}
+        return get_pool(key, lambda: Database.create_pool(
+            user=settings_dict['USER'],
+            password=settings_dict['PASSWORD'],
+            dsn=dsn(settings_dict),
+            **pool_options,
+            **conn_params,
+        ))
@@ -0,0 +1,80 @@
+"""
+SQLite backend standing in for Oracle when benchmarking connection modes
+locally (see the benchmark_connections command).
+
+Opening a SQLite connection costs microseconds, where an Oracle login
+costs network round trips and session setup, so OPTIONS["connect_delay"]
+(milliseconds) adds that cost to every new connection, and
+OPTIONS["query_delay"] a network round trip to every statement. With
+OPTIONS["pool"] set, connections are borrowed from a core.db.pool
+ConnectionPool that takes the same settings as the Oracle backend's
+session pool, and closing one returns it to the pool.
+"""
+import time
+
+from django.db.backends.sqlite3 import base as sqlite3
+from django.utils.asyncio import async_unsafe
+
+from core.db.pool import ConnectionPool, get_pool
+
+
+class DelayedCursorWrapper(sqlite3.SQLiteCursorWrapper):
+    def __init__(self, connection, delay):
+        super().__init__(connection)
+        self.delay = delay
+
+    def execute(self, query, params=None):
+        time.sleep(self.delay)
+        return super().execute(query, params)
+
+    def executemany(self, query, param_list):
+        time.sleep(self.delay)
+        return super().executemany(query, param_list)
+
+
+class DatabaseWrapper(sqlite3.DatabaseWrapper):
+    pool = None
+    connect_delay = 0
+    query_delay = 0
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        options = self.settings_dict['OPTIONS']
+        conn_params.pop('pool', None)
+        conn_params.pop('connect_delay', None)
+        conn_params.pop('query_delay', None)
+        self.connect_delay = options.get('connect_delay', 0) / 1000
+        self.query_delay = options.get('query_delay', 0) / 1000
+        self.pool = None
+        if 'pool' in options and not self.is_in_memory_db():
+            self.pool = get_pool(
+                ('sqlite', self.alias, self.settings_dict['NAME']),
+                lambda: ConnectionPool(
+                    lambda: self.open_connection(conn_params),
+                    ping=lambda conn: conn.execute('SELECT 1'),
+                    **options['pool'],
+                ),
+            )
+        return conn_params
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        if self.pool is not None:
+            return self.pool.acquire()
+        return self.open_connection(conn_params)
+
+    def open_connection(self, conn_params):
+        time.sleep(self.connect_delay)
+        return super().get_new_connection(conn_params)
+
+    def create_cursor(self, name=None):
+        if self.query_delay:
+            return self.connection.cursor(factory=lambda conn: DelayedCursorWrapper(conn, self.query_delay))
+        return super().create_cursor(name)
+
+    def _close(self):
+        if self.pool is not None and self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.release(self.connection)
+        else:
+            super()._close()
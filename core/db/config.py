@@ -0,0 +1,98 @@
+"""
+DATABASES settings from environment variables.
+
+DB_CONNECTION_MODE picks how connections are reused between requests:
+
+``per-request``
+    a new session for every request, closed when it ends (CONN_MAX_AGE 0)
+``persistent`` (default)
+    one session per worker thread, kept for DB_CONN_MAX_AGE seconds and
+    checked with a ping before a request reuses it
+``pooled``
+    each request borrows a session from a per-process pool of at most
+    DB_POOL_MAX sessions (core.db.backends), pinged before reuse after
+    DB_POOL_PING_INTERVAL idle seconds
+
+DB_BACKEND=sqlite swaps Oracle for the local SQLite stand-in, with
+DB_CONNECT_DELAY_MS of simulated session setup per new connection and
+DB_QUERY_DELAY_MS of simulated network latency per statement.
+
+Setting DB_REPLICA_NAME (or DB_REPLICA_HOST) adds a ``replica`` alias
+for core.db.routers; its other DB_REPLICA_* variables default to the
+primary's DB_* ones. The test runner treats the replica as a mirror of
+the primary rather than creating a test database on it.
+
+This module is imported by the settings, so it imports nothing from
+Django that needs them.
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+MODES = ('per-request', 'persistent', 'pooled')
+BACKENDS = ('oracle', 'sqlite')
+
+
+def _int(env, name, default):
+    value = env.get(name, '')
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ImproperlyConfigured(f'{name} must be a whole number, not {value!r}')
+
+
+def database_from_env(env, base_dir):
+    mode = env.get('DB_CONNECTION_MODE', 'persistent')
+    if mode not in MODES:
+        raise ImproperlyConfigured(f"DB_CONNECTION_MODE must be one of {', '.join(MODES)}, not {mode!r}")
+    backend = env.get('DB_BACKEND', 'oracle')
+    if backend not in BACKENDS:
+        raise ImproperlyConfigured(f"DB_BACKEND must be one of {', '.join(BACKENDS)}, not {backend!r}")
+
+    if backend == 'oracle':
+        database = {
+            'ENGINE': 'core.db.backends.oracle' if mode == 'pooled' else 'django.db.backends.oracle',
+            'NAME': env.get('DB_NAME', 'free'),  # Oracle service name
+            'USER': env.get('DB_USER', 'vibooth'),
+            'PASSWORD': env.get('DB_PASSWORD', '123'),
+            'HOST': env.get('DB_HOST', 'localhost'),
+            'PORT': env.get('DB_PORT', '1521'),
+            'OPTIONS': {},
+        }
+    else:
+        database = {
+            'ENGINE': 'core.db.backends.sqlite3',
+            'NAME': env.get('DB_NAME', str(base_dir / 'db.sqlite3')),
+            'OPTIONS': {
+                'connect_delay': _int(env, 'DB_CONNECT_DELAY_MS', 0),
+                'query_delay': _int(env, 'DB_QUERY_DELAY_MS', 0),
+            },
+        }
+
+    if mode == 'persistent':
+        database['CONN_MAX_AGE'] = _int(env, 'DB_CONN_MAX_AGE', 600)
+        database['CONN_HEALTH_CHECKS'] = True
+    else:
+        database['CONN_MAX_AGE'] = 0
+    if mode == 'pooled':
+        database['OPTIONS']['pool'] = {
+            'min': _int(env, 'DB_POOL_MIN', 1),
+            'max': _int(env, 'DB_POOL_MAX', 10),
+            'increment': _int(env, 'DB_POOL_INCREMENT', 1),
+            'ping_interval': _int(env, 'DB_POOL_PING_INTERVAL', 60),
+            'wait_timeout': _int(env, 'DB_POOL_WAIT_TIMEOUT_MS', 5000),
+        }
+    return database
+
+
+def databases_from_env(env, base_dir):
+    databases = {'default': database_from_env(env, base_dir)}
+    if env.get('DB_REPLICA_NAME') or env.get('DB_REPLICA_HOST'):
+        replica_env = dict(env)
+        replica_env.update(
+            (f"DB_{key.removeprefix('DB_REPLICA_')}", value)
+            for key, value in env.items() if key.startswith('DB_REPLICA_')
+        )
+        databases['replica'] = database_from_env(replica_env, base_dir)
+        databases['replica']['TEST'] = {'MIRROR': 'default'}
+    return databases
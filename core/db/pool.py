@@ -0,0 +1,117 @@
+"""
+A small thread-safe connection pool for DB-API connections.
+
+The Oracle backend in core.db.backends.oracle uses python-oracledb's own
+session pool; this one backs the SQLite stand-in used for local
+benchmarks, and follows the same settings: at most ``max`` connections,
+callers wait up to ``wait_timeout`` milliseconds for a free one, and a
+connection idle for ``ping_interval`` seconds or more is pinged before it
+is handed out and replaced if the ping fails.
+
+Pools are shared by all threads of a process and registered per database
+alias, since Django keeps one DatabaseWrapper per alias and thread.
+"""
+import threading
+import time
+from collections import deque
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, connect, ping, max=10, ping_interval=60, wait_timeout=30000, **unused):
+        # min and increment only mean something to oracledb; connections
+        # here are opened on demand
+        self.connect = connect
+        self.ping = ping
+        self.max = max
+        self.ping_interval = ping_interval
+        self.wait_timeout = wait_timeout / 1000
+        self.size = 0
+        self._idle = deque()
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            with self._condition:
+                while not self._idle and self.size >= self.max:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._condition.wait(remaining):
+                        raise PoolTimeout(f'No connection free within {self.wait_timeout}s ({self.max} in use)')
+                if self._idle:
+                    conn, released = self._idle.pop()
+                else:
+                    self.size += 1
+                    conn = None
+
+            if conn is None:
+                try:
+                    return self.connect()
+                except BaseException:
+                    self._forget()
+                    raise
+            if time.monotonic() - released < self.ping_interval or self._healthy(conn):
+                return conn
+            self.discard(conn)
+
+    def release(self, conn):
+        try:
+            conn.rollback()
+        except Exception:
+            self.discard(conn)
+            return
+        with self._condition:
+            self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    def discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._forget()
+
+    def close(self):
+        with self._condition:
+            idle, self._idle = self._idle, deque()
+        for conn, _ in idle:
+            self.discard(conn)
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    def _healthy(self, conn):
+        try:
+            self.ping(conn)
+        except Exception:
+            return False
+        return True
+
+    def _forget(self):
+        with self._condition:
+            self.size -= 1
+            self._condition.notify()
+
+
+def get_pool(key, create):
+    """The pool registered under ``key``, made with ``create()`` on first use."""
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = create()
+        return _pools[key]
+
+
+def close_pools():
+    """Close every registered pool's idle connections and forget the pools."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,99 @@
+"""
+Primary/replica routing for reporting-heavy reads.
+
+Writes always go to the ``default`` (primary) database. Reads go to the
+``replica`` alias only inside replica_reads(), which DatabaseRoutingMiddleware
+opens for the safe requests of the views named in REPLICA_READ_VIEWS and
+which analytics code opens around its queries. Everything else reads from
+the primary, so nothing changes while no replica is configured.
+
+A replica lags behind the primary, so reads stick to the primary:
+
+* for the rest of a request once it has written anything, and
+* for REPLICA_PIN_SECONDS after a request that wrote, through a cookie the
+  middleware sets, so the page a form redirects to (e.g. after
+  register_course or manage_grades) shows the change.
+
+Sessions are never read from the replica: a session created by a login
+would not be there yet. Neither is the database cache (CACHE_BACKEND
+``database``), whose writes do not pin reads either.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = 'replica'
+PRIMARY_ONLY_APPS = {'sessions', 'django_cache'}
+
+
+@dataclass
+class RoutingState:
+    replica: bool = False  # inside replica_reads()
+    pinned: bool = False  # a recent request wrote
+    wrote: bool = False  # this request wrote
+
+    @property
+    def use_replica(self):
+        return self.replica and not (self.pinned or self.wrote)
+
+
+_state = ContextVar('db_routing', default=None)
+
+
+def current_state():
+    return _state.get()
+
+
+@contextmanager
+def routing_scope(pinned=False):
+    """Routing state for one request or job; yields the RoutingState."""
+    token = _state.set(RoutingState(pinned=pinned))
+    try:
+        yield _state.get()
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def replica_reads():
+    """Send reads to the replica, unless the current scope has written."""
+    state = _state.get()
+    if state is None:
+        with routing_scope(), replica_reads():
+            yield
+        return
+    previous, state.replica = state.replica, True
+    try:
+        yield
+    finally:
+        state.replica = previous
+
+
+def has_replica():
+    return REPLICA_DB_ALIAS in connections
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is not None and state.use_replica and model._meta.app_label not in PRIMARY_ONLY_APPS \
+                and has_replica():
+            return REPLICA_DB_ALIAS
+        # Not None, which would read related rows of replica objects from
+        # the replica too
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None and model._meta.app_label != 'django_cache':
+            state.wrote = True
+        # Not None: objects read from the replica must be saved to the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
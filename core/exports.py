@@ -0,0 +1,384 @@
+"""
+Streaming CSV and XLSX exports.
+
+Each export reads its rows with values_list() and iterator(chunk_size=...),
+so the database driver fetches them in batches and no model instances
+are built, and the writers below turn rows into output chunks as they
+arrive. Memory stays flat however many rows are exported, whether the
+chunks go to a StreamingHttpResponse or to a file from the export_data
+command.
+
+XLSX files are written with zipfile into a buffer that is drained after
+each batch of rows. Cells are inline strings rather than a shared string
+table, which would have to be held until the end.
+"""
+import csv
+import zipfile
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import F, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Semester
+from courses.models import CourseAttendance, Enrollment
+from students.attendance import to_int
+from students.models import AttendanceNote, StudentTermAttendance
+
+FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Output is handed on once this many characters or bytes are pending
+CHUNK_SIZE = 64 * 1024
+
+
+class ExportError(ValueError):
+    pass
+
+
+class _Buffer:
+    """Write-only file that collects what is written until drained."""
+
+    def __init__(self, empty):
+        self.empty = empty
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(data)
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = self.empty.join(self.chunks)
+        self.chunks, self.size = [], 0
+        return data
+
+
+def csv_chunks(header, rows):
+    buffer = _Buffer('')
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.size >= CHUNK_SIZE:
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="{sheet}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_TAIL = '</sheetData></worksheet>'
+# Control characters are not allowed in XML 1.0
+_ILLEGAL_XML = dict.fromkeys(c for c in range(32) if c not in (9, 10, 13))
+
+
+def _cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c><v>{value!r}</v></c>'
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    text = escape(str(value).translate(_ILLEGAL_XML))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def xlsx_chunks(header, rows, sheet='Export'):
+    buffer = _Buffer(b'')
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content.format(sheet=escape(sheet[:31])))
+        # force_zip64: the sheet's size is not known before it is written
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as part:
+            part.write(_SHEET_HEAD.encode())
+            part.write(f'<row>{"".join(_cell(v) for v in header)}</row>'.encode())
+            for row in rows:
+                part.write(f'<row>{"".join(_cell(v) for v in row)}</row>'.encode())
+                if buffer.size >= CHUNK_SIZE:
+                    yield buffer.drain()
+            part.write(_SHEET_TAIL.encode())
+    yield buffer.drain()
+
+
+WRITERS = {'csv': csv_chunks, 'xlsx': xlsx_chunks}
+
+
+@dataclass(frozen=True)
+class Export:
+    """
+    One kind of export. ``columns`` are ``(header, lookup)`` pairs read
+    with values_list(), ``filters`` map the semester, department and
+    offering filters to lookups on ``model``, and ``order_by`` must make
+    the output order deterministic.
+    """
+    name: str
+    title: str
+    model: object
+    columns: tuple
+    filters: dict
+    order_by: tuple
+    base_filter: dict = None
+    annotations: dict = None
+
+    @property
+    def header(self):
+        return [header for header, _ in self.columns]
+
+    def get_queryset(self, semester=None, department=None, offering=None):
+        queryset = self.model.objects.all()
+        if self.base_filter:
+            queryset = queryset.filter(**self.base_filter)
+        if self.annotations:
+            queryset = queryset.annotate(**self.annotations)
+        for name, value in (('semester', semester), ('department', department), ('offering', offering)):
+            if value not in (None, ''):
+                queryset = queryset.filter(**{self.filters[name]: value})
+        return queryset
+
+    def rows(self, chunk_size=None, **filters):
+        queryset = self.get_queryset(**filters).order_by(*self.order_by)
+        return queryset.values_list(*(lookup for _, lookup in self.columns)).iterator(
+            chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE
+        )
+
+    def filename(self, format, semester=None, department=None, offering=None):
+        parts = [self.name]
+        if semester:
+            parts.append(f'semester-{semester}')
+        if department:
+            parts.append(str(department).lower())
+        if offering:
+            parts.append(f'offering-{offering}')
+        return f"{'-'.join(parts)}.{format}"
+
+
+_STUDENT_COLUMNS = (
+    ('Student ID', 'student__student_id'),
+    ('First name', 'student__user__first_name'),
+    ('Last name', 'student__user__last_name'),
+)
+_OFFERING_COLUMNS = (
+    ('Semester', 'course_offering__semester__name'),
+    ('Academic year', 'course_offering__semester__academic_year__year'),
+    ('Course', 'course_offering__course__code'),
+    ('Offering', 'course_offering_id'),
+)
+_ENROLLMENT_FILTERS = {
+    'semester': 'course_offering__semester_id',
+    'department': 'course_offering__course__department__code',
+    'offering': 'course_offering_id',
+}
+
+
+class DailyAttendanceExport(Export):
+    """
+    One row per student and recorded school day from the attendance
+    bitmaps, with the day's note. Notes are read in the same student and
+    date order as the bitmaps and merged in, so neither is held in memory.
+    """
+
+    def get_queryset(self, semester=None, department=None, offering=None):
+        queryset = super().get_queryset(semester, department)
+        if offering not in (None, ''):
+            queryset = queryset.filter(
+                student__enrollment__course_offering_id=offering, student__enrollment__withdrawn=False,
+            )
+        return queryset
+
+    def rows(self, chunk_size=None, **filters):
+        chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+        terms = self.get_queryset(**filters).order_by(*self.order_by).values_list(
+            'student_id', 'student__student_id', 'student__user__first_name', 'student__user__last_name',
+            'semester', 'semester__name', 'semester__academic_year__year', 'semester__start_date',
+            'semester__end_date', 'present', 'recorded',
+        ).iterator(chunk_size=chunk_size)
+        notes = self._notes(**filters).iterator(chunk_size=chunk_size)
+        note = next(notes, None)
+        calendars = {}
+
+        for (pk, student_id, first_name, last_name, semester_id, semester, year,
+             start_date, end_date, present, recorded) in terms:
+            term_notes = {}
+            while note is not None and (note[0], note[1]) <= (pk, end_date):
+                if note[0] == pk and note[1] >= start_date:
+                    term_notes[note[1]] = note[2]
+                note = next(notes, None)
+
+            calendar = calendars.get(semester_id)
+            if calendar is None:
+                calendar = calendars[semester_id] = _Calendar(start_date)
+            present, recorded = to_int(present), to_int(recorded)
+            for index in range(recorded.bit_length()):
+                if recorded >> index & 1:
+                    day = calendar.day(index)
+                    yield (semester, year, day, student_id, first_name, last_name,
+                           bool(present >> index & 1), term_notes.get(day, ''))
+
+    def _notes(self, semester=None, department=None, offering=None):
+        notes = AttendanceNote.objects.order_by('student_id', 'date')
+        if department not in (None, ''):
+            notes = notes.filter(student__department__code=department)
+        if offering not in (None, ''):
+            notes = notes.filter(
+                student__enrollment__course_offering_id=offering, student__enrollment__withdrawn=False,
+            )
+        if semester not in (None, ''):
+            dates = Semester.objects.filter(pk=semester)
+            notes = notes.filter(
+                date__gte=Subquery(dates.values('start_date')), date__lte=Subquery(dates.values('end_date')),
+            )
+        return notes.values_list('student_id', 'date', 'note')
+
+
+class _Calendar:
+    """School days of one semester by bitmap index, as in students.attendance.school_day()."""
+
+    def __init__(self, start_date):
+        self.days = []
+        self.next_day = start_date
+
+    def day(self, index):
+        while len(self.days) <= index:
+            while self.next_day.weekday() >= 5:
+                self.next_day += timedelta(days=1)
+            self.days.append(self.next_day)
+            self.next_day += timedelta(days=1)
+        return self.days[index]
+
+
+EXPORTS = {export.name: export for export in (
+    Export(
+        name='roster',
+        title='Course rosters',
+        model=Enrollment,
+        columns=_OFFERING_COLUMNS + (
+            ('Course name', 'course_offering__course__name'),
+        ) + _STUDENT_COLUMNS + (
+            ('Email', 'student__user__email'),
+            ('Enrolled on', 'enrollment_date'),
+        ),
+        filters=_ENROLLMENT_FILTERS,
+        base_filter={'withdrawn': False},
+        order_by=('course_offering_id', 'student__student_id'),
+    ),
+    Export(
+        name='gradebook',
+        title='Grade books',
+        model=Enrollment,
+        columns=_OFFERING_COLUMNS + _STUDENT_COLUMNS + (
+            ('Assignment', 'assignment_score'),
+            ('Midterm', 'midterm_score'),
+            ('Final', 'final_score'),
+            ('Total', 'total_score'),
+            ('Grade', 'grade'),
+            ('Withdrawn', 'withdrawn'),
+        ),
+        filters=_ENROLLMENT_FILTERS,
+        # Same total as Enrollment.calculate_total_score()
+        annotations={'total_score': sum(
+            (Coalesce(F(field), Value(0.0)) for field in ('midterm_score', 'final_score')),
+            Coalesce(F('assignment_score'), Value(0.0)),
+        )},
+        order_by=('course_offering_id', 'student__student_id'),
+    ),
+    Export(
+        name='course_attendance',
+        title='Course attendance',
+        model=CourseAttendance,
+        columns=(
+            ('Semester', 'session__course_offering__semester__name'),
+            ('Academic year', 'session__course_offering__semester__academic_year__year'),
+            ('Course', 'session__course_offering__course__code'),
+            ('Offering', 'session__course_offering_id'),
+            ('Date', 'session__date'),
+        ) + _STUDENT_COLUMNS + (
+            ('Present', 'is_present'),
+            ('Note', 'note'),
+        ),
+        filters={
+            'semester': 'session__course_offering__semester_id',
+            'department': 'session__course_offering__course__department__code',
+            'offering': 'session__course_offering_id',
+        },
+        order_by=('session__course_offering_id', 'session__date', 'student__student_id'),
+    ),
+    DailyAttendanceExport(
+        name='attendance',
+        title='Daily attendance',
+        model=StudentTermAttendance,
+        columns=(
+            ('Semester', None),
+            ('Academic year', None),
+            ('Date', None),
+        ) + _STUDENT_COLUMNS + (
+            ('Present', None),
+            ('Note', None),
+        ),
+        filters={
+            'semester': 'semester_id',
+            'department': 'student__department__code',
+        },
+        order_by=('student_id', 'semester__start_date'),
+    ),
+)}
+
+
+def get_export(name):
+    try:
+        return EXPORTS[name]
+    except KeyError:
+        raise ExportError(f"Unknown export {name!r}. Choose one of: {', '.join(EXPORTS)}.") from None
+
+
+def export_chunks(name, format='csv', chunk_size=None, **filters):
+    """The export's header and rows in ``format``, as an iterator of chunks."""
+    export = get_export(name)
+    if format not in WRITERS:
+        raise ExportError(f"Unknown format {format!r}. Choose one of: {', '.join(WRITERS)}.")
+    return WRITERS[format](export.header, export.rows(chunk_size=chunk_size, **filters))
@@ -0,0 +1,68 @@
+"""
+Template fragment caching keyed on per-object version counters.
+
+{% cachefragment %} (core.templatetags.fragments) stores its content
+under the fragment name and the current versions of the Students, Courses
+and CourseOfferings it is given. Cached fragments are never deleted:
+when rows behind an object change, its version is bumped once the
+transaction commits, the next render misses and stores a new entry, and
+the old one ages out of the cache. The handlers in core.signals bump
+versions for Enrollment, attendance and Assignment writes; code writing
+with bulk operations calls bump() itself. Changes the counters do not
+follow, such as a renamed course in a student's grade table, show after
+FRAGMENT_CACHE_TIMEOUT at most.
+
+Versions start at the current time in microseconds, so a counter lost
+to cache eviction never comes back with a value an old fragment was
+stored under.
+"""
+import time
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+
+VERSION_KEY = 'fragments:version:{}:{}'
+
+
+def _key(model, pk):
+    return VERSION_KEY.format(model._meta.label_lower, pk)
+
+
+def versions(objects):
+    """``label:pk:version`` strings for ``objects``, with one cache round trip."""
+    keys = [_key(type(obj), obj.pk) for obj in objects]
+    current = cache.get_many(keys)
+    for key in set(keys) - set(current):
+        version = time.time_ns() // 1000
+        # Another process may start the counter first
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+        current[key] = version
+    return [f'{key.removeprefix("fragments:version:")}:{current[key]}' for key in keys]
+
+
+def fragment_key(name, objects):
+    return make_template_fragment_key(name, versions(objects))
+
+
+def is_cached(names, objects):
+    """Whether the fragments ``names`` of ``objects`` are all cached, so views can skip loading their data."""
+    keys = [fragment_key(name, objects) for name in names]
+    return len(cache.get_many(keys)) == len(keys)
+
+
+def bump(model, *pks):
+    """Invalidate the fragments of the ``model`` rows ``pks`` once the transaction commits."""
+    keys = {_key(model, pk) for pk in pks if pk is not None}
+    if keys:
+        transaction.on_commit(lambda: _incr(keys))
+
+
+def _incr(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Not cached, so neither is anything stored under it
+            pass
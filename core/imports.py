@@ -0,0 +1,277 @@
+"""
+Streaming bulk import of students and teachers from CSV.
+
+Rows are read and imported in batches, so a file of any size is never
+held in memory. Each row is validated on its own with a form that makes
+no queries; uniqueness of usernames, emails and student or teacher IDs is
+then checked for the whole batch with one IN query per key, plus the keys
+already seen in the batch. Users and profiles are inserted with
+bulk_create, so a batch costs a handful of statements rather than several
+per person. Invalid rows are reported with their line number and skipped;
+the rest of the batch is still imported.
+
+Rows with a password have it hashed in a PasswordHasherPool. Rows without
+one get an unusable password, and the caller can hand out password reset
+links instead (see reset_link()).
+
+bulk_create() sends no signals, so the search index and dashboard
+counters that core.signals maintains are updated per batch here.
+"""
+import csv
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django import forms
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.db import IntegrityError, connection, transaction
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from students.models import Student
+from teachers.models import Teacher
+
+from . import dashboard, search
+from .models import AcademicYear, Department
+from .passwords import PasswordHasherPool
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class PersonImportForm(forms.Form):
+    username = forms.CharField(max_length=150, required=False, validators=[UnicodeUsernameValidator()],
+                               help_text='Defaults to the lowercased student or teacher ID')
+    password = forms.CharField(required=False, strip=False)
+    first_name = forms.CharField(max_length=150)
+    last_name = forms.CharField(max_length=150)
+    email = forms.EmailField()
+    department = forms.CharField(max_length=10, help_text='Department code')
+    date_of_birth = forms.DateField()
+    address = forms.CharField(max_length=500)
+    phone = forms.CharField(max_length=15)
+
+
+class StudentImportForm(PersonImportForm):
+    student_id = forms.CharField(max_length=20)
+    admission_year = forms.CharField(max_length=9, required=False, help_text='e.g. 2025-2026')
+
+
+class TeacherImportForm(PersonImportForm):
+    teacher_id = forms.CharField(max_length=20)
+    qualification = forms.CharField(max_length=100)
+    joining_date = forms.DateField()
+
+
+@dataclass
+class RowError:
+    line: int
+    identifier: str
+    messages: list
+
+    def __str__(self):
+        return f"Line {self.line} ({self.identifier or 'no ID'}): {'; '.join(self.messages)}"
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    errors: list = field(default_factory=list)
+
+    @property
+    def skipped(self):
+        return len(self.errors)
+
+
+def _form_errors(form):
+    return [
+        f"{name}: {message}" if name != '__all__' else message
+        for name, messages in form.errors.items() for message in messages
+    ]
+
+
+def reset_link(user, base_url=''):
+    """Password reset link for a new user; needs the user's pk and password hash, no query."""
+    path = reverse('password_reset_confirm', kwargs={
+        'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': default_token_generator.make_token(user),
+    })
+    return f"{base_url.rstrip('/')}{path}"
+
+
+class PeopleImporter:
+    """
+    Import rows (mappings of column to value, as from csv.DictReader) as
+    users and ``model`` profiles. ``on_created`` is called after each
+    batch with the profiles created in it, their ``user`` attached.
+    """
+    model = None
+    id_field = None
+    form_class = None
+    search_kind = None
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, workers=None, on_created=None):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.on_created = on_created
+        self.departments = {d.code: d for d in Department.objects.all()}
+        self.unusable_password = make_password(None)
+
+    def import_csv(self, f):
+        """Import an open text file; line numbers in errors count the header as line 1."""
+        return self.import_rows(csv.DictReader(f), first_line=2)
+
+    def import_rows(self, rows, first_line=1):
+        result = ImportResult()
+        rows = enumerate(rows, first_line)
+        with PasswordHasherPool(self.workers) as hasher:
+            while batch := list(islice(rows, self.batch_size)):
+                people = self.validate(batch, result)
+                if people:
+                    self.insert(people, hasher, result)
+        return result
+
+    def validate(self, batch, result):
+        """
+        The batch's valid, unclaimed rows as ``(line, cleaned_data)``;
+        errors are added to ``result`` in line order.
+        """
+        cleaned, errors = [], []
+        for line, row in batch:
+            row = {key.strip(): (value or '').strip() for key, value in row.items() if key}
+            form = self.form_class(row)
+            identifier = row.get(self.id_field, '')
+            if not form.is_valid():
+                errors.append(RowError(line, identifier, _form_errors(form)))
+                continue
+            data = form.cleaned_data
+            data['username'] = data['username'] or data[self.id_field].lower()
+            messages = self.resolve(data)
+            if messages:
+                errors.append(RowError(line, identifier, messages))
+                continue
+            cleaned.append((line, data))
+
+        usernames = {data['username'] for _, data in cleaned}
+        emails = {data['email'] for _, data in cleaned}
+        ids = {data[self.id_field] for _, data in cleaned}
+        taken = {
+            'username': set(User.objects.filter(username__in=usernames).values_list('username', flat=True)),
+            'email': set(User.objects.filter(email__in=emails).values_list('email', flat=True)),
+            self.id_field: set(self.model.objects.filter(
+                **{f'{self.id_field}__in': ids}
+            ).values_list(self.id_field, flat=True)),
+        }
+
+        people = []
+        for line, data in cleaned:
+            messages = [
+                f"{key}: {data[key]!r} already exists" for key in taken if data[key] in taken[key]
+            ]
+            if messages:
+                errors.append(RowError(line, data[self.id_field], messages))
+                continue
+            # Later rows with the same keys clash with this one
+            for key in taken:
+                taken[key].add(data[key])
+            people.append((line, data))
+        result.errors.extend(sorted(errors, key=lambda error: error.line))
+        return people
+
+    def resolve(self, data):
+        """Replace codes with the objects they name; returns error messages."""
+        department = self.departments.get(data['department'])
+        if department is None:
+            return [f"department: unknown code {data['department']!r}"]
+        data['department'] = department
+        return []
+
+    def profile(self, user, data):
+        raise NotImplementedError
+
+    def insert(self, people, hasher, result):
+        passwords = [data['password'] for _, data in people if data['password']]
+        hashes = iter(hasher.hash(passwords))
+        users = [
+            User(
+                username=data['username'], email=data['email'],
+                first_name=data['first_name'], last_name=data['last_name'],
+                password=next(hashes) if data['password'] else self.unusable_password,
+            )
+            for _, data in people
+        ]
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                if not connection.features.can_return_rows_from_bulk_insert:
+                    # Oracle: fetch the keys with one lookup on the unique username
+                    pks = dict(User.objects.filter(
+                        username__in=[user.username for user in users]
+                    ).values_list('username', 'pk'))
+                    for user in users:
+                        user.pk = pks[user.username]
+                profiles = [self.profile(user, data) for user, (_, data) in zip(users, people)]
+                self.model.objects.bulk_create(profiles)
+                if not connection.features.can_return_rows_from_bulk_insert:
+                    pks = dict(self.model.objects.filter(user__in=users).values_list('user_id', 'pk'))
+                    for profile in profiles:
+                        profile.pk = pks[profile.user_id]
+                search.index_objects(self.search_kind, [profile.pk for profile in profiles])
+                dashboard.invalidate_counters()
+        except IntegrityError as e:
+            # Someone else created one of the keys since the batch was checked
+            result.errors.extend(
+                RowError(line, data[self.id_field], [f"not imported: {e}"]) for line, data in people
+            )
+            return
+        result.created += len(profiles)
+        if self.on_created:
+            self.on_created(profiles)
+
+
+class StudentImporter(PeopleImporter):
+    model = Student
+    id_field = 'student_id'
+    form_class = StudentImportForm
+    search_kind = 'student'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.admission_years = {year.year: year for year in AcademicYear.objects.all()}
+
+    def resolve(self, data):
+        messages = super().resolve(data)
+        if data['admission_year']:
+            year = self.admission_years.get(data['admission_year'])
+            if year is None:
+                messages.append(f"admission_year: unknown year {data['admission_year']!r}")
+            data['admission_year'] = year
+        else:
+            data['admission_year'] = None
+        return messages
+
+    def profile(self, user, data):
+        return Student(
+            user=user, student_id=data['student_id'], department=data['department'],
+            date_of_birth=data['date_of_birth'], address=data['address'], phone=data['phone'],
+            admission_year=data['admission_year'],
+        )
+
+
+class TeacherImporter(PeopleImporter):
+    model = Teacher
+    id_field = 'teacher_id'
+    form_class = TeacherImportForm
+    search_kind = 'teacher'
+
+    def profile(self, user, data):
+        return Teacher(
+            user=user, teacher_id=data['teacher_id'], department=data['department'],
+            date_of_birth=data['date_of_birth'], address=data['address'], phone=data['phone'],
+            qualification=data['qualification'], joining_date=data['joining_date'],
+        )
+
+
+IMPORTERS = {'students': StudentImporter, 'teachers': TeacherImporter}
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import SUPPRESS
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncRequestFactory, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.db.pool import close_pools
+from courses.models import Course, Enrollment
+
+from .benchmark_connections import measure
+from .benchmark_views import DATASETS, percentile
+
+# Connection mode of each server profile; see school_management/asgi.py
+PROFILES = {'wsgi': 'persistent', 'asgi': 'pooled'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the latency of the dashboard and detail pages under concurrent clients with sync '
+        'views behind WSGI and async views behind ASGI, against a local SQLite stand-in for Oracle'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', default='small', choices=list(DATASETS))
+        parser.add_argument('--requests', type=int, default=200, help='Timed requests per page and profile')
+        parser.add_argument('--warmup', type=int, default=10, help='Untimed requests per page and profile')
+        parser.add_argument('--clients', type=int, default=8, help='Concurrent clients')
+        parser.add_argument('--query-delay', type=int, default=2,
+                            help='Milliseconds of simulated network latency per statement')
+        parser.add_argument('--connect-delay', type=int, default=20,
+                            help='Milliseconds of simulated session setup per new connection')
+        parser.add_argument('--warm-cache', action='store_true',
+                            help='Keep the fragment and dashboard caches, instead of rendering every page in full')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--today', type=date.fromisoformat, default=date(2025, 10, 15),
+                            help='Reference date for the generated data')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        # Each profile runs in a child process started with its own settings
+        parser.add_argument('--worker', choices=list(PROFILES), help=SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            return self.work(options)
+
+        sizes = DATASETS[options['dataset']]
+        env = dict(os.environ)
+        with tempfile.TemporaryDirectory() as tmp:
+            env.update({
+                'DB_BACKEND': 'sqlite',
+                'DB_NAME': str(Path(tmp) / 'standin.sqlite3'),
+                'DB_CONNECTION_MODE': 'per-request',
+                # One process at a time, so the local cache is consistent
+                'CACHE_BACKEND': 'local',
+            })
+            self.stdout.write(f'Seeding the {options["dataset"]} dataset in the stand-in database...')
+            self.manage(env, 'migrate', '--verbosity', '0')
+            self.manage(
+                env, 'generate_test_data', '--students', str(sizes['students']),
+                '--teachers', str(sizes['teachers']), '--semesters', str(sizes['semesters']),
+                '--days', str(sizes['days']), '--seed', str(options['seed']),
+                '--today', options['today'].isoformat(),
+            )
+
+            results = {
+                'meta': {
+                    'created': timezone.now().isoformat(),
+                    'dataset': options['dataset'],
+                    'python': platform.python_version(),
+                    'requests': options['requests'],
+                    'clients': options['clients'],
+                    'query_delay_ms': options['query_delay'],
+                    'connect_delay_ms': options['connect_delay'],
+                    'warm_cache': options['warm_cache'],
+                    'connection_modes': PROFILES,
+                },
+                'profiles': {},
+            }
+            for profile, mode in PROFILES.items():
+                profile_env = {
+                    **env,
+                    'DB_CONNECTION_MODE': mode,
+                    'DB_QUERY_DELAY_MS': str(options['query_delay']),
+                    'DB_CONNECT_DELAY_MS': str(options['connect_delay']),
+                    'DJANGO_ASYNC_VIEWS': '1' if profile == 'asgi' else '',
+                    # A connection for every client and query thread
+                    'DB_POOL_MAX': str(options['clients'] + settings.ASYNC_QUERY_THREADS),
+                }
+                args = ['benchmark_asgi', '--worker', profile, '--requests', str(options['requests']),
+                        '--warmup', str(options['warmup']), '--clients', str(options['clients'])]
+                if options['warm_cache']:
+                    args.append('--warm-cache')
+                results['profiles'][profile] = pages = json.loads(self.manage(profile_env, *args))
+                self.stdout.write(f'{profile.upper()} ({mode} connections):')
+                for page, r in pages.items():
+                    self.stdout.write(
+                        f'  {page:<16} p50 {r["p50_ms"]:8.2f}ms  p95 {r["p95_ms"]:8.2f}ms  '
+                        f'mean {r["mean_ms"]:8.2f}ms  {r["requests_per_second"]:7.1f} req/s'
+                    )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+    def manage(self, env, *args):
+        completed = subprocess.run(
+            [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), *args],
+            env=env, capture_output=True, text=True,
+        )
+        if completed.returncode:
+            raise CommandError(f'{" ".join(args[:2])} failed:\n{completed.stderr}')
+        return completed.stdout
+
+    def work(self, options):
+        if settings.ASYNC_VIEWS != (options['worker'] == 'asgi'):
+            raise CommandError(f'The {options["worker"]} worker needs DJANGO_ASYNC_VIEWS set accordingly')
+        # A superuser, to get the admin dashboard and the course rosters
+        user, _ = User.objects.get_or_create(
+            username='benchmark', defaults={'is_staff': True, 'is_superuser': True}
+        )
+        client = Client()
+        client.force_login(user)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        enrollment = Enrollment.objects.filter(
+            course_offering__semester__is_current=True
+        ).order_by('pk').first()
+        if enrollment is None:
+            raise CommandError('The generated dataset has no current enrollments')
+        course = Course.objects.filter(courseoffering__isnull=False).order_by('code').first()
+        pages = {
+            'dashboard': reverse('dashboard'),
+            'student_detail': reverse('students:student_detail', args=[enrollment.student_id]),
+            'course_detail': reverse('courses:course_detail', args=[course.pk]),
+        }
+        connections.close_all()
+
+        overrides = {'DEBUG': False, 'QUERY_BUDGET_ENABLED': False, 'ALLOWED_HOSTS': ['testserver']}
+        if not options['warm_cache']:
+            overrides['CACHES'] = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        run = measure if options['worker'] == 'wsgi' else measure_asgi
+        results = {}
+        with override_settings(**overrides):
+            for page, url in pages.items():
+                run(url, cookie, options['warmup'], options['clients'])
+                timings, elapsed = run(url, cookie, options['requests'], options['clients'])
+                timings.sort()
+                results[page] = {
+                    'p50_ms': round(percentile(timings, 0.5), 3),
+                    'p95_ms': round(percentile(timings, 0.95), 3),
+                    'mean_ms': round(statistics.mean(timings), 3),
+                    'requests_per_second': round(len(timings) / elapsed, 1),
+                }
+        connections.close_all()
+        close_pools()
+        self.stdout.write(json.dumps(results))
+
+
+def measure_asgi(url, cookie, requests, clients):
+    """
+    Send ``requests`` GETs for ``url`` to an ASGIHandler from ``clients``
+    concurrent tasks on one event loop, as an ASGI server would. Returns
+    the latencies in milliseconds and the elapsed seconds.
+    """
+    handler = ASGIHandler()
+    factory = AsyncRequestFactory()
+    factory.cookies.load(cookie)
+    timings = []
+    errors = []
+
+    async def get():
+        scope = factory.get(url).scope
+        done = asyncio.Event()
+        messages = []
+
+        async def receive():
+            if not messages:
+                messages.append(None)
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await done.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+            if message['type'] == 'http.response.body' and not message.get('more_body'):
+                done.set()
+
+        await handler(scope, receive, send)
+        done.set()
+        return next(m['status'] for m in messages if m and m['type'] == 'http.response.start')
+
+    async def run(count):
+        for _ in range(count):
+            started = time.perf_counter()
+            status = await get()
+            timings.append((time.perf_counter() - started) * 1000)
+            if status != 200:
+                errors.append(f'GET {url} returned {status}')
+                return
+
+    async def main():
+        await asyncio.gather(*(run(requests // clients + (i < requests % clients)) for i in range(clients)))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise CommandError(errors[0])
+    return timings, elapsed
@@ -0,0 +1,179 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from argparse import SUPPRESS
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.db.config import MODES
+from core.db.pool import close_pools
+
+from .benchmark_views import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare per-request latency with per-request, persistent and pooled database connections, '
+        'against a local SQLite stand-in for Oracle or the configured database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', default=','.join(MODES),
+                            help=f'Comma-separated connection modes from: {", ".join(MODES)}')
+        parser.add_argument('--requests', type=int, default=300, help='Timed requests per mode')
+        parser.add_argument('--warmup', type=int, default=10, help='Untimed requests per mode')
+        parser.add_argument('--threads', type=int, default=4, help='Concurrent request threads')
+        parser.add_argument('--url', help='Path to request (default: the courses API list)')
+        parser.add_argument('--connect-delay', type=int, default=20,
+                            help='Stand-in only: milliseconds of simulated session setup per new connection')
+        parser.add_argument('--configured-database', action='store_true',
+                            help='Use the DB_* settings instead of the stand-in; needs --username')
+        parser.add_argument('--username', help='Existing user to request as')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        # Each mode runs in a child process started with its own DB_* settings
+        parser.add_argument('--worker', action='store_true', help=SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            return self.work(options)
+
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f'Unknown modes: {", ".join(sorted(unknown))}')
+        if options['configured_database'] and not options['username']:
+            raise CommandError('--configured-database needs --username')
+
+        env = dict(os.environ)
+        with tempfile.TemporaryDirectory() as tmp:
+            if not options['configured_database']:
+                env.update({
+                    'DB_BACKEND': 'sqlite',
+                    'DB_NAME': str(Path(tmp) / 'standin.sqlite3'),
+                    'DB_CONNECT_DELAY_MS': str(options['connect_delay']),
+                    'DB_CONNECTION_MODE': 'per-request',
+                    # One process at a time, so the local cache is consistent
+                    'CACHE_BACKEND': 'local',
+                })
+                self.stdout.write('Migrating the stand-in database...')
+                self.manage(env, 'migrate', '--verbosity', '0')
+
+            results = {
+                'meta': {
+                    'created': timezone.now().isoformat(),
+                    'database': 'configured' if options['configured_database'] else 'sqlite stand-in',
+                    'connect_delay_ms': None if options['configured_database'] else options['connect_delay'],
+                    'python': platform.python_version(),
+                    'requests': options['requests'],
+                    'threads': options['threads'],
+                },
+                'modes': {},
+            }
+            for mode in modes:
+                args = ['benchmark_connections', '--worker', '--requests', str(options['requests']),
+                        '--warmup', str(options['warmup']), '--threads', str(options['threads'])]
+                for option in ('url', 'username'):
+                    if options[option]:
+                        args += [f'--{option}', options[option]]
+                result = json.loads(self.manage({**env, 'DB_CONNECTION_MODE': mode}, *args))
+                results['modes'][mode] = result
+                self.stdout.write(
+                    f'  {mode:<12} p50 {result["p50_ms"]:8.2f}ms  p95 {result["p95_ms"]:8.2f}ms  '
+                    f'mean {result["mean_ms"]:8.2f}ms  {result["requests_per_second"]:7.1f} req/s'
+                )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+    def manage(self, env, *args):
+        completed = subprocess.run(
+            [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), *args],
+            env=env, capture_output=True, text=True,
+        )
+        if completed.returncode:
+            raise CommandError(f'{" ".join(args[:2])} failed:\n{completed.stderr}')
+        return completed.stdout
+
+    def work(self, options):
+        if options['username']:
+            user = User.objects.get(username=options['username'])
+        else:
+            user, _ = User.objects.get_or_create(username='benchmark', defaults={'is_staff': True})
+        client = Client()
+        client.force_login(user)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        url = options['url'] or reverse('api:resource_list', args=['courses'])
+        connections.close_all()
+
+        # The query budget middleware walks the stack on every query
+        with override_settings(DEBUG=False, QUERY_BUDGET_ENABLED=False, ALLOWED_HOSTS=['testserver']):
+            measure(url, cookie, options['warmup'], options['threads'])
+            timings, elapsed = measure(url, cookie, options['requests'], options['threads'])
+        connections.close_all()
+        close_pools()
+
+        timings.sort()
+        self.stdout.write(json.dumps({
+            'p50_ms': round(percentile(timings, 0.5), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'requests_per_second': round(len(timings) / elapsed, 1),
+        }))
+
+
+def measure(url, cookie, requests, threads):
+    """
+    Send ``requests`` GETs for ``url`` through a WSGIHandler from
+    ``threads`` threads, as a WSGI server would: unlike the test client,
+    this opens and closes connections per request as the settings say.
+    Returns the latencies in milliseconds and the elapsed seconds.
+    """
+    handler = WSGIHandler()
+    factory = RequestFactory()
+    timings = []
+    errors = []
+
+    def run(count):
+        for _ in range(count):
+            environ = factory.get(url, HTTP_COOKIE=cookie).environ
+            started = time.perf_counter()
+            status = []
+            response = handler(environ, lambda s, headers: status.append(s))
+            b''.join(response)
+            response.close()
+            timings.append((time.perf_counter() - started) * 1000)
+            if not status[0].startswith('200'):
+                errors.append(f'GET {url} returned {status[0]}')
+                return
+        # Like a server thread exiting; persistent connections go with it
+        connections.close_all()
+
+    workers = [
+        threading.Thread(target=run, args=(requests // threads + (i < requests % threads),))
+        for i in range(threads)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise CommandError(errors[0])
+    return timings, elapsed
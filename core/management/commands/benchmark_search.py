@@ -0,0 +1,87 @@
+import statistics
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from faker import Faker
+
+from core import search
+from students.models import Student
+
+
+class Command(BaseCommand):
+    help = 'Compare trigram search with the icontains filters on a throwaway test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Number of students to generate')
+        parser.add_argument('--queries', type=int, default=50, help='Number of search terms to time')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        # Everything happens in a separate test database, never the real one
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, options):
+        fake = Faker()
+        fake.seed_instance(options['seed'])
+        rows, batch_size = options['rows'], options['batch_size']
+
+        started = time.perf_counter()
+        for start in range(0, rows, batch_size):
+            count = min(batch_size, rows - start)
+            users = User.objects.bulk_create([
+                User(
+                    username=f'bench{start + i}', first_name=fake.first_name(),
+                    last_name=fake.last_name(), email=f'bench{start + i}@example.com',
+                )
+                for i in range(count)
+            ])
+            Student.objects.bulk_create([
+                Student(
+                    user=user, student_id=f'BEN{start + i:07d}', date_of_birth=date(2005, 1, 1),
+                    address='', phone='',
+                )
+                for i, user in enumerate(users)
+            ])
+        self.stdout.write(f'Created {rows} students in {time.perf_counter() - started:.1f}s')
+
+        started = time.perf_counter()
+        search.index_objects('student', batch_size=batch_size)
+        search.update_statistics()
+        self.stdout.write(f'Indexed {rows} students in {time.perf_counter() - started:.1f}s')
+
+        names = list(
+            Student.objects.order_by('?').values_list('user__last_name', 'user__first_name')[:options['queries']]
+        )
+        terms = [last[:4] for last, _ in names] + [f'{first} {last}' for last, first in names]
+
+        def icontains(term):
+            return list(Student.objects.filter(
+                Q(student_id__icontains=term) |
+                Q(user__first_name__icontains=term) |
+                Q(user__last_name__icontains=term)
+            ).select_related('user')[:50])
+
+        def trigram(term):
+            ids = search.search_ids('student', term)
+            return list(Student.objects.filter(pk__in=ids).select_related('user'))
+
+        for label, lookup in [('icontains', icontains), ('trigram', trigram)]:
+            timings = []
+            for term in terms:
+                started = time.perf_counter()
+                lookup(term)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f'{label:>10}: median {statistics.median(timings):.2f}ms, '
+                f'p95 {timings[int(len(timings) * 0.95) - 1]:.2f}ms over {len(timings)} queries'
+            )
@@ -0,0 +1,183 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import date
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.queries import record_queries
+from courses.models import Course, Enrollment
+from teachers.models import Teacher
+
+DATASETS = {
+    'small': {'students': 200, 'teachers': 10, 'semesters': 3, 'days': 20},
+    'medium': {'students': 2000, 'teachers': 40, 'semesters': 6, 'days': 30},
+    'large': {'students': 20000, 'teachers': 200, 'semesters': 9, 'days': 60},
+}
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the most used views against generated datasets in a throwaway test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--datasets', default='small,medium',
+                            help=f'Comma-separated dataset sizes from: {", ".join(DATASETS)}')
+        parser.add_argument('--requests', type=int, default=30, help='Timed requests per view')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per view')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--today', type=date.fromisoformat, default=date(2025, 10, 15),
+                            help='Reference date for the generated data')
+        parser.add_argument('--output', default='benchmark-results.json')
+        parser.add_argument('--compare', help='Results file of an earlier run to compare against')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Allowed p95 latency increase over --compare, as a fraction')
+
+    def handle(self, *args, **options):
+        datasets = [name.strip() for name in options['datasets'].split(',') if name.strip()]
+        unknown = set(datasets) - set(DATASETS)
+        if unknown:
+            raise CommandError(f'Unknown datasets: {", ".join(sorted(unknown))}')
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+
+        results = {
+            'meta': {
+                'created': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'requests': options['requests'],
+                'seed': options['seed'],
+            },
+            'datasets': {},
+        }
+        # Everything happens in a separate test database, never the real one
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # The query budget middleware walks the stack on every query
+            with override_settings(DEBUG=False, QUERY_BUDGET_ENABLED=False, ALLOWED_HOSTS=['testserver']):
+                for name in datasets:
+                    results['datasets'][name] = self.run_dataset(name, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        with open(options['output'], 'w') as f:
+            json.dump(results, f, indent=2)
+        self.stdout.write(f'Results written to {options["output"]}')
+
+        if baseline:
+            regressions = self.compare(baseline, results, options['threshold'])
+            if regressions:
+                raise CommandError(f'{len(regressions)} regressions:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
+
+    def run_dataset(self, name, options):
+        self.stdout.write(f'Seeding {name} dataset...')
+        call_command('flush', interactive=False, verbosity=0)
+        cache.clear()
+        sizes = DATASETS[name]
+        call_command(
+            'generate_test_data',
+            students=sizes['students'], teachers=sizes['teachers'],
+            semesters=sizes['semesters'], days=sizes['days'],
+            seed=options['seed'], today=options['today'], stdout=self.stdout,
+        )
+
+        enrollment = Enrollment.objects.filter(
+            course_offering__semester__is_current=True
+        ).select_related('student__user').order_by('pk').first()
+        if enrollment is None:
+            raise CommandError('The generated dataset has no current enrollments')
+        student = enrollment.student
+        teacher = Teacher.objects.order_by('pk').first()
+        course = Course.objects.filter(courseoffering__isnull=False).order_by('code').first()
+
+        views = {
+            'course_registration': reverse('students:course_registration'),
+            'student_dashboard': reverse('students:dashboard'),
+            'student_detail': reverse('students:student_detail', args=[student.pk]),
+            'teacher_detail': reverse('teachers:teacher_detail', args=[teacher.pk]),
+            'course_detail': reverse('courses:course_detail', args=[course.pk]),
+        }
+        client = Client()
+        client.force_login(student.user)
+
+        results = {}
+        for view, url in views.items():
+            results[view] = self.measure(client, url, options['requests'], options['warmup'])
+            r = results[view]
+            self.stdout.write(
+                f'  {view:<20} p50 {r["p50_ms"]:8.2f}ms  p95 {r["p95_ms"]:8.2f}ms  '
+                f'{r["queries"]:3d} queries  peak {r["peak_kb"]:8.1f}KB'
+            )
+        return results
+
+    def measure(self, client, url, requests, warmup):
+        for _ in range(warmup):
+            self.get(client, url)
+
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            self.get(client, url)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+
+        # Query count and peak memory come from one extra request, so the
+        # recording and tracing overhead stays out of the timings
+        tracemalloc.start()
+        try:
+            with record_queries() as report:
+                self.get(client, url)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'p50_ms': round(percentile(timings, 0.5), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'queries': report.count,
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    def get(self, client, url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'GET {url} returned {response.status_code}')
+        return response
+
+    def compare(self, baseline, results, threshold):
+        regressions = []
+        self.stdout.write(f'Compared with {baseline["meta"]["created"]}:')
+        for dataset, views in results['datasets'].items():
+            for view, current in views.items():
+                previous = baseline.get('datasets', {}).get(dataset, {}).get(view)
+                if previous is None:
+                    continue
+                change = current['p95_ms'] / previous['p95_ms'] - 1 if previous['p95_ms'] else 0
+                self.stdout.write(
+                    f'  {dataset}/{view:<20} p95 {previous["p95_ms"]:8.2f} -> {current["p95_ms"]:8.2f}ms '
+                    f'({change:+.0%})  queries {previous["queries"]} -> {current["queries"]}'
+                )
+                if change > threshold:
+                    regressions.append(f'{dataset}/{view}: p95 latency up {change:.0%}')
+                if current['queries'] > previous['queries']:
+                    regressions.append(
+                        f'{dataset}/{view}: {current["queries"]} queries, was {previous["queries"]}'
+                    )
+        return regressions
@@ -0,0 +1,37 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from core.exports import EXPORTS, WRITERS, export_chunks
+
+
+class Command(BaseCommand):
+    help = 'Stream a roster, grade book or attendance export to a CSV or XLSX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('export', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=sorted(WRITERS), default='csv')
+        parser.add_argument('--semester', type=int, help='Semester ID')
+        parser.add_argument('--department', help='Department code')
+        parser.add_argument('--offering', type=int, help='Course offering ID')
+        parser.add_argument('--output', '-o', help='File to write; standard output when omitted')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Rows fetched per round trip (default: EXPORT_CHUNK_SIZE)')
+
+    def handle(self, *args, **options):
+        binary = options['format'] == 'xlsx'
+        chunks = export_chunks(
+            options['export'], options['format'], chunk_size=options['chunk_size'],
+            semester=options['semester'], department=options['department'], offering=options['offering'],
+        )
+        if options['output']:
+            with open(options['output'], 'wb' if binary else 'w', newline=None if binary else '') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        elif binary:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
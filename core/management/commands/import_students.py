@@ -0,0 +1,72 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.imports import DEFAULT_BATCH_SIZE, StudentImporter, reset_link
+
+
+class Command(BaseCommand):
+    help = 'Import students from a CSV file in batches, reporting invalid rows'
+    importer_class = StudentImporter
+
+    def add_arguments(self, parser):
+        columns = ', '.join(self.importer_class.form_class.base_fields)
+        parser.add_argument('csv_file', help=f"CSV with a header row and the columns {columns}; '-' reads stdin")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Processes hashing the passwords given in the file (default: one per CPU)')
+        parser.add_argument('--reset-links', metavar='FILE',
+                            help='Write password reset links for the people imported without a password to FILE')
+        parser.add_argument('--base-url', default='',
+                            help='Site address the reset links start with, e.g. https://school.example.com')
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        links = writer = None
+        if options['reset_links']:
+            links = open(options['reset_links'], 'w', newline='')
+            writer = csv.writer(links)
+            writer.writerow(['id', 'username', 'email', 'reset_link'])
+
+        def created(profiles):
+            if writer is None:
+                return
+            writer.writerows(
+                (getattr(profile, importer.id_field), profile.user.username, profile.user.email,
+                 reset_link(profile.user, options['base_url']))
+                for profile in profiles if not profile.user.has_usable_password()
+            )
+
+        importer = self.importer_class(
+            batch_size=options['batch_size'], workers=options['workers'], on_created=created,
+        )
+        try:
+            if options['csv_file'] == '-':
+                result = self.import_csv(importer, sys.stdin)
+            else:
+                try:
+                    f = open(options['csv_file'], newline='', encoding=options['encoding'])
+                except OSError as e:
+                    raise CommandError(e)
+                with f:
+                    result = self.import_csv(importer, f)
+        finally:
+            if links:
+                links.close()
+
+        for error in result.errors:
+            self.stderr.write(str(error))
+        name = self.importer_class.model._meta.verbose_name_plural
+        style = self.style.WARNING if result.errors else self.style.SUCCESS
+        self.stdout.write(style(f'Imported {result.created} {name}, skipped {result.skipped} rows'))
+
+    def import_csv(self, importer, f):
+        try:
+            return importer.import_csv(f)
+        except UnicodeDecodeError as e:
+            # The batches read before the bad byte are already imported
+            raise CommandError(
+                f"{f.name} is not {f.encoding} text ({e}). Import it again with its "
+                "--encoding, e.g. cp1252; the rows already imported are then skipped as existing."
+            )
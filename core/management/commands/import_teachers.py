@@ -0,0 +1,8 @@
+from core.imports import TeacherImporter
+
+from .import_students import Command as ImportCommand
+
+
+class Command(ImportCommand):
+    help = 'Import teachers from a CSV file in batches, reporting invalid rows'
+    importer_class = TeacherImporter
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from core import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the trigram search index for students, teachers and courses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=sorted(search.INDEXES), action='append',
+                            help='Only rebuild this kind of document (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for kind in options['kind'] or sorted(search.INDEXES):
+            count = search.index_objects(kind, batch_size=options['batch_size'])
+            self.stdout.write(f'Indexed {count} {kind} documents')
+        search.update_statistics()
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
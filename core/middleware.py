@@ -0,0 +1,128 @@
+import logging
+from fnmatch import fnmatchcase
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .db.routers import current_state, has_replica, routing_scope
+from .queries import record_queries
+
+logger = logging.getLogger('core.queries')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def _view_names(request):
+    match = getattr(request, 'resolver_match', None)
+    names = [match.view_name] if match else []
+    names.append(request.path)
+    return names
+
+
+def get_query_budget(request):
+    """
+    The query budget of the view handling ``request``: the first
+    QUERY_BUDGETS pattern matching its URL name (e.g. ``students:*``) or
+    path wins, otherwise QUERY_BUDGET_DEFAULT.
+    """
+    names = _view_names(request)
+    for pattern, budget in settings.QUERY_BUDGETS.items():
+        if any(fnmatchcase(name, pattern) for name in names):
+            return budget
+    return settings.QUERY_BUDGET_DEFAULT
+
+
+class QueryBudgetMiddleware:
+    """
+    Record every SQL statement run while handling a request, flag repeated
+    statements (N+1 patterns) with the view or template line behind them
+    and compare the total with the URL's query budget.
+
+    Results are logged to the ``core.queries`` logger and returned in the
+    X-Query-Count, X-Query-Budget and X-Query-N-Plus-One headers. With
+    QUERY_BUDGET_STRICT, violations raise QueryBudgetExceeded instead.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as report:
+            response = self.get_response(request)
+
+        budget = get_query_budget(request)
+        repeated = report.n_plus_one()
+        response['X-Query-Count'] = str(report.count)
+        if budget is not None:
+            response['X-Query-Budget'] = str(budget)
+        if repeated:
+            response['X-Query-N-Plus-One'] = '; '.join(f'{r.origin} x{r.count}' for r in repeated)
+
+        problems = []
+        if budget is not None and report.count > budget:
+            problems.append(f'{report.count} queries exceed the budget of {budget}')
+        for r in repeated:
+            problems.append(f'N+1: {r.count} x {r.shape[:200]} at {r.origin}')
+
+        summary = f'{request.method} {request.path}: {report.count} queries in {report.duration * 1000:.1f}ms'
+        if problems:
+            logger.warning('%s\n  %s', summary, '\n  '.join(problems))
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(f'{summary}: ' + '; '.join(problems))
+        else:
+            logger.debug(summary)
+        return response
+
+
+REPLICA_PIN_COOKIE = 'db_pinned'
+
+
+class DatabaseRoutingMiddleware:
+    """
+    Open a core.db.routers routing scope per request. GET and HEAD requests
+    for views matching a REPLICA_READ_VIEWS pattern (URL names or paths,
+    shell-style wildcards) read from the replica, template rendering
+    included. A request that writes sets a cookie that keeps the
+    browser's requests on the primary for REPLICA_PIN_SECONDS.
+
+    Works in sync and async request handling alike, so the async views of
+    the ASGI profile run without a thread switch here.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not has_replica():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routing_scope(pinned=REPLICA_PIN_COOKIE in request.COOKIES) as state:
+            response = self.get_response(request)
+        return self.pin(response, state)
+
+    async def __acall__(self, request):
+        with routing_scope(pinned=REPLICA_PIN_COOKIE in request.COOKIES) as state:
+            response = await self.get_response(request)
+        return self.pin(response, state)
+
+    def pin(self, response, state):
+        if state.wrote:
+            response.set_cookie(REPLICA_PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in ('GET', 'HEAD'):
+            names = _view_names(request)
+            if any(fnmatchcase(name, pattern) for pattern in settings.REPLICA_READ_VIEWS for name in names):
+                current_state().replica = True
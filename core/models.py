@@ -37,3 +37,47 @@ class Semester(models.Model):
 
     def __str__(self):
         return f"{self.name} - {self.academic_year.year}"
+
+
+class SearchDocument(models.Model):
+    """
+    Normalized, denormalized text of one searchable object, maintained by
+    core.search. The trigrams of ``text`` are stored in SearchGram.
+    """
+    KIND_CHOICES = [
+        ('student', 'Student'),
+        ('teacher', 'Teacher'),
+        ('course', 'Course'),
+    ]
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    text = models.CharField(max_length=500)
+    gram_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['kind', 'object_id']
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.text}"
+
+
+class SearchGram(models.Model):
+    """
+    Inverted index entry: one distinct trigram of a search document. Keyed
+    by (kind, object_id) rather than a document foreign key so documents can
+    be bulk inserted without fetching their primary keys back.
+    """
+    kind = models.CharField(max_length=10)
+    object_id = models.BigIntegerField()
+    gram = models.CharField(max_length=3)
+
+    class Meta:
+        indexes = [
+            # Covers the grouped lookup, so search never reads the table itself
+            models.Index(fields=['kind', 'gram', 'object_id']),
+            models.Index(fields=['kind', 'object_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.gram!r}"
@@ -0,0 +1,89 @@
+"""
+Keyset (cursor) pagination for list views.
+
+Pages are selected with ``WHERE key > cursor ORDER BY key LIMIT n`` on a
+unique, indexed column instead of OFFSET, so fetching page 1000 costs the
+same index range scan as fetching page 1.
+"""
+from dataclasses import dataclass
+
+from django.conf import settings
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    has_next: bool
+    has_previous: bool
+    next_cursor: str = None
+    previous_cursor: str = None
+    page_size: int = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def get_page_size(request, default=None):
+    """Page size from ``?page_size=``, clamped to LIST_MAX_PAGE_SIZE."""
+    default = default or settings.LIST_PAGE_SIZE
+    try:
+        size = int(request.GET.get('page_size', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, settings.LIST_MAX_PAGE_SIZE))
+
+
+def keyset_paginate(queryset, key, page_size, after=None, before=None):
+    """
+    Return one KeysetPage of ``queryset`` ordered by the unique field ``key``.
+
+    ``after`` selects the page following that key value and ``before`` the
+    page preceding it; with neither, the first page is returned.
+    """
+    if before:
+        rows = list(queryset.filter(**{f'{key}__lt': before}).order_by(f'-{key}')[:page_size + 1])
+        has_previous, has_next = len(rows) > page_size, True
+        rows = rows[:page_size][::-1]
+    else:
+        if after:
+            queryset = queryset.filter(**{f'{key}__gt': after})
+        rows = list(queryset.order_by(key)[:page_size + 1])
+        has_next, has_previous = len(rows) > page_size, bool(after)
+        rows = rows[:page_size]
+
+    return KeysetPage(
+        object_list=rows,
+        has_next=has_next and bool(rows),
+        has_previous=has_previous and bool(rows),
+        next_cursor=getattr(rows[-1], key) if rows else None,
+        previous_cursor=getattr(rows[0], key) if rows else None,
+        page_size=page_size,
+    )
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin replacing Django's OFFSET pagination with keyset
+    pagination on ``keyset_field``, which must be unique and indexed.
+    The page is exposed to templates as ``page_obj``.
+    """
+    keyset_field = 'pk'
+
+    def get_paginate_by(self, queryset):
+        return get_page_size(self.request, self.paginate_by)
+
+    def paginate_queryset(self, queryset, page_size):
+        page = keyset_paginate(
+            queryset,
+            self.keyset_field,
+            page_size,
+            after=self.request.GET.get('after'),
+            before=self.request.GET.get('before'),
+        )
+        return None, page, page.object_list, page.has_other_pages()
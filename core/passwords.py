@@ -0,0 +1,44 @@
+"""
+Password hashing across worker processes for bulk imports.
+
+Hashers are deliberately slow, so hashing thousands of passwords is CPU
+bound and scales with processes rather than threads. Workers are handed
+make_password() itself, which needs the settings but not the app
+registry, so they start without running django.setup().
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+
+
+class PasswordHasherPool:
+    """
+    Hash lists of passwords with ``workers`` processes, started on first
+    use. With one worker, or too few passwords to be worth it, hashing
+    happens in this process. Use as a context manager to stop the workers.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = None
+
+    def hash(self, passwords):
+        passwords = list(passwords)
+        if self.workers == 1 or len(passwords) < 2:
+            return [make_password(password) for password in passwords]
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.workers)
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(self.executor.map(make_password, passwords, chunksize=chunksize))
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
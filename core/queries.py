@@ -0,0 +1,145 @@
+"""
+SQL statement recording and N+1 detection.
+
+record_queries() hooks every database connection with an execute wrapper
+and collects each statement with the view or template line that ran it.
+Statements are grouped by shape (the SQL with literals and IN lists
+collapsed), and a shape repeated at least N_PLUS_ONE_THRESHOLD times from
+the same origin is reported as an N+1 pattern. The QueryBudgetMiddleware in
+core.middleware and the test helpers in core.testing are built on this.
+"""
+import re
+import sys
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+PROJECT_ROOT = str(Path(settings.BASE_DIR).resolve())
+
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LISTS = re.compile(r'\bIN \((?!\s*SELECT)[^()]*\)', re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+
+
+def statement_shape(sql):
+    """SQL with literals, placeholders and IN lists reduced to a fixed form."""
+    sql = _STRINGS.sub('?', sql)
+    sql = _NUMBERS.sub('?', sql)
+    sql = _IN_LISTS.sub('IN (...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def _is_project_file(filename):
+    return (
+        filename.startswith(PROJECT_ROOT)
+        and 'site-packages' not in filename
+        and filename != __file__
+    )
+
+
+def find_origin(frame):
+    """
+    Return ``(code_line, template_line)`` for the innermost project frame
+    and the innermost template node being rendered above ``frame``.
+    """
+    code_line = template_line = None
+    while frame is not None and (code_line is None or template_line is None):
+        code = frame.f_code
+        if template_line is None and code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin, token = getattr(node, 'origin', None), getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                template_line = f'{origin.template_name or origin.name}:{token.lineno}'
+        if code_line is None and _is_project_file(code.co_filename):
+            path = Path(code.co_filename).relative_to(PROJECT_ROOT)
+            code_line = f'{path}:{frame.f_lineno} in {code.co_name}'
+        frame = frame.f_back
+    return code_line, template_line
+
+
+@dataclass
+class Statement:
+    alias: str
+    sql: str
+    shape: str
+    duration: float
+    code_line: str = None
+    template_line: str = None
+
+    @property
+    def origin(self):
+        return self.template_line or self.code_line or 'unknown'
+
+
+@dataclass
+class Repetition:
+    shape: str
+    origin: str
+    count: int
+    example: str
+
+
+@dataclass
+class QueryReport:
+    statements: list = field(default_factory=list)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    @property
+    def duration(self):
+        return sum(s.duration for s in self.statements)
+
+    def repeated(self, threshold=2):
+        """Statement shapes run at least ``threshold`` times from one origin, most frequent first."""
+        counts = Counter((s.shape, s.origin) for s in self.statements)
+        examples = {}
+        for s in self.statements:
+            examples.setdefault((s.shape, s.origin), s.sql)
+        return [
+            Repetition(shape=shape, origin=origin, count=count, example=examples[shape, origin])
+            for (shape, origin), count in counts.most_common()
+            if count >= threshold
+        ]
+
+    def n_plus_one(self, threshold=None):
+        return self.repeated(threshold or settings.N_PLUS_ONE_THRESHOLD)
+
+
+class QueryRecorder:
+    def __init__(self, report, alias):
+        self.report = report
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            code_line, template_line = find_origin(sys._getframe(1))
+            self.report.statements.append(Statement(
+                alias=self.alias,
+                sql=sql,
+                shape=statement_shape(sql),
+                duration=duration,
+                code_line=code_line,
+                template_line=template_line,
+            ))
+
+
+@contextmanager
+def record_queries(using=None):
+    """Record the statements run on ``using`` (default: every database) into a QueryReport."""
+    report = QueryReport()
+    with ExitStack() as stack:
+        for alias in [using] if using else connections:
+            stack.enter_context(connections[alias].execute_wrapper(QueryRecorder(report, alias)))
+        yield report
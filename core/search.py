@@ -0,0 +1,234 @@
+"""
+Trigram search over students, teachers and courses.
+
+Each searchable object has a SearchDocument holding its normalized text,
+and one SearchGram row per distinct trigram of that text. A query is
+broken into trigrams as well and answered with a single grouped lookup on
+the (kind, gram) index, so it never scans the student, teacher or user
+tables. Prefixes match because every word is padded at the front, and
+misspellings still share most of their trigrams with the right word.
+
+Documents are kept in sync by the signal handlers in core.signals. Bulk
+loads that bypass signals should call index_objects() or run the
+rebuild_search_index command.
+"""
+import re
+import unicodedata
+from dataclasses import dataclass
+
+from django.apps import apps
+from django.db import connection, transaction
+from django.db.models import Count
+
+from .models import SearchDocument, SearchGram
+
+# Minimum share of the query's trigrams a document must contain
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_LIMIT = 50
+
+
+@dataclass(frozen=True)
+class SearchIndex:
+    model: str
+    related: tuple
+    fields: tuple
+
+    def get_model(self):
+        return apps.get_model(self.model)
+
+    def get_queryset(self):
+        return self.get_model().objects.select_related(*self.related)
+
+    def document_text(self, obj):
+        values = []
+        for path in self.fields:
+            value = obj
+            for attr in path.split('__'):
+                value = getattr(value, attr, None)
+            if value:
+                values.append(str(value))
+        return ' '.join(values)
+
+
+INDEXES = {
+    'student': SearchIndex('students.Student', ('user',), ('student_id', 'user__first_name', 'user__last_name', 'user__email')),
+    'teacher': SearchIndex('teachers.Teacher', ('user',), ('teacher_id', 'user__first_name', 'user__last_name', 'user__email')),
+    'course': SearchIndex('courses.Course', (), ('code', 'name')),
+}
+
+
+@dataclass
+class SearchResult:
+    object_id: int
+    score: float
+    similarity: float
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse everything else to spaces."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'[a-z0-9]+', text.lower()))
+
+
+def tokens(text):
+    """
+    Words of the normalized text, plus the letter and digit runs of mixed
+    words so "STU000123" is also found by "000123".
+    """
+    words = normalize(text).split()
+    result = []
+    for word in words:
+        result.append(word)
+        parts = re.findall(r'[a-z]+|[0-9]+', word)
+        if len(parts) > 1:
+            result.extend(parts)
+    return result
+
+
+def trigrams(text, prefix=False):
+    """
+    Distinct trigrams of each word padded with two leading spaces and, for
+    indexed text, one trailing space. Query words are only padded at the
+    front, so they behave as prefixes; their first-letter gram is dropped
+    unless it is all they have, because it matches a large share of the
+    index while adding almost nothing to the ranking.
+    """
+    grams = set()
+    for word in tokens(text):
+        if prefix:
+            padded = f'  {word}' if len(word) == 1 else f' {word}'
+        else:
+            padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+@transaction.atomic
+def index_objects(kind, object_ids=None, batch_size=1000):
+    """
+    (Re)build the search documents of the given objects, or of every object
+    of ``kind`` when ``object_ids`` is None. Returns the number indexed.
+    """
+    index = INDEXES[kind]
+    queryset = index.get_queryset().order_by('pk')
+    if object_ids is not None:
+        object_ids = list(object_ids)
+        queryset = queryset.filter(pk__in=object_ids)
+        remove_objects(kind, object_ids)
+    else:
+        SearchGram.objects.filter(kind=kind).delete()
+        SearchDocument.objects.filter(kind=kind).delete()
+
+    documents, grams, indexed = [], [], 0
+    for obj in queryset.iterator(chunk_size=batch_size):
+        text = normalize(index.document_text(obj))
+        obj_grams = trigrams(text)
+        documents.append(SearchDocument(kind=kind, object_id=obj.pk, text=text[:500], gram_count=len(obj_grams)))
+        grams.extend(SearchGram(kind=kind, object_id=obj.pk, gram=gram) for gram in obj_grams)
+        indexed += 1
+        if len(documents) >= batch_size:
+            _flush(documents, grams, batch_size)
+            documents, grams = [], []
+    _flush(documents, grams, batch_size)
+    return indexed
+
+
+def _flush(documents, grams, batch_size):
+    SearchDocument.objects.bulk_create(documents, batch_size=batch_size)
+    SearchGram.objects.bulk_create(grams, batch_size=batch_size * 10)
+
+
+def update_statistics():
+    """
+    Refresh optimizer statistics for the index tables after a bulk load.
+    Without them the planner may pick the (kind, object_id) index and scan
+    every gram of a kind instead of the (kind, gram) posting lists.
+    """
+    tables = [SearchGram._meta.db_table, SearchDocument._meta.db_table]
+    with connection.cursor() as cursor:
+        for table in tables:
+            if connection.vendor == 'oracle':
+                cursor.execute(f"BEGIN DBMS_STATS.GATHER_TABLE_STATS(USER, '{table.upper()}'); END;")
+            elif connection.vendor in ('sqlite', 'postgresql', 'mysql'):
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
+
+
+def remove_objects(kind, object_ids):
+    SearchGram.objects.filter(kind=kind, object_id__in=object_ids).delete()
+    SearchDocument.objects.filter(kind=kind, object_id__in=object_ids).delete()
+
+
+def search(kind, query, limit=DEFAULT_LIMIT, threshold=DEFAULT_THRESHOLD):
+    """
+    Rank objects of ``kind`` against ``query``. The score is the share of
+    the query's trigrams found in a document; ties are broken by trigram
+    similarity, which favours documents without many unrelated words.
+    """
+    query_grams = trigrams(query, prefix=True)
+    if not query_grams:
+        return []
+    min_hits = max(1, int(len(query_grams) * threshold + 0.999))
+
+    candidates = list(
+        SearchGram.objects
+        .filter(kind=kind, gram__in=query_grams)
+        .values('object_id')
+        .annotate(hits=Count('*'))
+        .filter(hits__gte=min_hits)
+        .order_by('-hits', 'object_id')[:limit * 4]
+    )
+    if not candidates:
+        return []
+    gram_counts = dict(
+        SearchDocument.objects
+        .filter(kind=kind, object_id__in=[c['object_id'] for c in candidates])
+        .values_list('object_id', 'gram_count')
+    )
+
+    results = []
+    for candidate in candidates:
+        hits = candidate['hits']
+        union = len(query_grams) + gram_counts.get(candidate['object_id'], hits) - hits
+        results.append(SearchResult(
+            object_id=candidate['object_id'],
+            score=hits / len(query_grams),
+            similarity=hits / union if union else 0,
+        ))
+    results.sort(key=lambda r: (-r.score, -r.similarity, r.object_id))
+    return results[:limit]
+
+
+def search_ids(kind, query, limit=DEFAULT_LIMIT, threshold=DEFAULT_THRESHOLD):
+    """Object ids of the search results, best match first."""
+    return [result.object_id for result in search(kind, query, limit, threshold)]
+
+
+class SearchMixin:
+    """
+    ListView mixin answering ``?search=`` through the search index. Search
+    results are returned as a single page in rank order.
+    """
+    search_kind = None
+    search_limit = DEFAULT_LIMIT
+    search_ranking = None
+
+    def get_search_query(self):
+        return self.request.GET.get('search', '').strip()
+
+    def filter_search(self, queryset):
+        query = self.get_search_query()
+        if not query:
+            return queryset
+        self.search_ranking = search_ids(self.search_kind, query, limit=self.search_limit)
+        return queryset.filter(pk__in=self.search_ranking)
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.search_ranking is None:
+            return super().paginate_queryset(queryset, page_size)
+        from .pagination import KeysetPage
+
+        rank = {object_id: i for i, object_id in enumerate(self.search_ranking)}
+        rows = sorted(queryset, key=lambda obj: rank[obj.pk])
+        page = KeysetPage(object_list=rows, has_next=False, has_previous=False, page_size=len(rows))
+        return None, page, rows, False
@@ -0,0 +1,126 @@
+"""
+Signal handlers keeping the search index (core.search) in sync with the
+students, teachers, courses and their user accounts, expiring the
+cached dashboard data (core.dashboard) and bumping the versions of cached
+template fragments (core.fragments).
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from courses.models import Assignment, Course, CourseOffering, Enrollment
+from students.models import AttendanceNote, Student, StudentAttendance
+from teachers.models import Teacher
+
+from . import dashboard, fragments, search
+from .models import Department
+
+SEARCH_KINDS = {
+    Student: 'student',
+    Teacher: 'teacher',
+    Course: 'course',
+}
+
+# User fields that appear in student and teacher search documents
+INDEXED_USER_FIELDS = {'first_name', 'last_name', 'email'}
+
+# Offering fields written by the enrollment and waitlist bookkeeping of
+# courses.services; enrollments expire the dashboards themselves
+OFFERING_BOOKKEEPING_FIELDS = {
+    'active_enrollment_count', 'withdrawn_count', 'waitlist_offset', 'waitlist_length', 'updated_at',
+}
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Teacher)
+@receiver(post_save, sender=Course)
+def index_saved_object(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_objects(SEARCH_KINDS[sender], [instance.pk])
+
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Teacher)
+@receiver(post_delete, sender=Course)
+def unindex_deleted_object(sender, instance, **kwargs):
+    search.remove_objects(SEARCH_KINDS[sender], [instance.pk])
+
+
+@receiver(post_save, sender=User)
+def reindex_user_profiles(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # New users have no profile yet, and logins only touch last_login
+    if raw or created or (update_fields is not None and not INDEXED_USER_FIELDS & set(update_fields)):
+        return
+    for model, kind in [(Student, 'student'), (Teacher, 'teacher')]:
+        object_ids = list(model.objects.filter(user=instance).values_list('pk', flat=True))
+        if object_ids:
+            search.index_objects(kind, object_ids)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Teacher)
+@receiver(post_save, sender=Department)
+def expire_counters_on_create(sender, instance, created, **kwargs):
+    if created:
+        dashboard.invalidate_counters()
+
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Teacher)
+@receiver(post_delete, sender=Department)
+def expire_counters_on_delete(sender, instance, **kwargs):
+    dashboard.invalidate_counters()
+
+
+@receiver(post_save, sender=CourseOffering)
+@receiver(post_delete, sender=CourseOffering)
+def expire_offering_dashboards(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= OFFERING_BOOKKEEPING_FIELDS:
+        return
+    dashboard.invalidate_counters()
+    dashboard.invalidate_teacher(instance.teacher_id)
+    if instance.pk is not None:
+        dashboard.invalidate_student(*Enrollment.objects.filter(
+            course_offering_id=instance.pk
+        ).values_list('student_id', flat=True))
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def expire_enrollment_dashboards(sender, instance, **kwargs):
+    dashboard.invalidate_student(instance.student_id)
+    if Enrollment.course_offering.is_cached(instance):
+        dashboard.invalidate_teacher(instance.course_offering.teacher_id)
+    else:
+        dashboard.invalidate_teacher(*CourseOffering.objects.filter(
+            pk=instance.course_offering_id
+        ).values_list('teacher_id', flat=True))
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=CourseOffering)
+@receiver(post_delete, sender=CourseOffering)
+def bump_fragment_version(sender, instance, **kwargs):
+    fragments.bump(sender, instance.pk)
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def bump_enrollment_fragments(sender, instance, **kwargs):
+    fragments.bump(Student, instance.student_id)
+    fragments.bump(CourseOffering, instance.course_offering_id)
+
+
+@receiver(post_save, sender=StudentAttendance)
+@receiver(post_delete, sender=StudentAttendance)
+@receiver(post_save, sender=AttendanceNote)
+@receiver(post_delete, sender=AttendanceNote)
+def bump_attendance_fragments(sender, instance, **kwargs):
+    fragments.bump(Student, instance.student_id)
+
+
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def bump_assignment_fragments(sender, instance, **kwargs):
+    fragments.bump(CourseOffering, instance.course_offering_id)
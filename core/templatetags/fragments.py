@@ -0,0 +1,56 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Model
+
+from core import fragments
+
+register = template.Library()
+
+
+class CacheFragmentNode(template.Node):
+    def __init__(self, nodelist, fragment_name, objects):
+        self.nodelist = nodelist
+        self.fragment_name = fragment_name
+        self.objects = objects
+
+    def render(self, context):
+        objects = []
+        for var in self.objects:
+            value = var.resolve(context)
+            if isinstance(value, Model):
+                objects.append(value)
+            elif value:
+                objects.extend(value)
+        if not objects:
+            return self.nodelist.render(context)
+        key = fragments.fragment_key(self.fragment_name, objects)
+        content = cache.get(key)
+        if content is None:
+            content = self.nodelist.render(context)
+            cache.set(key, content, settings.FRAGMENT_CACHE_TIMEOUT)
+        return content
+
+
+@register.tag
+def cachefragment(parser, token):
+    """
+    Cache the enclosed template until one of the given objects changes::
+
+        {% load fragments %}
+        {% cachefragment 'roster' course offerings %}
+            ...
+        {% endcachefragment %}
+
+    Each argument is a Student, Course or CourseOffering, or a list of
+    them; see core.fragments for when their versions change.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f'{bits[0]!r} tag needs a fragment name and at least one object')
+    name = bits[1]
+    if name[0] not in '\'"' or name[-1] != name[0]:
+        raise template.TemplateSyntaxError(f'{bits[0]!r} fragment name must be a string literal')
+    nodelist = parser.parse(('endcachefragment',))
+    parser.delete_first_token()
+    return CacheFragmentNode(nodelist, name[1:-1], [parser.compile_filter(bit) for bit in bits[2:]])
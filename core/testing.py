@@ -0,0 +1,29 @@
+from contextlib import contextmanager
+
+from .queries import record_queries
+
+
+class QueryAssertionsMixin:
+    """
+    TestCase mixin asserting on the statements a block of code runs, with
+    the offending view or template lines in the failure message.
+    """
+
+    @contextmanager
+    def assertNoNPlusOne(self, threshold=None, using=None):
+        with record_queries(using) as report:
+            yield report
+        repeated = report.n_plus_one(threshold)
+        if repeated:
+            self.fail('N+1 queries detected:\n' + '\n'.join(
+                f'  {r.count} x {r.example} at {r.origin}' for r in repeated
+            ))
+
+    @contextmanager
+    def assertMaxQueries(self, budget, using=None):
+        with record_queries(using) as report:
+            yield report
+        if report.count > budget:
+            self.fail(f'{report.count} queries exceed the budget of {budget}:\n' + '\n'.join(
+                f'  {s.sql} at {s.origin}' for s in report.statements
+            ))
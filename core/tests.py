@@ -1,3 +1,781 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+import zipfile
+from datetime import date
+from pathlib import Path
+from unittest import mock
+from xml.etree import ElementTree
+
+from asgiref.sync import iscoroutinefunction
+from django.apps import apps
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.cache.backends.db import DatabaseCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.management.color import no_style
+from django.http import HttpResponse
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.template import Context, Template, TemplateSyntaxError
+from django.db.utils import ConnectionHandler
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from django.utils import timezone
+
+from core import concurrency, dashboard, exports, fragments
+from core.caches import caches_from_env
+from core.db.config import database_from_env, databases_from_env
+from core.db.pool import ConnectionPool, PoolTimeout, close_pools
+from core.db.routers import REPLICA_DB_ALIAS, current_state, replica_reads, routing_scope
+from core.imports import StudentImporter, TeacherImporter
+from core.middleware import REPLICA_PIN_COOKIE, DatabaseRoutingMiddleware, QueryBudgetExceeded
+from core.queries import record_queries, statement_shape
+from core.search import search, search_ids, trigrams
+from core.testing import QueryAssertionsMixin
+from core.views import async_home_view
+from courses.attendance import record_roll_call
+from courses.models import Assignment, Course, CourseOffering, Enrollment
+from courses.analytics import offering_grade_stats
+from courses.tests import create_catalog, create_students
+from courses.views import AsyncCourseDetailView
+from core.models import AcademicYear, Department, Semester
+from students.attendance import mark
+from students.models import Student
+from students.views import AsyncStudentDetailView
+from teachers.grading import grade_values, save_grades
+
+
+def create_student(student_id, first_name, last_name):
+    user = User.objects.create_user(student_id.lower(), first_name=first_name, last_name=last_name)
+    return Student.objects.create(
+        user=user, student_id=student_id, date_of_birth=date(2005, 1, 1), address='Dorm', phone='000'
+    )
+
+
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = create_student('STU000001', 'Alice', 'Johnson')
+        cls.alicia = create_student('STU000002', 'Alicia', 'Jonas')
+        cls.bob = create_student('STU000003', 'Bob', 'Smith')
+
+    def test_trigrams_pad_words(self):
+        self.assertEqual(trigrams('Bo'), {'  b', ' bo', 'bo '})
+        self.assertEqual(trigrams('Bo', prefix=True), {' bo'})
+        self.assertEqual(trigrams('B', prefix=True), {'  b'})
+
+    def test_prefix_and_id_matches(self):
+        self.assertCountEqual(search_ids('student', 'ali'), [self.alice.pk, self.alicia.pk])
+        self.assertEqual(search_ids('student', '000003')[0], self.bob.pk)
+
+    def test_fuzzy_match_ranks_closest_first(self):
+        results = search('student', 'alice jonson')
+        self.assertEqual(results[0].object_id, self.alice.pk)
+        self.assertGreater(results[0].score, results[-1].score)
+        self.assertEqual(search_ids('student', 'smiht'), [self.bob.pk])
+
+    def test_signals_keep_index_in_sync(self):
+        self.bob.user.last_name = 'Williams'
+        self.bob.user.save()
+        self.assertEqual(search_ids('student', 'williams'), [self.bob.pk])
+        self.assertEqual(search_ids('student', 'smith'), [])
+
+        self.bob.delete()
+        self.assertEqual(search_ids('student', 'bob'), [])
+
+        course = Course.objects.create(
+            code='CS101', name='Programming', credits=3, description='',
+            department=Department.objects.create(name='Computer Science', code='CS'),
+        )
+        self.assertEqual(search_ids('course', 'program'), [course.pk])
+
+    def test_list_view_uses_search_ranking(self):
+        self.client.force_login(self.alice.user)
+        response = self.client.get(reverse('students:student_list'), {'search': 'alicia'})
+        self.assertEqual([s.pk for s in response.context['students']], [self.alicia.pk, self.alice.pk])
+
+
+class QueryBudgetTests(QueryAssertionsMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = [create_student(f'STU{i:06d}', f'First{i}', f'Last{i}') for i in range(6)]
+        department = Department.objects.create(name='Mathematics', code='MATH')
+        for i in range(6):
+            Course.objects.create(code=f'MATH{i}', name=f'Math {i}', credits=3, description='', department=department)
+
+    def setUp(self):
+        self.client.force_login(self.students[0].user)
+
+    def test_statement_shape_collapses_literals_and_in_lists(self):
+        self.assertEqual(
+            statement_shape("SELECT * FROM t WHERE id IN (%s, %s) AND name = 'x' LIMIT 21"),
+            statement_shape("SELECT * FROM t WHERE id IN (%s) AND name = 'y' LIMIT 5"),
+        )
+
+    def test_n_plus_one_reports_template_line(self):
+        students = list(Student.objects.all())
+        template = Template('{% for student in students %}\n{{ student }}\n{% endfor %}')
+        with record_queries() as report:
+            template.render(Context({'students': students}))
+        repeated, = report.n_plus_one()
+        self.assertEqual(repeated.count, 6)
+        self.assertEqual(repeated.origin, '<unknown source>:2')
+
+    def test_course_list_has_no_n_plus_one(self):
+        with self.assertNoNPlusOne(threshold=3):
+            response = self.client.get(reverse('courses:course_list'))
+        self.assertEqual(response['X-Query-Count'], '5')
+        self.assertEqual(response['X-Query-Budget'], '10')
+        self.assertNotIn('X-Query-N-Plus-One', response)
+
+    @override_settings(QUERY_BUDGETS={'courses:*': 1}, QUERY_BUDGET_STRICT=True)
+    def test_strict_mode_raises_over_budget(self):
+        with self.assertRaises(QueryBudgetExceeded), self.assertLogs('core.queries', 'WARNING'):
+            self.client.get(reverse('courses:course_list'))
+
+
+class DashboardCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.student = create_student('STU000001', 'Alice', 'Johnson')
+        year = AcademicYear.objects.create(year='2025-2026', start_date=date(2025, 9, 1), end_date=date(2026, 8, 31))
+        semester = Semester.objects.create(
+            academic_year=year, name='FALL', is_current=True,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31)
+        )
+        course = Course.objects.create(
+            code='CS101', name='Programming', credits=3, description='',
+            department=Department.objects.create(name='Computer Science', code='CS'),
+        )
+        cls.offering = CourseOffering.objects.create(course=course, semester=semester, max_students=30)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_admin_counters_are_cached_until_data_changes(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['total_students'], 1)
+        self.assertEqual(response.context['active_courses'], 1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(dashboard.system_counters()['total_students'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_student('STU000002', 'Bob', 'Smith')
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['total_students'], 2)
+
+        metrics = dashboard.cache_metrics()
+        self.assertGreaterEqual(metrics['counters_hits'], 1)
+        self.assertGreaterEqual(metrics['counters_misses'], 2)
+
+    def test_student_courses_expire_on_enrollment(self):
+        self.assertEqual(dashboard.student_courses(self.student), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(student=self.student, course_offering=self.offering)
+        courses = dashboard.student_courses(self.student)
+        self.assertEqual([course['code'] for course in courses], ['CS101'])
+
+    def test_waitlist_bookkeeping_keeps_dashboards(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(student=self.student, course_offering=self.offering)
+        dashboard.student_courses(self.student)
+
+        self.offering.waitlist_length = 1
+        with self.assertNumQueries(1), self.captureOnCommitCallbacks(execute=True):
+            self.offering.save(update_fields=['waitlist_length', 'updated_at'])
+        with self.assertNumQueries(0):
+            dashboard.student_courses(self.student)
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.client.force_login(self.student.user)
+        self.assertEqual(self.client.get(reverse('dashboard_metrics')).status_code, 302)
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('dashboard_metrics'))
+        self.assertIn('counters_hit_ratio', response.json())
+
+
+
+class FragmentCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.offering = create_catalog()
+        cls.student = create_students(1)[0]
+        cls.enrollment = Enrollment.objects.create(
+            student=cls.student, course_offering=cls.offering, assignment_score=20
+        )
+        cls.staff = User.objects.create_user('staff', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client.force_login(self.staff)
+
+    def get(self, name, obj):
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+            response = self.client.get(reverse(name, args=[obj.pk]))
+        return response, len(queries)
+
+    def test_student_tables_are_served_from_cache_until_grades_change(self):
+        _, misses = self.get('students:student_detail', self.student)
+        second, hits = self.get('students:student_detail', self.student)
+        self.assertLess(hits, misses)
+        self.assertContains(second, '20.0/30')
+
+        # Bulk grade entry sends no signals, so it bumps the versions itself
+        originals = {self.enrollment.pk: grade_values(self.enrollment)}
+        self.enrollment.assignment_score = 25
+        with self.captureOnCommitCallbacks(execute=True):
+            save_grades([self.enrollment], originals)
+        response, queries = self.get('students:student_detail', self.student)
+        self.assertEqual(queries, misses)
+        self.assertContains(response, '25.0/30')
+
+    def test_course_rosters_change_with_enrollments(self):
+        self.get('courses:course_detail', self.offering.course)
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(student=create_student('STU000009', 'Grace', 'Hopper'),
+                                      course_offering=self.offering)
+        response, _ = self.get('courses:course_detail', self.offering.course)
+        self.assertContains(response, 'STU000009')
+
+    def test_writes_bump_versions_on_commit(self):
+        def version(obj):
+            return fragments.versions([obj])[0]
+
+        student, offering = version(self.student), version(self.offering)
+        with self.captureOnCommitCallbacks() as callbacks:
+            mark(self.student, date(2025, 9, 2), True)
+            Assignment.objects.create(course_offering=self.offering, title='Essay', description='',
+                                      due_date=timezone.now(), total_marks=10)
+        self.assertEqual((version(self.student), version(self.offering)), (student, offering))
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(version(self.student), student)
+        self.assertNotEqual(version(self.offering), offering)
+
+    def test_evicted_versions_are_not_reused(self):
+        version = fragments.versions([self.student])[0]
+        cache.delete(f'fragments:version:students.student:{self.student.pk}')
+        self.assertNotEqual(fragments.versions([self.student])[0], version)
+
+    def test_tag_needs_a_literal_name(self):
+        with self.assertRaises(TemplateSyntaxError):
+            Template('{% load fragments %}{% cachefragment name student %}{% endcachefragment %}')
+
+def read_xlsx(content):
+    namespace = {'s': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+    return [
+        [''.join(cell.itertext()) for cell in row.findall('s:c', namespace)]
+        for row in sheet.findall('s:sheetData/s:row', namespace)
+    ]
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.offering = create_catalog()
+        cls.semester = cls.offering.semester
+        cls.alice = create_student('STU000001', 'Alice', 'Jones')
+        cls.bob = create_student('STU000002', 'Bob', 'Smith')
+        Enrollment.objects.create(
+            student=cls.alice, course_offering=cls.offering,
+            assignment_score=25, midterm_score=25, final_score=35, grade='B',
+        )
+        Enrollment.objects.create(student=cls.bob, course_offering=cls.offering, withdrawn=True)
+        record_roll_call(cls.offering, date(2025, 9, 3), [cls.alice.pk], notes={cls.alice.pk: 'On time'})
+        mark(cls.alice, date(2025, 9, 1), True)
+        mark(cls.alice, date(2025, 9, 2), False, note='Sick')
+        mark(cls.bob, date(2025, 9, 5), True)
+        cls.admin = User.objects.create_user('admin', is_staff=True)
+
+    def export(self, name, **filters):
+        return list(csv.reader(''.join(exports.export_chunks(name, **filters)).splitlines()))
+
+    def test_roster_skips_withdrawn_students(self):
+        rows = self.export('roster')
+        self.assertEqual(rows[0][:4], ['Semester', 'Academic year', 'Course', 'Offering'])
+        self.assertEqual([row[5] for row in rows[1:]], ['STU000001'])
+
+    def test_gradebook_totals(self):
+        rows = self.export('gradebook')
+        header = rows[0]
+        alice = dict(zip(header, rows[1]))
+        self.assertEqual((alice['Total'], alice['Grade'], alice['Withdrawn']), ('85.0', 'B', 'False'))
+        self.assertEqual(dict(zip(header, rows[2]))['Total'], '0.0')
+
+    def test_filters(self):
+        self.assertEqual(len(self.export('gradebook', department='CS')), 3)
+        self.assertEqual(len(self.export('gradebook', department='MATH')), 1)
+        self.assertEqual(len(self.export('gradebook', semester=self.semester.pk + 1)), 1)
+        self.assertEqual(len(self.export('course_attendance', offering=self.offering.pk)), 2)
+
+    def test_daily_attendance_expands_bitmaps_with_notes(self):
+        rows = self.export('attendance')
+        self.assertEqual([row[2:4] + row[6:] for row in rows[1:]], [
+            ['2025-09-01', 'STU000001', 'True', ''],
+            ['2025-09-02', 'STU000001', 'False', 'Sick'],
+            ['2025-09-05', 'STU000002', 'True', ''],
+        ])
+        # Only students still enrolled in the offering
+        self.assertEqual(len(self.export('attendance', offering=self.offering.pk)), 3)
+
+    def test_course_attendance(self):
+        rows = self.export('course_attendance')
+        self.assertEqual(rows[1][4:], ['2025-09-03', 'STU000001', 'Alice', 'Jones', 'True', 'On time'])
+
+    @mock.patch.object(exports, 'CHUNK_SIZE', 100)
+    def test_xlsx_streams_in_chunks(self):
+        chunks = list(exports.export_chunks('gradebook', 'xlsx', chunk_size=1))
+        self.assertGreater(len(chunks), 1)
+        rows = read_xlsx(b''.join(chunks))
+        self.assertEqual(rows[0][-1], 'Withdrawn')
+        self.assertEqual(rows[1][4:7], ['STU000001', 'Alice', 'Jones'])
+        self.assertEqual(rows[1][-3:], ['85.0', 'B', '0'])
+
+    def test_view_streams_download(self):
+        url = reverse('export_data')
+        self.client.force_login(self.alice.user)
+        self.assertEqual(self.client.get(url, {'export': 'roster'}).status_code, 302)
+
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.get(url, {'export': 'roster', 'format': 'xlsx', 'department': 'CS'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="roster-cs.xlsx"')
+        self.assertEqual(len(read_xlsx(b''.join(response.streaming_content))), 2)
+
+        response = self.client.get(url, {'export': 'roster', 'format': 'pdf'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('format', response.context['form'].errors)
+
+    def test_command_writes_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'gradebook.csv')
+            call_command('export_data', 'gradebook', '--offering', str(self.offering.pk), '-o', path,
+                         stderr=io.StringIO())
+            with open(path, newline='') as f:
+                self.assertEqual(len(list(csv.reader(f))), 3)
+
+
+STUDENT_CSV = """student_id,first_name,last_name,email,department,date_of_birth,address,phone,admission_year,password
+STU100001,Ada,Lovelace,ada@example.com,CS,2005-12-10,Dorm 1,555-0101,2025-2026,
+STU100002,Alan,Turing,alan@example.com,CS,2005-06-23,Dorm 2,555-0102,,s3cret-Passw0rd
+STU100001,Grace,Hopper,grace@example.com,CS,2005-12-09,Dorm 3,555-0103,,
+STU100004,Edsger,Dijkstra,taken@example.com,CS,2005-05-11,Dorm 4,555-0104,,
+STU100005,Barbara,Liskov,barbara@example.com,CHEM,2005-11-07,Dorm 5,555-0105,,
+STU100006,Donald,Knuth,donald@example.com,CS,not a date,Dorm 6,555-0106,,
+STU100007,John,Backus,john@example.com,CS,2005-12-03,Dorm 7,555-0107,1999-2000,
+"""
+
+
+class ImportTests(QueryAssertionsMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Computer Science', code='CS')
+        AcademicYear.objects.create(
+            year='2025-2026', is_current=True, start_date=date(2025, 9, 1), end_date=date(2026, 8, 31)
+        )
+        User.objects.create_user('someone', email='taken@example.com')
+        cls.department = department
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def test_import_reports_bad_rows_and_imports_the_rest(self):
+        result = StudentImporter(workers=1).import_csv(io.StringIO(STUDENT_CSV))
+        self.assertEqual(result.created, 2)
+        self.assertEqual(
+            [(error.line, error.identifier) for error in result.errors],
+            [(4, 'STU100001'), (5, 'STU100004'), (6, 'STU100005'), (7, 'STU100006'), (8, 'STU100007')],
+        )
+        self.assertIn("student_id: 'STU100001' already exists", str(result.errors[0]))
+        self.assertIn("email: 'taken@example.com' already exists", str(result.errors[1]))
+
+        ada = Student.objects.select_related('user', 'admission_year').get(student_id='STU100001')
+        self.assertEqual(ada.user.username, 'stu100001')
+        self.assertEqual(ada.admission_year.year, '2025-2026')
+        self.assertFalse(ada.user.has_usable_password())
+        alan = User.objects.get(username='stu100002')
+        self.assertTrue(alan.check_password('s3cret-Passw0rd'))
+        # bulk_create skips the signals, so the importer indexes the new rows
+        self.assertEqual(search_ids('student', 'Lovelace'), [ada.pk])
+
+    def test_queries_do_not_grow_with_rows(self):
+        header, *rows = STUDENT_CSV.splitlines()
+        big = [header] + [
+            f'STU2{i:05d},First{i},Last{i},person{i}@example.com,CS,2005-01-01,Dorm,555,,' for i in range(60)
+        ]
+        with self.assertMaxQueries(25):
+            result = StudentImporter(workers=1, batch_size=100).import_csv(io.StringIO('\n'.join(big)))
+        self.assertEqual((result.created, result.skipped), (60, 0))
+
+    def test_passwords_are_hashed_in_a_process_pool(self):
+        rows = [
+            {'teacher_id': f'TCH90000{i}', 'first_name': 'T', 'last_name': str(i), 'email': f't{i}@example.com',
+             'department': 'CS', 'date_of_birth': '1980-01-01', 'address': 'Campus', 'phone': '555',
+             'qualification': 'Ph.D.', 'joining_date': '2020-01-01', 'password': f'password-{i}'}
+            for i in range(2)
+        ]
+        result = TeacherImporter(workers=2).import_rows(rows)
+        self.assertEqual(result.created, 2)
+        self.assertTrue(User.objects.get(username='tch900001').check_password('password-1'))
+
+    def test_command_writes_reset_links(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'students.csv')
+            links = os.path.join(directory, 'links.csv')
+            with open(source, 'w') as f:
+                f.write(STUDENT_CSV)
+            stdout, stderr = io.StringIO(), io.StringIO()
+            call_command('import_students', source, '--workers', '1', '--reset-links', links,
+                         '--base-url', 'https://school.example.com/', stdout=stdout, stderr=stderr)
+            with open(links, newline='') as f:
+                rows = list(csv.DictReader(f))
+        self.assertIn('Imported 2 students, skipped 5 rows', stdout.getvalue())
+        self.assertIn('Line 6 (STU100005): department', stderr.getvalue())
+        # Only Ada has no password
+        self.assertEqual([row['id'] for row in rows], ['STU100001'])
+        link = rows[0]['reset_link']
+        self.assertTrue(link.startswith('https://school.example.com/reset/'))
+
+        response = self.client.get(link.removeprefix('https://school.example.com'), follow=True)
+        self.assertTrue(response.context['validlink'])
+
+    def test_non_utf8_file_is_rejected(self):
+        # As saved by Excel's plain "CSV" format on Windows
+        content = STUDENT_CSV.replace('Lovelace', 'Lovel\u00e2ce').encode('cp1252')
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'students.csv')
+            with open(source, 'wb') as f:
+                f.write(content)
+            with self.assertRaisesMessage(CommandError, 'is not utf-8-sig text'):
+                call_command('import_students', source, '--workers', '1', stdout=io.StringIO())
+            call_command('import_students', source, '--workers', '1', '--encoding', 'cp1252',
+                         stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(Student.objects.get(student_id='STU100001').user.last_name, 'Lovel\u00e2ce')
+
+        self.client.force_login(self.admin)
+        upload = SimpleUploadedFile('students.csv', content, content_type='text/csv')
+        response = self.client.post(reverse('admin:students_student_import'), {'csv_file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('UTF-8', response.context['form'].errors['csv_file'][0])
+        self.assertNotIn('result', response.context)
+
+    def test_admin_import(self):
+        self.client.force_login(self.admin)
+        changelist = self.client.get(reverse('admin:students_student_changelist'))
+        url = reverse('admin:students_student_import')
+        self.assertContains(changelist, url)
+
+        upload = SimpleUploadedFile('students.csv', STUDENT_CSV.encode('utf-8-sig'), content_type='text/csv')
+        response = self.client.post(url, {'csv_file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['result'].created, 2)
+        self.assertEqual(len(response.context['links']), 1)
+        self.assertContains(response, 'unknown code')
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+    base_dir = Path('/srv/school')
+
+    def test_modes(self):
+        persistent = database_from_env({}, self.base_dir)
+        self.assertEqual(persistent['ENGINE'], 'django.db.backends.oracle')
+        self.assertEqual(persistent['CONN_MAX_AGE'], 600)
+        self.assertTrue(persistent['CONN_HEALTH_CHECKS'])
+
+        per_request = database_from_env({'DB_CONNECTION_MODE': 'per-request', 'DB_USER': 'school'}, self.base_dir)
+        self.assertEqual(per_request['CONN_MAX_AGE'], 0)
+        self.assertEqual(per_request['USER'], 'school')
+
+        pooled = database_from_env({'DB_CONNECTION_MODE': 'pooled', 'DB_POOL_MAX': '20'}, self.base_dir)
+        self.assertEqual(pooled['ENGINE'], 'core.db.backends.oracle')
+        self.assertEqual(pooled['CONN_MAX_AGE'], 0)
+        self.assertEqual(pooled['OPTIONS']['pool']['max'], 20)
+
+    def test_sqlite_stand_in(self):
+        database = database_from_env({'DB_BACKEND': 'sqlite', 'DB_CONNECT_DELAY_MS': '15'}, self.base_dir)
+        self.assertEqual(database['ENGINE'], 'core.db.backends.sqlite3')
+        self.assertEqual(database['NAME'], '/srv/school/db.sqlite3')
+        self.assertEqual(database['OPTIONS'], {'connect_delay': 15, 'query_delay': 0})
+
+    def test_replica(self):
+        self.assertEqual(set(databases_from_env({}, self.base_dir)), {'default'})
+        databases = databases_from_env({'DB_USER': 'school', 'DB_REPLICA_HOST': 'standby'}, self.base_dir)
+        self.assertEqual(databases['replica']['HOST'], 'standby')
+        self.assertEqual(databases['replica']['USER'], 'school')
+        self.assertEqual(databases['replica']['TEST']['MIRROR'], 'default')
+        self.assertEqual(databases['default']['HOST'], 'localhost')
+
+    def test_invalid_values(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, 'DB_CONNECTION_MODE'):
+            database_from_env({'DB_CONNECTION_MODE': 'pool'}, self.base_dir)
+        with self.assertRaisesMessage(ImproperlyConfigured, 'DB_POOL_MAX'):
+            database_from_env({'DB_CONNECTION_MODE': 'pooled', 'DB_POOL_MAX': 'ten'}, self.base_dir)
+
+    def test_caches(self):
+        self.assertEqual(caches_from_env({})['default'], {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'school-management',
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        })
+        database = caches_from_env({'CACHE_BACKEND': 'database', 'CACHE_MAX_ENTRIES': '5000'})['default']
+        self.assertEqual(database['LOCATION'], 'django_cache')
+        self.assertEqual(database['OPTIONS'], {'MAX_ENTRIES': 5000})
+        with self.assertRaisesMessage(ImproperlyConfigured, 'CACHE_BACKEND'):
+            caches_from_env({'CACHE_BACKEND': 'file'})
+        with mock.patch('core.caches.find_spec', return_value=None):
+            with self.assertRaisesMessage(ImproperlyConfigured, "needs 'pip install redis'"):
+                caches_from_env({'CACHE_BACKEND': 'redis'})
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def make_pool(self, **options):
+        pool = ConnectionPool(lambda: sqlite3.connect(':memory:'), ping=lambda conn: conn.execute('SELECT 1'),
+                              **options)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_connections_are_reused(self):
+        pool = self.make_pool(max=2)
+        first = pool.acquire()
+        second = pool.acquire()
+        self.assertIsNot(first, second)
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+        self.assertEqual(pool.size, 2)
+
+    def test_waits_for_a_free_connection(self):
+        pool = self.make_pool(max=1, wait_timeout=10)
+        pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+
+    def test_idle_connections_are_pinged(self):
+        pool = self.make_pool(ping_interval=0)
+        conn = pool.acquire()
+        pool.release(conn)
+        conn.close()
+        replacement = pool.acquire()
+        self.assertIsNot(replacement, conn)
+        replacement.execute('SELECT 1')
+        self.assertEqual(pool.size, 1)
+
+    def test_stand_in_backend_returns_connections_to_the_pool(self):
+        self.addCleanup(close_pools)
+        with tempfile.TemporaryDirectory() as tmp:
+            handler = ConnectionHandler({
+                'default': {'ENGINE': 'django.db.backends.dummy'},
+                'pooled': {
+                    'ENGINE': 'core.db.backends.sqlite3',
+                    'NAME': os.path.join(tmp, 'pooled.sqlite3'),
+                    'OPTIONS': {'pool': {'max': 2}},
+                },
+            })
+            connection = handler['pooled']
+            connection.ensure_connection()
+            raw = connection.connection
+            connection.close()
+            self.assertEqual(connection.pool.idle, 1)
+
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            self.assertIs(connection.connection, raw)
+            connection.close()
+            close_pools()
+
+
+def replicate():
+    """Make the replica a copy of the primary, as replication would."""
+    replica = connections[REPLICA_DB_ALIAS]
+    models = [
+        model for model in apps.get_models(include_auto_created=True)
+        if model._meta.managed and not model._meta.proxy
+    ]
+    replica.ops.execute_sql_flush(replica.ops.sql_flush(no_style(), [model._meta.db_table for model in models]))
+    for model in models:
+        model._base_manager.using(REPLICA_DB_ALIAS).bulk_create(model._base_manager.using(DEFAULT_DB_ALIAS).all())
+
+
+class ReplicaRoutingTests(TestCase):
+    """
+    The primary is the test database and the replica a second SQLite file,
+    which replicate() fills from the primary. Changes made afterwards are
+    missing from the replica, like changes the replication has not caught
+    up with.
+    """
+    # Resolved when the class is set up, after the replica is added; the
+    # test runner itself never sees it
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        connections.settings[REPLICA_DB_ALIAS] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(cls.replica_dir.name, 'replica.sqlite3'),
+        }
+        connections.configure_settings(connections.settings)
+        call_command('migrate', database=REPLICA_DB_ALIAS, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA_DB_ALIAS].close()
+        del connections[REPLICA_DB_ALIAS]
+        del connections.settings[REPLICA_DB_ALIAS]
+        cls.replica_dir.cleanup()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.offering = create_catalog()
+        cls.course = cls.offering.course
+        cls.student = create_students(1, department=cls.course.department)[0]
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        replicate()
+
+    def test_read_views_use_the_replica(self):
+        # Logged in after replicate(): the session is only on the primary
+        self.client.force_login(self.admin)
+        Course.objects.filter(pk=self.course.pk).update(name='Programming I')
+        User.objects.filter(pk=self.student.user.pk).update(first_name='Ada')
+
+        for url in (
+            reverse('courses:course_detail', args=[self.course.pk]),
+            reverse('admin:courses_course_changelist'),
+        ):
+            response = self.client.get(url)
+            self.assertContains(response, 'Introduction to Programming')
+            self.assertNotContains(response, 'Programming I<')
+        self.assertNotContains(self.client.get(reverse('students:student_detail', args=[self.student.pk])), 'Ada')
+        # Other views read from the primary
+        self.assertContains(self.client.get(reverse('courses:course_list')), 'Programming I')
+        self.assertNotIn(REPLICA_PIN_COOKIE, self.client.cookies)
+
+    def test_writes_pin_the_writer_to_the_primary(self):
+        self.client.force_login(self.student.user)
+        course_url = reverse('courses:course_detail', args=[self.course.pk])
+        self.assertEqual(self.client.get(course_url).context['enrolled_count'], 0)
+
+        response = self.client.post(reverse('students:register_course', args=[self.offering.pk]))
+        self.assertEqual(response.cookies[REPLICA_PIN_COOKIE]['max-age'], 10)
+        self.assertEqual(self.client.get(course_url).context['enrolled_count'], 1)
+
+        # Everyone else still sees the replica, which has not caught up
+        del self.client.cookies[REPLICA_PIN_COOKIE]
+        self.assertEqual(self.client.get(course_url).context['enrolled_count'], 0)
+
+    def test_reads_after_a_write_use_the_primary(self):
+        with routing_scope() as state, replica_reads():
+            self.assertEqual(router.db_for_read(Course), REPLICA_DB_ALIAS)
+            self.assertEqual(router.db_for_read(Session), DEFAULT_DB_ALIAS)
+            course = Course.objects.get(pk=self.course.pk)
+            self.assertEqual(course._state.db, REPLICA_DB_ALIAS)
+
+            course.name = 'Programming I'
+            course.save()
+            self.assertTrue(state.wrote)
+            self.assertEqual(Course.objects.get(pk=self.course.pk).name, 'Programming I')
+        self.assertEqual(router.db_for_read(Course), DEFAULT_DB_ALIAS)
+
+    def test_database_cache_stays_on_the_primary(self):
+        cache_entry = DatabaseCache('django_cache', {}).cache_model_class
+        with routing_scope() as state, replica_reads():
+            self.assertEqual(router.db_for_read(cache_entry), DEFAULT_DB_ALIAS)
+            # Storing a cache entry does not pin the request to the primary
+            self.assertEqual(router.db_for_write(cache_entry), DEFAULT_DB_ALIAS)
+            self.assertFalse(state.wrote)
+
+    def test_analytics_read_from_the_replica(self):
+        with CaptureQueriesContext(connections[REPLICA_DB_ALIAS]) as queries:
+            offering_grade_stats([self.offering.pk])
+        self.assertEqual(len(queries), 1)
+
+    async def test_middleware_handles_async_requests(self):
+        async def write(request):
+            current_state().wrote = True
+            return HttpResponse()
+
+        middleware = DatabaseRoutingMiddleware(write)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = await middleware(RequestFactory().get('/'))
+        self.assertIn(REPLICA_PIN_COOKIE, response.cookies)
+
+
+# The async variants of the ASGI profile next to the project's URLs, for AsyncViewTests
+urlpatterns = [
+    path('async/', async_home_view),
+    path('async/students/<int:pk>/', login_required(AsyncStudentDetailView.as_view())),
+    path('async/courses/<int:pk>/', login_required(AsyncCourseDetailView.as_view())),
+    path('', include('school_management.urls')),
+]
+
+
+@override_settings(ROOT_URLCONF='core.tests')
+class AsyncViewTests(TransactionTestCase):
+    """
+    The async views load data in query threads with connections of their
+    own, which only see committed rows, hence TransactionTestCase.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.offering = create_catalog()
+        self.student = create_student('STU000001', 'Ada', 'Lovelace')
+        Enrollment.objects.create(student=self.student, course_offering=self.offering, assignment_score=20)
+        self.admin = User.objects.create_superuser('admin')
+
+    async def test_student_detail(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(f'/async/students/{self.student.pk}/')
+        self.assertContains(response, 'Introduction to Programming')
+        self.assertContains(response, '20.0/30')
+        self.assertEqual(response.context['attendance_summary'][0]['course'].code, 'CS101')
+
+        # The cached fragments are served without loading their data again
+        with mock.patch.object(concurrency, 'evaluate') as evaluate:
+            response = await self.async_client.get(f'/async/students/{self.student.pk}/')
+        evaluate.assert_not_called()
+        self.assertContains(response, '20.0/30')
+
+    async def test_course_detail_shows_rosters_to_staff(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(f'/async/courses/{self.offering.course.pk}/')
+        self.assertContains(response, 'STU000001')
+        self.assertEqual(response.context['enrolled_count'], 1)
+
+    async def test_dashboard_counters(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get('/async/')
+        self.assertEqual(response.context['dashboard_type'], 'admin')
+        self.assertEqual(response.context['total_students'], 1)
+        self.assertEqual(response.context['active_courses'], 1)
+
+    async def test_login_required(self):
+        response = await self.async_client.get(f'/async/courses/{self.offering.course.pk}/')
+        self.assertEqual(response.status_code, 302)
+
+    async def test_gather_runs_in_query_threads(self):
+        main = threading.get_ident()
+        thread, count = await concurrency.gather(threading.get_ident, Student.objects.count)
+        self.assertNotEqual(thread, main)
+        self.assertEqual(count, 1)
+
+    def test_once_runs_its_function_once(self):
+        calls = []
+        first = concurrency.once(lambda: calls.append(1) or len(calls))
+        self.assertEqual((first(), first()), (1, 1))
 
-# Create your tests here.
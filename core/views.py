@@ -1,64 +1,74 @@
-from django.views.generic import TemplateView
+from django.views.generic import TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth import logout
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
-from students.models import Student
-from teachers.models import Teacher
-from courses.models import Course
-from core.models import Department
+from django.template.response import TemplateResponse
 from django.contrib.auth.decorators import login_required
+from django import forms
+from .dashboard import adashboard_context, cache_metrics, dashboard_context
+from .exports import EXPORTS, FORMATS, export_chunks
+from .models import Department, Semester
 
 def home_view(request):
-    context = {}
-    if request.user.is_authenticated:
-        user = request.user
-        if user.is_superuser:
-            # Admin sees system overview
-            context['dashboard_type'] = 'admin'
-            context['total_students'] = Student.objects.count()
-            context['total_teachers'] = Teacher.objects.count()
-            context['active_courses'] = Course.objects.filter(courseoffering__is_active=True).distinct().count()
-            context['total_departments'] = Department.objects.count()
-        elif hasattr(user, 'student'):
-            # Students see their courses and grades
-            context['dashboard_type'] = 'student'
-            student = user.student
-            context['student'] = student
-            context['enrolled_courses'] = student.enrolled_courses.all()
-        elif hasattr(user, 'teacher'):
-            # Teachers see their courses and students
-            context['dashboard_type'] = 'teacher'
-            teacher = user.teacher
-            context['teacher'] = teacher
-            context['teaching_courses'] = teacher.teaching_courses.all()
-    return render(request, 'index.html', context)
+    return render(request, 'index.html', dashboard_context(request.user))
 
 class DashboardView(LoginRequiredMixin, TemplateView):
     template_name = 'dashboard.html'
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.request.user
-        
-        if user.is_superuser:
-            context['dashboard_type'] = 'admin'
-            context['total_students'] = Student.objects.count()
-            context['total_teachers'] = Teacher.objects.count()
-            context['active_courses'] = Course.objects.filter(courseoffering__is_active=True).distinct().count()
-            context['total_departments'] = Department.objects.count()
-        elif hasattr(user, 'student'):
-            context['dashboard_type'] = 'student'
-            student = user.student
-            context['student'] = student
-            context['enrolled_courses'] = student.enrolled_courses.all()
-        elif hasattr(user, 'teacher'):
-            context['dashboard_type'] = 'teacher'
-            teacher = user.teacher
-            context['teacher'] = teacher
-            context['teaching_courses'] = teacher.teaching_courses.all()
-            
+        context.update(dashboard_context(self.request.user))
         return context
 
+# Variants for the ASGI profile (settings.ASYNC_VIEWS)
+async def async_home_view(request):
+    # The templates would load the user again
+    request.user = await request.auser()
+    return TemplateResponse(request, 'index.html', await adashboard_context(request.user))
+
+class AsyncDashboardView(View):
+    async def get(self, request):
+        # Loaded already by login_required; the templates would load it again
+        request.user = await request.auser()
+        return TemplateResponse(request, 'dashboard.html', {
+            'view': self, **await adashboard_context(request.user),
+        })
+
+@staff_member_required
+def dashboard_metrics(request):
+    return JsonResponse(cache_metrics())
+
+class ExportForm(forms.Form):
+    export = forms.ChoiceField(choices=[(name, export.title) for name, export in EXPORTS.items()])
+    format = forms.ChoiceField(choices=[('csv', 'CSV'), ('xlsx', 'Excel (XLSX)')], initial='csv')
+    semester = forms.ModelChoiceField(
+        Semester.objects.select_related('academic_year').order_by('-start_date'), required=False
+    )
+    department = forms.ModelChoiceField(Department.objects.order_by('code'), to_field_name='code', required=False)
+    offering = forms.IntegerField(min_value=1, required=False, help_text='Course offering ID')
+
+@staff_member_required
+def export_data(request):
+    """Stream the chosen export as a download; without a valid choice, show the form."""
+    form = ExportForm(request.GET or None)
+    if not form.is_valid():
+        return render(request, 'exports.html', {'form': form})
+
+    data = form.cleaned_data
+    filters = {
+        'semester': data['semester'] and data['semester'].pk,
+        'department': data['department'] and data['department'].code,
+        'offering': data['offering'],
+    }
+    export = EXPORTS[data['export']]
+    response = StreamingHttpResponse(
+        export_chunks(export.name, data['format'], **filters), content_type=FORMATS[data['format']]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export.filename(data["format"], **filters)}"'
+    return response
+
 @login_required
 def logout_view(request):
     logout(request)
@@ -1,18 +1,64 @@
+from django import forms
 from django.contrib import admin
-from .models import Course, CourseOffering, Enrollment, Assignment, AssignmentSubmission
+from .models import (
+    Course, CourseOffering, Enrollment, Assignment, AssignmentSubmission, AttendanceSession, CourseAttendance,
+    MeetingTime, WaitlistEntry,
+)
+from .prerequisites import check_new_prerequisites
+
+
+class CourseAdminForm(forms.ModelForm):
+    class Meta:
+        model = Course
+        fields = '__all__'
+
+    def clean_prerequisites(self):
+        prerequisites = self.cleaned_data['prerequisites']
+        if self.instance.pk:
+            # A new course has no dependents yet, so it cannot close a cycle
+            check_new_prerequisites(
+                [(self.instance.pk, course.pk) for course in prerequisites], replacing=self.instance.pk
+            )
+        return prerequisites
 
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
+    form = CourseAdminForm
     list_display = ('code', 'name', 'department', 'credits')
     list_filter = ('department', 'credits')
     search_fields = ('code', 'name')
     filter_horizontal = ('prerequisites',)
 
+class MeetingTimeInline(admin.TabularInline):
+    # Derived from the schedule text by courses.signals
+    model = MeetingTime
+    fields = ('weekday', 'start_time', 'end_time')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 @admin.register(CourseOffering)
 class CourseOfferingAdmin(admin.ModelAdmin):
+    inlines = [MeetingTimeInline]
     list_display = ('course', 'semester', 'teacher', 'max_students', 'is_active')
     list_filter = ('semester', 'is_active')
     search_fields = ('course__code', 'course__name', 'teacher__user__first_name')
+    # Kept current by courses.signals and courses.services; saving the values
+    # the form was loaded with would undo registrations and waitlist changes
+    # made in the meantime
+    bookkeeping_fields = ('active_enrollment_count', 'withdrawn_count', 'waitlist_offset', 'waitlist_length')
+    readonly_fields = bookkeeping_fields
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            return super().save_model(request, obj, form, change)
+        obj.save(update_fields=[
+            field.name for field in obj._meta.concrete_fields
+            if not field.primary_key and field.name not in self.bookkeeping_fields
+        ])
 
 @admin.register(Enrollment)
 class EnrollmentAdmin(admin.ModelAdmin):
@@ -31,3 +77,27 @@ class AssignmentSubmissionAdmin(admin.ModelAdmin):
     list_display = ('assignment', 'student', 'submission_date', 'marks_obtained')
     list_filter = ('submission_date',)
     search_fields = ('student__student_id', 'assignment__title')
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ('course_offering', 'student', 'sequence', 'created_at')
+    list_filter = ('course_offering__semester',)
+    search_fields = ('student__student_id', 'course_offering__course__code')
+    raw_id_fields = ('student',)
+    ordering = ('course_offering', 'sequence')
+
+    def has_add_permission(self, request):
+        # Sequence numbers are assigned by courses.services.join_waitlist
+        return False
+
+class CourseAttendanceInline(admin.TabularInline):
+    model = CourseAttendance
+    raw_id_fields = ('student',)
+    extra = 0
+
+@admin.register(AttendanceSession)
+class AttendanceSessionAdmin(admin.ModelAdmin):
+    list_display = ('course_offering', 'date', 'taken_by')
+    list_filter = ('course_offering__semester', 'date')
+    search_fields = ('course_offering__course__code',)
+    inlines = [CourseAttendanceInline]
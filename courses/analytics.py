@@ -0,0 +1,104 @@
+"""
+Grade analytics for course offerings.
+
+Scores for any number of offerings are loaded with one query into NumPy
+arrays, and the per-offering statistics are computed with grouped array
+operations rather than an aggregate query per offering. The query reads
+from the replica database when one is configured (core.db.routers).
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from core.db.routers import replica_reads
+
+from .models import Enrollment
+
+LETTER_GRADES = ['A', 'B', 'C', 'D', 'F']
+GRADE_POINTS = np.array([4.0, 3.0, 2.0, 1.0, 0.0])
+PASSING = np.array([True, True, True, True, False])
+
+
+@dataclass
+class GradeStats:
+    total_students: int = 0
+    scored_students: int = 0
+    mean_score: float = None
+    median_score: float = None
+    std_score: float = None
+    average_grade_points: float = None
+    pass_rate: float = None
+    distribution: dict = field(default_factory=lambda: dict.fromkeys(LETTER_GRADES, 0))
+
+
+def offering_grade_stats(offering_ids):
+    """
+    Return ``{offering_id: GradeStats}`` for the given offerings, computed
+    over active (non-withdrawn) enrollments. Scores are the total of the
+    assignment, midterm and final scores; rows missing any score are left
+    out of the score statistics, and only A-F grades count towards the
+    distribution, grade point average and pass rate.
+    """
+    offering_ids = list(offering_ids)
+    stats = {offering_id: GradeStats() for offering_id in offering_ids}
+    with replica_reads():
+        rows = list(
+            Enrollment.objects
+            .filter(course_offering_id__in=offering_ids, withdrawn=False)
+            .values_list('course_offering_id', 'assignment_score', 'midterm_score', 'final_score', 'grade')
+        )
+    if not rows:
+        return stats
+
+    ids = np.array([row[0] for row in rows])
+    scores = np.array([row[1:4] for row in rows], dtype=float)  # None becomes NaN
+    letter_index = {letter: i for i, letter in enumerate(LETTER_GRADES)}
+    grades = np.array([letter_index.get(row[4], -1) for row in rows])
+
+    groups, group_of = np.unique(ids, return_inverse=True)
+    n_groups = len(groups)
+    totals = scores.sum(axis=1)
+    scored = ~np.isnan(totals)
+
+    students = np.bincount(group_of, minlength=n_groups)
+    n_scored = np.bincount(group_of, weights=scored, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sums = np.bincount(group_of, weights=np.where(scored, totals, 0), minlength=n_groups)
+        squares = np.bincount(group_of, weights=np.where(scored, totals ** 2, 0), minlength=n_groups)
+        means = sums / n_scored
+        stds = np.sqrt(np.maximum(squares / n_scored - means ** 2, 0))
+
+    # Medians: sort scored totals by (group, total) and pick the middle of each run
+    order = np.lexsort((totals[scored], group_of[scored]))
+    sorted_totals = totals[scored][order]
+    counts = n_scored.astype(int)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    has_scores = counts > 0
+    lower = sorted_totals[(starts + (counts - 1) // 2)[has_scores]]
+    upper = sorted_totals[(starts + counts // 2)[has_scores]]
+    medians = np.full(n_groups, np.nan)
+    medians[has_scores] = (lower + upper) / 2
+
+    graded = grades >= 0
+    histogram = np.zeros((n_groups, len(LETTER_GRADES)), dtype=int)
+    np.add.at(histogram, (group_of[graded], grades[graded]), 1)
+    n_graded = histogram.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        grade_points = histogram @ GRADE_POINTS / n_graded
+        pass_rates = histogram[:, PASSING].sum(axis=1) / n_graded * 100
+
+    def value(array, i):
+        return None if np.isnan(array[i]) else round(float(array[i]), 2)
+
+    for i, offering_id in enumerate(groups.tolist()):
+        stats[offering_id] = GradeStats(
+            total_students=int(students[i]),
+            scored_students=int(counts[i]),
+            mean_score=value(means, i),
+            median_score=value(medians, i),
+            std_score=value(stds, i),
+            average_grade_points=value(grade_points, i),
+            pass_rate=value(pass_rates, i),
+            distribution=dict(zip(LETTER_GRADES, histogram[i].tolist())),
+        )
+    return stats
@@ -0,0 +1,88 @@
+"""
+Course-scoped attendance.
+
+A teacher calls the roll for a course offering once per class meeting:
+record_roll_call() writes an AttendanceSession and one CourseAttendance
+row per enrolled student in a single bulk statement, replacing the marks
+of an earlier roll call for the same day. Per-course rates for a student
+come from one grouped aggregate over all their offerings.
+
+This is separate from the daily, school-wide attendance bitmaps in
+students.attendance.
+"""
+from django.db import connection, transaction
+from django.db.models import Count, Q
+
+from core import fragments
+from students.attendance import AttendanceStats
+from students.models import Student
+
+from .models import AttendanceSession, CourseAttendance, Enrollment
+
+
+@transaction.atomic
+def record_roll_call(offering, day, present_ids, notes=None, taken_by=None, student_ids=None):
+    """
+    Mark every active enrollment of ``offering`` on ``day``: students whose
+    pk is in ``present_ids`` are present, everyone else absent. ``notes``
+    maps student pks to a note. Callers that already loaded the roster can
+    pass its pks as ``student_ids``. Returns the AttendanceSession.
+    """
+    present_ids = set(present_ids)
+    notes = notes or {}
+    session, created = AttendanceSession.objects.get_or_create(
+        course_offering=offering, date=day, defaults={'taken_by': taken_by}
+    )
+    if not created and taken_by is not None:
+        session.taken_by = taken_by
+        session.save(update_fields=['taken_by', 'updated_at'])
+
+    if student_ids is None:
+        student_ids = Enrollment.objects.filter(
+            course_offering=offering, withdrawn=False
+        ).values_list('student_id', flat=True)
+    records = [
+        CourseAttendance(
+            session=session, student_id=student_id,
+            is_present=student_id in present_ids, note=notes.get(student_id, ''),
+        )
+        for student_id in student_ids
+    ]
+
+    if connection.features.supports_update_conflicts_with_target:
+        CourseAttendance.objects.bulk_create(
+            records, batch_size=500, update_conflicts=True,
+            unique_fields=['session', 'student'], update_fields=['is_present', 'note'],
+        )
+        if not created:
+            # Students who withdrew since an earlier roll call for this day
+            CourseAttendance.objects.filter(session=session).exclude(
+                student_id__in=[record.student_id for record in records]
+            ).delete()
+    else:
+        # No ON CONFLICT (Oracle): the roll call covers the whole section,
+        # so replace the session's rows instead
+        CourseAttendance.objects.filter(session=session).delete()
+        CourseAttendance.objects.bulk_create(records, batch_size=500)
+    # Bulk writes send no signals
+    fragments.bump(Student, *(record.student_id for record in records))
+    return session
+
+
+def course_attendance_rates(student, offering_ids):
+    """
+    Return ``{offering_id: AttendanceStats}`` for ``student`` in the given
+    offerings, from one grouped query.
+    """
+    offering_ids = list(offering_ids)
+    stats = {offering_id: AttendanceStats() for offering_id in offering_ids}
+    rows = (
+        CourseAttendance.objects
+        .filter(student=student, session__course_offering_id__in=offering_ids)
+        .order_by()
+        .values('session__course_offering_id')
+        .annotate(recorded=Count('pk'), present=Count('pk', filter=Q(is_present=True)))
+    )
+    for row in rows:
+        stats[row['session__course_offering_id']] = AttendanceStats(row['present'], row['recorded'])
+    return stats
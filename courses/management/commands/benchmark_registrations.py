@@ -0,0 +1,111 @@
+import threading
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.models import AcademicYear, Department, Semester
+from courses.models import Course, CourseOffering, Enrollment
+from courses.services import CourseFullError, register_student
+from students.models import Student
+from teachers.models import Teacher
+
+
+def race_registrations(offering, students, threads):
+    """
+    Register ``students`` for ``offering`` from ``threads`` connections at
+    once. Returns one outcome per student (True if registered, False if the
+    offering was full) and the elapsed seconds.
+    """
+    outcomes = []
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(batch):
+        barrier.wait()
+        try:
+            for student in batch:
+                try:
+                    register_student(student, offering.pk)
+                    outcomes.append(True)
+                except CourseFullError:
+                    outcomes.append(False)
+        finally:
+            connection.close()
+
+    workers = [
+        threading.Thread(target=worker, args=(students[i::threads],))
+        for i in range(threads)
+    ]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return outcomes, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        'Race concurrent registrations for one course offering in a throwaway test database '
+        'and report registrations per second'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent registering connections')
+        parser.add_argument('--students', type=int, default=400, help='Registration attempts in total')
+        parser.add_argument('--seats', type=int, default=100, help='max_students of the offering')
+
+    def handle(self, *args, **options):
+        if not connection.features.has_select_for_update:
+            raise CommandError(
+                f'{connection.vendor} has no row locks; run this against Oracle, not the SQLite stand-in'
+            )
+        # Everything happens in a separate test database, never the real one
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            offering = self.seed(options['seats'])
+            students = [
+                Student.objects.create(
+                    user=User.objects.create_user(f'bench{i}'), student_id=f'BEN{i:06d}',
+                    date_of_birth=date(2005, 1, 1), address='Dorm', phone='000'
+                )
+                for i in range(options['students'])
+            ]
+            outcomes, elapsed = race_registrations(offering, students, options['threads'])
+            enrolled = Enrollment.objects.filter(course_offering=offering, withdrawn=False).count()
+            capacity = offering.max_students * 12 // 10
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(
+            f'{len(outcomes)} attempts from {options["threads"]} threads in {elapsed:.2f}s: '
+            f'{outcomes.count(True)} registered, {outcomes.count(False)} turned away '
+            f'({len(outcomes) / elapsed:.1f} registrations/s)'
+        )
+        if enrolled > capacity:
+            raise CommandError(f'Overbooked: {enrolled} enrollments for {capacity} places')
+
+    def seed(self, seats):
+        department = Department.objects.create(name='Benchmark', code='BEN')
+        year = AcademicYear.objects.create(
+            year='2025-2026', is_current=True,
+            start_date=date(2025, 9, 1), end_date=date(2026, 8, 31)
+        )
+        semester = Semester.objects.create(
+            academic_year=year, name='FALL', is_current=True,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31)
+        )
+        teacher = Teacher.objects.create(
+            user=User.objects.create_user('bench-teacher'), teacher_id='BEN001', department=department,
+            date_of_birth=date(1980, 1, 1), address='Campus', phone='000',
+            qualification='Ph.D.', joining_date=date(2015, 1, 1)
+        )
+        course = Course.objects.create(
+            code='BEN101', name='Benchmark', department=department, credits=3, description='Benchmark'
+        )
+        return CourseOffering.objects.create(
+            course=course, semester=semester, teacher=teacher, max_students=seats
+        )
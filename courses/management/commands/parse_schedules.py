@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from courses.models import CourseOffering, Enrollment, MeetingTime
+from courses.schedule import ScheduleParseError, invalidate_timetables, meeting_times, parse_schedule
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the structured meeting times of course offerings from their schedule text'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of course offerings rewritten per transaction')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report schedules that cannot be parsed')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        offerings = (
+            CourseOffering.objects.exclude(schedule__isnull=True).exclude(schedule='')
+            .order_by('pk').values_list('pk', 'course__code', 'schedule')
+        )
+
+        parsed, failed = {}, 0
+        for pk, code, schedule in offerings:
+            try:
+                parsed[pk] = parse_schedule(schedule)
+            except ScheduleParseError as e:
+                failed += 1
+                self.stdout.write(self.style.WARNING(f'{code} (offering {pk}): {schedule!r}: {e}'))
+
+        if not options['dry_run']:
+            ids = list(parsed)
+            for start in range(0, len(ids), batch_size):
+                batch = ids[start:start + batch_size]
+                with transaction.atomic():
+                    MeetingTime.objects.filter(course_offering_id__in=batch).delete()
+                    MeetingTime.objects.bulk_create(
+                        [meeting for pk in batch for meeting in meeting_times(pk, parsed[pk])],
+                        batch_size=batch_size,
+                    )
+                    # Bulk writes skip the signals that drop cached timetables
+                    invalidate_timetables(*Enrollment.objects.filter(
+                        course_offering_id__in=batch, withdrawn=False
+                    ).values_list('student_id', flat=True).distinct())
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(parsed)} schedules parsed, {failed} could not be parsed'
+        ))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+from courses.models import CourseOffering
+
+
+class Command(BaseCommand):
+    help = 'Repair drift in the denormalized enrollment counters on course offerings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of course offerings updated per statement')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drifted offerings without updating them')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        drifted_ids = list(
+            CourseOffering.objects.with_enrollment_totals()
+            .filter(
+                ~Q(active_enrollment_count=F('actual_active_count')) |
+                ~Q(withdrawn_count=F('actual_withdrawn_count'))
+            )
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(drifted_ids)} course offerings have drifted counters')
+            return
+
+        for start in range(0, len(drifted_ids), batch_size):
+            with transaction.atomic():
+                CourseOffering.objects.filter(
+                    pk__in=drifted_ids[start:start + batch_size]
+                ).recount_enrollments()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Recounted enrollments for {len(drifted_ids)} course offerings'
+        ))
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.4 on 2026-10-18 01:32
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    CourseOffering = apps.get_model('courses', 'CourseOffering')
+    Enrollment = apps.get_model('courses', 'Enrollment')
+
+    def count_enrollments(withdrawn):
+        return Coalesce(Subquery(
+            Enrollment.objects.filter(
+                course_offering=OuterRef('pk'),
+                withdrawn=withdrawn
+            ).order_by().values('course_offering').annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField()
+        ), Value(0))
+
+    CourseOffering.objects.update(
+        active_enrollment_count=count_enrollments(False),
+        withdrawn_count=count_enrollments(True),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_courseoffering_material_courseoffering_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courseoffering',
+            name='active_enrollment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='courseoffering',
+            name='withdrawn_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
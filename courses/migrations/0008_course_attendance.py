@@ -0,0 +1,44 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_courseoffering_enrollment_counters'),
+        ('students', '0005_term_attendance_bitmaps'),
+        ('teachers', '0002_alter_teacher_address_alter_teacherattendance_note'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course_offering', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_sessions', to='courses.courseoffering')),
+                ('taken_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='teachers.teacher')),
+            ],
+            options={
+                'unique_together': {('course_offering', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CourseAttendance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_present', models.BooleanField(default=True)),
+                ('note', models.CharField(blank=True, max_length=500)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='records', to='courses.attendancesession')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_attendance', to='students.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['student', 'is_present'], name='courses_cou_student_c15de7_idx')],
+                'unique_together': {('session', 'student')},
+            },
+        ),
+    ]
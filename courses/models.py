@@ -1,4 +1,8 @@
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Case, Count, Exists, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Floor
+from django.db.models.lookups import GreaterThanOrEqual
 from core.models import Department, Semester
 from teachers.models import Teacher
 from students.models import Student
@@ -31,6 +35,89 @@ class Course(models.Model):
 
 # ... rest of your models unchanged ...
 
+class CourseOfferingQuerySet(models.QuerySet):
+    def with_capacity(self, student=None):
+        """
+        Annotate capacity information so a whole listing is resolved in one
+        SQL statement instead of several COUNT queries per offering.
+
+        Adds ``current_enrollment_count``, ``effective_capacity``,
+        ``available_slots`` and ``is_at_capacity``; when ``student`` is given,
+        also ``is_registered`` and ``waitlist_position`` (None when the
+        student is not waitlisted). The model's capacity methods reuse these values.
+        Enrollment counts come from the denormalized ``active_enrollment_count``.
+        """
+        queryset = self.annotate(
+            current_enrollment_count=F('active_enrollment_count'),
+        ).annotate(
+            # 90%/120% overflow rule, see CourseOffering.get_effective_capacity()
+            effective_capacity=Case(
+                When(
+                    GreaterThanOrEqual(F('current_enrollment_count') * 10, F('max_students') * 9),
+                    then=Floor(F('max_students') * 12 / 10, output_field=IntegerField()),
+                ),
+                default=F('max_students'),
+                output_field=IntegerField(),
+            ),
+        ).annotate(
+            available_slots=F('effective_capacity') - F('current_enrollment_count'),
+            is_at_capacity=Case(
+                When(
+                    GreaterThanOrEqual(F('current_enrollment_count'), F('effective_capacity')),
+                    then=Value(True),
+                ),
+                default=Value(False),
+                output_field=models.BooleanField(),
+            ),
+        )
+
+        if student is not None:
+            queryset = queryset.annotate(
+                is_registered=Exists(Enrollment.objects.filter(
+                    course_offering=OuterRef('pk'),
+                    student=student,
+                    withdrawn=False
+                )),
+                waitlist_position=Subquery(
+                    WaitlistEntry.objects.filter(
+                        course_offering=OuterRef('pk'),
+                        student=student
+                    ).values('sequence')
+                ) - F('waitlist_offset'),
+            )
+        return queryset
+
+    def with_enrollment_totals(self):
+        """
+        Annotate ``actual_active_count`` and ``actual_withdrawn_count`` counted
+        from the enrollment table, for checking the denormalized counters.
+        """
+        return self.annotate(
+            actual_active_count=_count_enrollments(withdrawn=False),
+            actual_withdrawn_count=_count_enrollments(withdrawn=True),
+        )
+
+    def recount_enrollments(self):
+        """
+        Rewrite the denormalized enrollment counters from the enrollment table
+        in a single UPDATE. Use after bulk operations that bypass signals.
+        """
+        return self.update(
+            active_enrollment_count=_count_enrollments(withdrawn=False),
+            withdrawn_count=_count_enrollments(withdrawn=True),
+        )
+
+
+def _count_enrollments(withdrawn):
+    return Coalesce(Subquery(
+        Enrollment.objects.filter(
+            course_offering=OuterRef('pk'),
+            withdrawn=withdrawn
+        ).order_by().values('course_offering').annotate(total=Count('pk')).values('total'),
+        output_field=IntegerField()
+    ), Value(0))
+
+
 class CourseOffering(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, db_index=True)
     semester = models.ForeignKey(Semester, on_delete=models.CASCADE, db_index=True)
@@ -43,6 +130,16 @@ class CourseOffering(models.Model):
     # New fields
     schedule = models.CharField(max_length=255, blank=True, null=True)
     material = models.TextField(blank=True, null=True)
+    # Denormalized enrollment counters, maintained by courses.signals
+    active_enrollment_count = models.PositiveIntegerField(default=0)
+    withdrawn_count = models.PositiveIntegerField(default=0)
+    # Waitlist bookkeeping, maintained by courses.services: entries are
+    # numbered consecutively from waitlist_offset + 1, so an entry's position
+    # is its sequence minus waitlist_offset
+    waitlist_offset = models.PositiveIntegerField(default=0)
+    waitlist_length = models.PositiveIntegerField(default=0)
+
+    objects = CourseOfferingQuerySet.as_manager()
 
     class Meta:
         unique_together = ['course', 'semester', 'teacher']
@@ -54,19 +151,38 @@ class CourseOffering(models.Model):
     def __str__(self):
         return f"{self.course.code} - {self.semester}"
 
+    def clean(self):
+        from .schedule import ScheduleParseError, parse_schedule
+        try:
+            parse_schedule(self.schedule)
+        except ScheduleParseError as e:
+            raise ValidationError({'schedule': f"{e}. Use e.g. \"Mon/Wed 9:00-10:30; Fri 14:00-15:00\" or \"TBA\"."})
+
+    # The capacity methods below reuse values annotated by
+    # CourseOfferingQuerySet.with_capacity() when they are present.
+
     def get_current_enrollment_count(self):
-        return self.enrollment_set.filter(withdrawn=False).count()
+        if hasattr(self, 'current_enrollment_count'):
+            return self.current_enrollment_count
+        return self.active_enrollment_count
 
     def get_available_slots(self):
+        if hasattr(self, 'available_slots'):
+            return self.available_slots
         return self.get_effective_capacity() - self.get_current_enrollment_count()
 
     def get_effective_capacity(self):
+        if hasattr(self, 'effective_capacity'):
+            return self.effective_capacity
         current_enrollment = self.get_current_enrollment_count()
-        if current_enrollment >= 0.9 * self.max_students:
-            return int(self.max_students * 1.2)
+        # Integer arithmetic keeps this identical to the SQL annotation
+        if current_enrollment * 10 >= self.max_students * 9:
+            return self.max_students * 12 // 10
         return self.max_students
 
     def is_full(self):
+        if hasattr(self, 'is_at_capacity'):
+            return self.is_at_capacity
         return self.get_current_enrollment_count() >= self.get_effective_capacity()
 
 
@@ -90,6 +206,21 @@ class Enrollment(models.Model):
     grade = models.CharField(max_length=1, choices=GRADE_CHOICES, blank=True, null=True, db_index=True)
     withdrawn = models.BooleanField(default=False, db_index=True)
     withdrawal_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored state so signal handlers can tell what changed
+        instance._loaded_state = instance.tracked_state()
+        return instance
+
+    def tracked_state(self):
+        return (
+            self.__dict__.get('course_offering_id'),
+            self.__dict__.get('withdrawn'),
+            self.__dict__.get('grade'),
+        )
 
     def calculate_total_score(self):
         total = 0
@@ -138,3 +269,87 @@ class AssignmentSubmission(models.Model):
 
     def __str__(self):
         return f"{self.student.student_id} - {self.assignment.title}"
+
+
+class MeetingTime(models.Model):
+    """
+    One weekly meeting of a course offering, parsed from its free-text
+    ``schedule`` by courses.schedule.
+    """
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday'),
+    ]
+
+    course_offering = models.ForeignKey(CourseOffering, on_delete=models.CASCADE, related_name='meetings')
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+
+    class Meta:
+        ordering = ['weekday', 'start_time']
+        indexes = [
+            models.Index(fields=['course_offering', 'weekday']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_weekday_display()} {self.start_time:%H:%M}-{self.end_time:%H:%M}"
+
+
+class WaitlistEntry(models.Model):
+    """A student waiting for a seat in a full course offering, first come first served."""
+    course_offering = models.ForeignKey(CourseOffering, on_delete=models.CASCADE, related_name='waitlist')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='waitlist_entries')
+    sequence = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['course_offering', 'student']
+        indexes = [
+            models.Index(fields=['course_offering', 'sequence']),
+        ]
+
+    def __str__(self):
+        return f"{self.student.student_id} waiting for {self.course_offering}"
+
+    def get_position(self):
+        """1-based place in the queue, without counting the entries ahead."""
+        if hasattr(self, 'waitlist_position'):
+            return self.waitlist_position
+        return self.sequence - self.course_offering.waitlist_offset
+
+
+class AttendanceSession(models.Model):
+    """One class meeting of a course offering at which the roll was called."""
+    course_offering = models.ForeignKey(CourseOffering, on_delete=models.CASCADE, related_name='attendance_sessions')
+    date = models.DateField()
+    taken_by = models.ForeignKey(Teacher, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['course_offering', 'date']
+
+    def __str__(self):
+        return f"{self.course_offering.course.code} - {self.date}"
+
+
+class CourseAttendance(models.Model):
+    session = models.ForeignKey(AttendanceSession, on_delete=models.CASCADE, related_name='records')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='course_attendance')
+    is_present = models.BooleanField(default=True)
+    note = models.CharField(max_length=500, blank=True)
+
+    class Meta:
+        unique_together = ['session', 'student']
+        indexes = [
+            models.Index(fields=['student', 'is_present']),
+        ]
+
+    def __str__(self):
+        return f"{self.student.student_id} - {self.session}: {'present' if self.is_present else 'absent'}"
@@ -0,0 +1,220 @@
+"""
+Course prerequisite graph.
+
+The whole prerequisite DAG is loaded with two queries and its transitive
+closure is computed once, so checking a student against a course is a
+set difference rather than a query per hop. Each process keeps the built
+graph until the version token in the shared cache (see core.caches)
+changes; signal handlers in courses.signals replace the token when
+prerequisites or courses change, once the transaction commits. The token
+also expires after PREREQUISITE_GRAPH_TIMEOUT, which bounds how long a
+change that bypasses the signals, or a lost invalidation, goes unseen.
+
+A student satisfies a course when every course in its closure is either
+completed (a passing grade) or implied by a completed course, so passing
+an advanced course also covers the prerequisites it required.
+"""
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+
+from students.transcripts import PASSING_GRADES
+
+from .models import Course, Enrollment
+
+GRAPH_VERSION_KEY = 'courses:prerequisites:version'
+
+Prerequisite = Course.prerequisites.through
+
+_built = (None, None)
+
+
+class PrerequisiteCycleError(ValidationError):
+    pass
+
+
+class PrerequisiteGraph:
+    """
+    ``edges`` are ``(course_id, prerequisite_id)`` pairs and ``courses``
+    maps the ids in them to ``(code, name)``. Raises PrerequisiteCycleError
+    when the edges contain a cycle.
+    """
+
+    def __init__(self, edges, courses):
+        self.direct = defaultdict(set)
+        for course_id, prerequisite_id in edges:
+            self.direct[course_id].add(prerequisite_id)
+        self.courses = courses
+        self.closure = self._close()
+
+    def _close(self):
+        nodes = set(self.direct) | {p for prerequisites in self.direct.values() for p in prerequisites}
+        dependents = defaultdict(list)
+        waiting = {}
+        for course_id, prerequisites in self.direct.items():
+            waiting[course_id] = len(prerequisites)
+            for prerequisite_id in prerequisites:
+                dependents[prerequisite_id].append(course_id)
+
+        # Kahn's algorithm: a course is closed once all its prerequisites are
+        ready = [node for node in nodes if not waiting.get(node)]
+        closure = {}
+        while ready:
+            node = ready.pop()
+            closed = set()
+            for prerequisite_id in self.direct.get(node, ()):
+                closed.add(prerequisite_id)
+                closed |= closure[prerequisite_id]
+            closure[node] = frozenset(closed)
+            for dependent in dependents[node]:
+                waiting[dependent] -= 1
+                if not waiting[dependent]:
+                    ready.append(dependent)
+
+        if len(closure) < len(nodes):
+            raise PrerequisiteCycleError(
+                f"Prerequisite cycle: {' -> '.join(self.code(pk) for pk in self._cycle(nodes - set(closure)))}"
+            )
+        return closure
+
+    def _cycle(self, unclosed):
+        # Every unclosed course waits on an unclosed prerequisite, so
+        # following those edges from any of them must come back round
+        path, seen = [], {}
+        node = min(unclosed)
+        while node not in seen:
+            seen[node] = len(path)
+            path.append(node)
+            node = min(p for p in self.direct[node] if p in unclosed)
+        return path[seen[node]:] + [node]
+
+    def code(self, course_id):
+        return self.courses.get(course_id, (str(course_id), ''))[0]
+
+    def prerequisites(self, course_id):
+        """Every course required, directly or not, before ``course_id``."""
+        return self.closure.get(course_id, frozenset())
+
+    def direct_prerequisites(self, course_id):
+        """``(code, name)`` of the direct prerequisites of ``course_id``, by code."""
+        return sorted(self.courses[pk] for pk in self.direct.get(course_id, ()))
+
+    def satisfied(self, completed):
+        """The completed courses plus every course they imply."""
+        satisfied = set(completed)
+        for course_id in completed:
+            satisfied |= self.closure.get(course_id, frozenset())
+        return satisfied
+
+    def missing(self, course_id, satisfied):
+        """Codes of the prerequisites of ``course_id`` not in ``satisfied``, sorted."""
+        return sorted(self.code(pk) for pk in self.prerequisites(course_id) - satisfied)
+
+    def ineligible(self, satisfied):
+        """Ids of the courses with a prerequisite outside ``satisfied``."""
+        return {course_id for course_id, closed in self.closure.items() if not closed <= satisfied}
+
+
+def load_graph(extra_edges=(), replacing=None):
+    """
+    Build the graph from the database, plus ``extra_edges`` not yet saved.
+    The saved prerequisites of course ``replacing`` are left out.
+    """
+    edges = list(Prerequisite.objects.exclude(from_course_id=replacing).values_list('from_course_id', 'to_course_id'))
+    extra_edges = list(extra_edges)
+    ids = {pk for edge in extra_edges for pk in edge}
+    courses = Course.objects.filter(
+        Q(pk__in=Prerequisite.objects.values('from_course_id'))
+        | Q(pk__in=Prerequisite.objects.values('to_course_id'))
+        | Q(pk__in=ids)
+    )
+    return PrerequisiteGraph(
+        edges + extra_edges,
+        {pk: (code, name) for pk, code, name in courses.values_list('pk', 'code', 'name')},
+    )
+
+
+def get_graph():
+    """The process's graph, rebuilt when the cached version token has changed."""
+    global _built
+    version = cache.get_or_set(GRAPH_VERSION_KEY, lambda: uuid.uuid4().hex, settings.PREREQUISITE_GRAPH_TIMEOUT)
+    built_version, graph = _built
+    if built_version != version:
+        graph = load_graph()
+        _built = (version, graph)
+    return graph
+
+
+def invalidate_graph():
+    transaction.on_commit(
+        lambda: cache.set(GRAPH_VERSION_KEY, uuid.uuid4().hex, settings.PREREQUISITE_GRAPH_TIMEOUT)
+    )
+
+
+def check_new_prerequisites(edges, replacing=None):
+    """
+    Raise PrerequisiteCycleError if adding the ``(course_id, prerequisite_id)``
+    edges closes a cycle, optionally in place of the saved prerequisites of
+    course ``replacing``.
+    """
+    edges = list(edges)
+    for course_id, prerequisite_id in edges:
+        if course_id == prerequisite_id:
+            code, _ = Course.objects.values_list('code', 'name').get(pk=course_id)
+            raise PrerequisiteCycleError(f"{code} cannot be a prerequisite of itself.")
+    # Built from the database rather than the cached graph, so the check sees
+    # edges added earlier in the same transaction
+    load_graph(edges, replacing)
+
+
+def completed_course_ids(student):
+    return set(
+        Enrollment.objects.filter(
+            student=student, withdrawn=False, grade__in=PASSING_GRADES
+        ).values_list('course_offering__course_id', flat=True)
+    )
+
+
+def missing_prerequisites(student, course_id):
+    """Codes of the prerequisites ``student`` still needs for ``course_id``; no query when it has none."""
+    graph = get_graph()
+    if not graph.prerequisites(course_id):
+        return []
+    return graph.missing(course_id, graph.satisfied(completed_course_ids(student)))
+
+
+class Eligibility:
+    """
+    A student's standing against the prerequisite graph, loaded with one
+    query for their completed courses, for checking many courses at once.
+    """
+
+    def __init__(self, student):
+        self.graph = get_graph()
+        self.satisfied = self.graph.satisfied(completed_course_ids(student))
+
+    def missing(self, course_id):
+        return self.graph.missing(course_id, self.satisfied)
+
+    def annotate(self, offerings):
+        """
+        Set ``prerequisite_courses`` and ``missing_prerequisites`` on each
+        of ``offerings`` and return them as a list.
+        """
+        offerings = list(offerings)
+        for offering in offerings:
+            offering.prerequisite_courses = self.graph.direct_prerequisites(offering.course_id)
+            offering.missing_prerequisites = self.missing(offering.course_id)
+        return offerings
+
+    def filter(self, queryset):
+        """Restrict a CourseOffering queryset to the courses the student may take."""
+        ineligible = self.graph.ineligible(self.satisfied)
+        if not ineligible:
+            return queryset
+        return queryset.exclude(course_id__in=ineligible)
@@ -0,0 +1,286 @@
+"""
+Weekly meeting times and timetable conflict checks.
+
+CourseOffering.schedule stays free text for people to read; parse_schedule()
+turns it into MeetingTime rows when the offering is saved. A meeting is an
+interval of minutes from Monday 00:00, and a student's timetable for a
+semester is an interval index over those: starts sorted with a running
+maximum of the ends, so whether a candidate meeting overlaps anything is two
+binary searches however full the week is. Each student's meetings are
+cached and dropped by courses.signals when enrollments or meetings change.
+"""
+import re
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from datetime import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Enrollment, MeetingTime
+
+TIMETABLE_KEY = 'schedule:timetable:{}'
+
+DAY_NAMES = {
+    'mon': 0, 'monday': 0,
+    'tue': 1, 'tues': 1, 'tuesday': 1,
+    'wed': 2, 'wednesday': 2,
+    'thu': 3, 'thur': 3, 'thurs': 3, 'thursday': 3,
+    'fri': 4, 'friday': 4,
+    'sat': 5, 'saturday': 5,
+    'sun': 6, 'sunday': 6,
+}
+# Compact day letters as in "MWF", "TTh" or "TuTh"; R and U are Thursday
+# and Sunday. Two-letter abbreviations come first, so "Tu" is Tuesday
+# rather than Tuesday and Sunday
+DAY_LETTERS = re.compile(r'mo|tu|we|th|fr|sa|su|[mtwrfsu]')
+DAY_LETTER_VALUES = {
+    'mo': 0, 'm': 0, 'tu': 1, 't': 1, 'we': 2, 'w': 2, 'th': 3, 'r': 3,
+    'fr': 4, 'f': 4, 'sa': 5, 's': 5, 'su': 6, 'u': 6,
+}
+# Schedules of sections without fixed meetings, which have no meeting times;
+# compared without spaces and punctuation, so "T.B.A." is "tba"
+PLACEHOLDERS = {'tba', 'tbd', 'tobeannounced', 'arranged', 'byarrangement', 'online', 'asynchronous'}
+
+TIME = r'\d{1,2}(?::\d{2})?\s*(?:[ap]\.?m\.?)?'
+MEETING = re.compile(rf'(?P<days>[a-z][a-z/,&\s]*?)\s*(?P<start>{TIME})\s*(?:-|–|to)\s*(?P<end>{TIME})')
+SEPARATORS = re.compile(r'[\s;,]*')
+
+MINUTES_PER_DAY = 24 * 60
+
+
+class ScheduleParseError(ValueError):
+    pass
+
+
+def _parse_days(text):
+    days = []
+    for word in re.split(r'[^a-z]+', text):
+        if not word:
+            continue
+        if word in DAY_NAMES:
+            days.append(DAY_NAMES[word])
+            continue
+        letters = DAY_LETTERS.findall(word)
+        if ''.join(letters) != word:
+            raise ScheduleParseError(f"Unknown day {word!r}")
+        days.extend(DAY_LETTER_VALUES[letter] for letter in letters)
+    if not days:
+        raise ScheduleParseError("Missing days")
+    return sorted(set(days))
+
+
+def _meridiem(text):
+    match = re.search(r'([ap])\.?m\.?$', text.strip())
+    return match[1] if match else None
+
+
+def _parse_time(text, meridiem=None):
+    """Minutes after midnight; ``meridiem`` ('a' or 'p') applies when the text has none."""
+    meridiem = _meridiem(text) or meridiem
+    hours, minutes = re.match(r'(\d+)(?::(\d+))?', text.strip()).group(1, 2)
+    hours, minutes = int(hours), int(minutes or 0)
+    if meridiem:
+        if not 1 <= hours <= 12:
+            raise ScheduleParseError(f"Invalid time {text.strip()!r}")
+        hours = hours % 12 + (12 if meridiem == 'p' else 0)
+    if hours > 23 or minutes > 59:
+        raise ScheduleParseError(f"Invalid time {text.strip()!r}")
+    return hours * 60 + minutes
+
+
+def parse_schedule(text):
+    """
+    Parse schedule text such as "Mon/Wed 9:00-10:30; Fri 2-3pm" or
+    "MWF 09:00 - 09:50" into sorted ``(weekday, start_minute, end_minute)``
+    meetings. Blank text and PLACEHOLDERS such as "TBA" or "Online" have
+    no meetings; anything else that cannot be read raises
+    ScheduleParseError.
+    """
+    text = (text or '').strip().lower()
+    if re.sub(r'[^a-z0-9]', '', text) in PLACEHOLDERS:
+        return []
+    meetings = set()
+    position = 0
+    for match in MEETING.finditer(text):
+        if SEPARATORS.fullmatch(text, position, match.start()) is None:
+            raise ScheduleParseError(f"Cannot read {text[position:match.start()].strip()!r}")
+        position = match.end()
+        end = _parse_time(match['end'])
+        end_meridiem = _meridiem(match['end'])
+        if end_meridiem and not _meridiem(match['start']):
+            # "1-2:30pm": the start shares the end's am/pm unless that puts it
+            # after the end, as in "11-1pm"
+            start = _parse_time(match['start'], end_meridiem)
+            if start >= end:
+                start = _parse_time(match['start'], 'a')
+        else:
+            start = _parse_time(match['start'])
+        if start >= end:
+            raise ScheduleParseError(f"{match.group().strip()!r} ends before it starts")
+        meetings.update((day, start, end) for day in _parse_days(match['days']))
+    if SEPARATORS.fullmatch(text, position) is None:
+        raise ScheduleParseError(f"Cannot read {text[position:].strip()!r}")
+    return sorted(meetings)
+
+
+def _to_time(minutes):
+    return time(minutes // 60, minutes % 60)
+
+
+def _to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def meeting_times(offering_id, meetings):
+    """Unsaved MeetingTime rows for parsed ``(weekday, start, end)`` meetings."""
+    return [
+        MeetingTime(course_offering_id=offering_id, weekday=day, start_time=_to_time(start), end_time=_to_time(end))
+        for day, start, end in meetings
+    ]
+
+
+def sync_meetings(offering):
+    """Replace the offering's MeetingTime rows with its parsed schedule."""
+    meetings = parse_schedule(offering.schedule)
+    with transaction.atomic():
+        MeetingTime.objects.filter(course_offering=offering).delete()
+        MeetingTime.objects.bulk_create(meeting_times(offering.pk, meetings))
+    return meetings
+
+
+def meeting_intervals(meetings):
+    """``(start, end)`` week-minute intervals of MeetingTime rows or ``(weekday, start, end)`` tuples."""
+    intervals = []
+    for meeting in meetings:
+        if isinstance(meeting, MeetingTime):
+            meeting = (meeting.weekday, _to_minutes(meeting.start_time), _to_minutes(meeting.end_time))
+        day, start, end = meeting
+        intervals.append((day * MINUTES_PER_DAY + start, day * MINUTES_PER_DAY + end))
+    return intervals
+
+
+def format_interval(start, end):
+    day, start = divmod(start, MINUTES_PER_DAY)
+    return f"{MeetingTime.WEEKDAY_CHOICES[day][1][:3]} {_to_time(start):%H:%M}-{_to_time(end % MINUTES_PER_DAY):%H:%M}"
+
+
+@dataclass(frozen=True)
+class Meeting:
+    start: int
+    end: int
+    label: str
+
+    @property
+    def weekday(self):
+        return self.start // MINUTES_PER_DAY
+
+    @property
+    def start_time(self):
+        return _to_time(self.start % MINUTES_PER_DAY)
+
+    @property
+    def end_time(self):
+        return _to_time(self.end % MINUTES_PER_DAY)
+
+
+class Timetable:
+    """
+    Interval index over a week of meetings. ``starts`` is sorted and
+    ``max_ends[i]`` is the latest end among the first ``i + 1`` meetings,
+    so a candidate [start, end) overlaps something exactly when a meeting
+    starting before ``end`` ends after ``start``.
+    """
+
+    def __init__(self, meetings=()):
+        self.meetings = sorted(meetings, key=lambda m: (m.start, m.end))
+        self._index()
+
+    def _index(self):
+        self.starts = [m.start for m in self.meetings]
+        self.max_ends = []
+        latest = -1
+        for meeting in self.meetings:
+            latest = max(latest, meeting.end)
+            self.max_ends.append(latest)
+
+    def __len__(self):
+        return len(self.meetings)
+
+    def overlaps(self, start, end):
+        i = bisect_left(self.starts, end)
+        return i > 0 and self.max_ends[i - 1] > start
+
+    def conflict(self, start, end):
+        """The first meeting overlapping [start, end), or None."""
+        if not self.overlaps(start, end):
+            return None
+        # Only reached on a conflict, which ends the check anyway
+        return next(m for m in self.meetings if m.start < end and m.end > start)
+
+    def conflict_with(self, intervals):
+        """The first ``((start, end), meeting)`` overlap of the candidate intervals, or None."""
+        for start, end in intervals:
+            meeting = self.conflict(start, end)
+            if meeting is not None:
+                return (start, end), meeting
+        return None
+
+    def add(self, intervals, label):
+        for start, end in intervals:
+            insort(self.meetings, Meeting(start, end, label), key=lambda m: (m.start, m.end))
+        self._index()
+
+    def by_day(self):
+        """Meetings grouped per weekday, Monday first, for display."""
+        days = [[] for _ in MeetingTime.WEEKDAY_CHOICES]
+        for meeting in self.meetings:
+            days[meeting.weekday].append(meeting)
+        return [(name, days[day]) for day, name in MeetingTime.WEEKDAY_CHOICES]
+
+
+def _load_meetings(student_id):
+    meetings = MeetingTime.objects.filter(
+        course_offering__enrollment__student_id=student_id,
+        course_offering__enrollment__withdrawn=False,
+    ).values_list('course_offering__semester_id', 'weekday', 'start_time', 'end_time', 'course_offering__course__code')
+    return [
+        (semester_id, start, end, code)
+        for semester_id, day, start_time, end_time, code in meetings
+        for start, end in meeting_intervals([(day, _to_minutes(start_time), _to_minutes(end_time))])
+    ]
+
+
+def student_timetable(student, semester_id):
+    """
+    The student's Timetable for the semester. The meetings of all their
+    semesters are cached together, so a cache miss costs one query.
+    """
+    key = TIMETABLE_KEY.format(student.pk)
+    rows = cache.get(key)
+    if rows is None:
+        rows = _load_meetings(student.pk)
+        cache.set(key, rows, settings.TIMETABLE_CACHE_TIMEOUT)
+    return Timetable(Meeting(start, end, code) for semester, start, end, code in rows if semester == semester_id)
+
+
+def offering_intervals(offering_ids):
+    """``{offering_id: [(start, end), ...]}`` for the offerings, from one query."""
+    intervals = {offering_id: [] for offering_id in offering_ids}
+    for meeting in MeetingTime.objects.filter(course_offering_id__in=list(intervals)):
+        intervals[meeting.course_offering_id].extend(meeting_intervals([meeting]))
+    return intervals
+
+
+def invalidate_timetables(*student_ids):
+    keys = [TIMETABLE_KEY.format(pk) for pk in student_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_offering_timetables(offering):
+    """Drop the timetables of everyone enrolled in ``offering``."""
+    invalidate_timetables(*Enrollment.objects.filter(
+        course_offering=offering, withdrawn=False
+    ).values_list('student_id', flat=True))
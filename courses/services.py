@@ -0,0 +1,441 @@
+"""
+Enrollment services.
+
+Registration and drops go through these functions so that the capacity
+check and the enrollment write happen in one transaction while the
+CourseOffering row is locked. Concurrent registrations for the same
+offering are serialized on that lock, which keeps sections from being
+oversubscribed when registration opens. A student's own registrations
+are serialized on their Student row, locked before any offering, so two
+requests for clashing sections cannot both pass the schedule check.
+
+Students who find a section full join its waitlist instead of retrying,
+and a drop hands the freed seat to the head of the waitlist in the same
+transaction. Seats that open otherwise, e.g. when max_students is raised,
+go to the waitlist first as well: the offering's save signal and the next
+registration promote from it before anyone else can take them. A
+registration commits those promotions in a transaction of their own, so
+they stand even when the registration itself then fails. Promotion
+repeats the prerequisite and schedule checks, and takes students who no
+longer pass them off the waitlist with a logged warning. Waitlist entries
+are numbered consecutively from the offering's waitlist_offset, so a
+position is a subtraction rather than a count of the entries ahead.
+
+register_many() checks out a whole cart of offerings at once: all of
+them are registered, or none are.
+"""
+import logging
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from students.models import Student
+
+from .models import CourseOffering, Enrollment, WaitlistEntry
+from .prerequisites import Eligibility, missing_prerequisites
+from .schedule import format_interval, offering_intervals, student_timetable
+
+logger = logging.getLogger(__name__)
+
+
+class EnrollmentError(Exception):
+    """Base class for enrollment failures that are reported to the student."""
+
+
+class AlreadyRegisteredError(EnrollmentError):
+    pass
+
+
+class CourseFullError(EnrollmentError):
+    pass
+
+
+class NotRegisteredError(EnrollmentError):
+    pass
+
+
+class PrerequisitesNotMetError(EnrollmentError):
+    pass
+
+
+class ScheduleConflictError(EnrollmentError):
+    pass
+
+
+class AlreadyWaitlistedError(EnrollmentError):
+    pass
+
+
+class NotWaitlistedError(EnrollmentError):
+    pass
+
+
+def _conflict_message(code, clash):
+    (start, end), meeting = clash
+    return f"{code} meets at the same time as {meeting.label} ({format_interval(start, end)})."
+
+
+def check_schedule(student, offering):
+    """Raise ScheduleConflictError if the offering meets while the student has another class."""
+    if not offering.schedule:
+        return
+    clash = student_timetable(student, offering.semester_id).conflict_with(
+        offering_intervals([offering.pk])[offering.pk]
+    )
+    if clash:
+        raise ScheduleConflictError(_conflict_message(offering.course.code, clash))
+
+
+def check_eligible(student, offering):
+    """Raise PrerequisitesNotMetError or ScheduleConflictError if ``student`` cannot take ``offering``."""
+    missing = missing_prerequisites(student, offering.course_id)
+    if missing:
+        raise PrerequisitesNotMetError(
+            f"You need to complete {', '.join(missing)} before registering for {offering.course.code}."
+        )
+    check_schedule(student, offering)
+
+
+def lock_student(student):
+    """
+    Lock the student's row until the end of the current transaction. Take
+    it before locking any offering, so lock order is the same everywhere.
+    """
+    Student.objects.select_for_update().only('pk').get(pk=student.pk)
+
+
+def lock_offering(offering_id):
+    """
+    Fetch a course offering and lock its row until the end of the current
+    transaction. Raises CourseOffering.DoesNotExist for unknown ids.
+    """
+    return (
+        CourseOffering.objects
+        .select_for_update(of=('self',))
+        .select_related('course')
+        .get(pk=offering_id)
+    )
+
+
+def register_student(student, offering_id):
+    """
+    Register ``student`` for the offering, reactivating a withdrawn
+    enrollment when one exists (the student/offering pair is unique).
+
+    Returns ``(enrollment, created)`` and raises an EnrollmentError
+    subclass when the student cannot be registered, including when they
+    have not passed the course's prerequisites.
+    """
+    promoted = _promote_first(student, offering_id)
+    if promoted is not None:
+        return promoted, promoted.created
+    return _register(student, offering_id)
+
+
+def _promote_first(student, offering_id):
+    """
+    Give the offering's free seats to its waitlist, which may include
+    ``student``, and commit that before registering anyone else. Returns
+    the student's enrollment if they were promoted.
+    """
+    for enrollment in fill_from_waitlist(offering_id):
+        if enrollment.student_id == student.pk:
+            return enrollment
+    return None
+
+
+@transaction.atomic
+def _register(student, offering_id):
+    lock_student(student)
+    offering = lock_offering(offering_id)
+
+    enrollment = Enrollment.objects.filter(student=student, course_offering=offering).first()
+    if enrollment is not None and not enrollment.withdrawn:
+        raise AlreadyRegisteredError(f"You are already registered for {offering.course.code}.")
+
+    check_eligible(student, offering)
+    # Counted after the lock is held, so concurrent registrations see each other
+    if offering.is_full():
+        raise CourseFullError(f"Course {offering.course.code} is full.")
+    return _enroll(student, offering, enrollment)
+
+
+def _enroll(student, offering, enrollment=None):
+    if enrollment is not None:
+        enrollment.course_offering = offering
+        enrollment.withdrawn = False
+        enrollment.withdrawal_date = None
+        enrollment.enrollment_date = timezone.now().date()
+        enrollment.save(update_fields=['withdrawn', 'withdrawal_date', 'enrollment_date', 'updated_at'])
+        created = False
+    else:
+        enrollment = Enrollment.objects.create(student=student, course_offering=offering)
+        created = True
+    # The signal handlers update the stored counter with F(), keep the
+    # locked instance in step for further capacity checks
+    offering.active_enrollment_count += 1
+    return enrollment, created
+
+
+@transaction.atomic
+def drop_student(student, offering_id):
+    """
+    Withdraw ``student`` from the offering and give the freed seat to the
+    head of the waitlist. Returns the withdrawn enrollment and raises
+    NotRegisteredError when there is no active enrollment.
+    """
+    offering = lock_offering(offering_id)
+
+    try:
+        enrollment = Enrollment.objects.get(
+            student=student,
+            course_offering=offering,
+            withdrawn=False
+        )
+    except Enrollment.DoesNotExist:
+        raise NotRegisteredError(f"You are not registered for {offering.course.code}.")
+
+    enrollment.course_offering = offering
+    enrollment.withdrawn = True
+    enrollment.withdrawal_date = timezone.now().date()
+    enrollment.save(update_fields=['withdrawn', 'withdrawal_date', 'updated_at'])
+    offering.active_enrollment_count -= 1
+
+    promote_from_waitlist(offering)
+    return enrollment
+
+
+@transaction.atomic
+def join_waitlist(student, offering_id):
+    """
+    Put ``student`` at the back of the offering's waitlist and return the
+    WaitlistEntry, annotated with its ``waitlist_position``.
+    """
+    lock_student(student)
+    offering = lock_offering(offering_id)
+    code = offering.course.code
+
+    if Enrollment.objects.filter(student=student, course_offering=offering, withdrawn=False).exists():
+        raise AlreadyRegisteredError(f"You are already registered for {code}.")
+    entry = WaitlistEntry.objects.filter(student=student, course_offering=offering).first()
+    if entry is not None:
+        raise AlreadyWaitlistedError(
+            f"You are already number {entry.sequence - offering.waitlist_offset} on the waitlist for {code}."
+        )
+    check_eligible(student, offering)
+
+    offering.waitlist_length += 1
+    entry = WaitlistEntry.objects.create(
+        student=student, course_offering=offering,
+        sequence=offering.waitlist_offset + offering.waitlist_length,
+    )
+    offering.save(update_fields=['waitlist_length', 'updated_at'])
+    entry.waitlist_position = offering.waitlist_length
+    return entry
+
+
+def register_or_waitlist(student, offering_id):
+    """
+    Register ``student``, or waitlist them when the offering is full,
+    while it stays locked. Returns ``(enrollment, entry)`` with the other
+    None.
+    """
+    promoted = _promote_first(student, offering_id)
+    if promoted is not None:
+        return promoted, None
+    return _register_or_waitlist(student, offering_id)
+
+
+@transaction.atomic
+def _register_or_waitlist(student, offering_id):
+    try:
+        enrollment, _ = _register(student, offering_id)
+    except CourseFullError:
+        # The offering stays locked, so no seat can open in between
+        return None, join_waitlist(student, offering_id)
+    return enrollment, None
+
+
+@transaction.atomic
+def leave_waitlist(student, offering_id):
+    offering = lock_offering(offering_id)
+    if not _remove_from_waitlist(offering, student):
+        raise NotWaitlistedError(f"You are not on the waitlist for {offering.course.code}.")
+
+
+def _remove_from_waitlist(offering, student):
+    """Remove ``student`` from the locked offering's waitlist. Returns whether they were on it."""
+    entry = WaitlistEntry.objects.filter(student=student, course_offering=offering).first()
+    if entry is None:
+        return False
+    entry.delete()
+    # Close the gap so the remaining sequence numbers stay consecutive
+    WaitlistEntry.objects.filter(
+        course_offering=offering, sequence__gt=entry.sequence
+    ).update(sequence=F('sequence') - 1)
+    offering.waitlist_length -= 1
+    offering.save(update_fields=['waitlist_length', 'updated_at'])
+    return True
+
+
+def promote_from_waitlist(offering):
+    """
+    Enroll students from the head of the locked offering's waitlist while
+    it has free seats. Students who no longer qualify, e.g. because they
+    registered for a clashing section while waiting, are taken off the
+    waitlist and logged. Returns the promoted enrollments, each with a
+    ``created`` attribute as returned by register_student().
+    """
+    promoted = []
+    changed = False
+    while offering.waitlist_length and not offering.is_full():
+        entry = (
+            WaitlistEntry.objects.select_related('student')
+            .filter(course_offering=offering).order_by('sequence').first()
+        )
+        changed = True
+        if entry is None:
+            # The stored length has drifted from the entries
+            offering.waitlist_length = 0
+            break
+        entry.delete()
+        offering.waitlist_offset = entry.sequence
+        offering.waitlist_length -= 1
+        try:
+            check_eligible(entry.student, offering)
+        except EnrollmentError as e:
+            logger.warning(
+                "Removed %s from the waitlist of %s (offering %s): %s",
+                entry.student.student_id, offering.course.code, offering.pk, e,
+            )
+            continue
+        enrollment = Enrollment.objects.filter(student=entry.student, course_offering=offering).first()
+        enrollment, created = _enroll(entry.student, offering, enrollment)
+        enrollment.created = created
+        promoted.append(enrollment)
+    if changed:
+        offering.save(update_fields=['waitlist_offset', 'waitlist_length', 'updated_at'])
+    return promoted
+
+
+@transaction.atomic
+def fill_from_waitlist(offering_id):
+    """Promote waitlisted students into the free seats of the offering, e.g. after max_students was raised."""
+    return promote_from_waitlist(lock_offering(offering_id))
+
+
+@dataclass
+class CartResult:
+    offering_id: int
+    code: str = ''
+    status: str = 'registered'
+    message: str = ''
+    enrollment: Enrollment = None
+
+    # Statuses of offerings that were, or could have been, registered
+    SUCCESS = ('registered', 're-registered', 'promoted')
+
+    @property
+    def ok(self):
+        return self.status in self.SUCCESS
+
+
+@transaction.atomic
+def register_many(student, offering_ids):
+    """
+    Register ``student`` for every offering in ``offering_ids`` or for none
+    of them. The student and then the offerings, in primary key order, are
+    locked, so concurrent checkouts of overlapping carts cannot deadlock,
+    and every check runs before anything is written.
+
+    Returns ``(ok, results)`` with one CartResult per requested id, in
+    request order.
+    """
+    requested = list(offering_ids)
+    results = [CartResult(offering_id) for offering_id in requested]
+    unique_ids = list(dict.fromkeys(requested))
+
+    lock_student(student)
+    offerings = {
+        offering.pk: offering
+        for offering in CourseOffering.objects.select_for_update(of=('self',))
+        .select_related('course').filter(pk__in=unique_ids).order_by('pk')
+    }
+    # Free seats go to the waitlists first; this student may be promoted
+    # from them, whatever becomes of the rest of the cart
+    promoted = {
+        offering.pk: enrollment
+        for offering in offerings.values()
+        for enrollment in promote_from_waitlist(offering)
+        if enrollment.student_id == student.pk
+    }
+    semester_ids = {offering.semester_id for offering in offerings.values()}
+    enrollments = list(
+        Enrollment.objects.filter(student=student)
+        .filter(Q(course_offering_id__in=unique_ids) | Q(withdrawn=False, course_offering__semester_id__in=semester_ids))
+        .select_related('course_offering__course')
+    )
+    existing = {e.course_offering_id: e for e in enrollments}
+    # Courses the student already holds this term; the cart's own courses are added as they pass
+    taken_courses = {
+        e.course_offering.course_id: e.course_offering.course.code for e in enrollments if not e.withdrawn
+    }
+    timetables = {semester_id: student_timetable(student, semester_id) for semester_id in semester_ids}
+    intervals = offering_intervals(offerings)
+    eligibility = Eligibility(student)
+
+    seen = set()
+    for result in results:
+        offering = offerings.get(result.offering_id)
+        if offering is None:
+            result.status, result.message = 'not-found', "No such course offering."
+            continue
+        code = result.code = offering.course.code
+        enrollment = existing.get(offering.pk)
+        clash = timetables[offering.semester_id].conflict_with(intervals[offering.pk])
+        if offering.pk in seen:
+            result.status, result.message = 'duplicate', f"{code} is in the cart more than once."
+        elif offering.pk in promoted:
+            result.status, result.enrollment = 'promoted', promoted[offering.pk]
+            result.message = f"You were registered for {code} from its waitlist."
+            taken_courses[offering.course_id] = code
+            timetables[offering.semester_id].add(intervals[offering.pk], code)
+        elif enrollment is not None and not enrollment.withdrawn:
+            result.status, result.message = 'already-registered', f"You are already registered for {code}."
+        elif not offering.is_active:
+            result.status, result.message = 'inactive', f"{code} is not open for registration."
+        elif offering.course_id in taken_courses:
+            result.status = 'conflict'
+            result.message = f"You already have another section of {code}."
+        elif clash:
+            result.status, result.message = 'conflict', _conflict_message(code, clash)
+        elif eligibility.missing(offering.course_id):
+            result.status = 'prerequisites'
+            result.message = (
+                f"You need to complete {', '.join(eligibility.missing(offering.course_id))} "
+                f"before registering for {code}."
+            )
+        elif offering.is_full():
+            result.status, result.message = 'full', f"Course {code} is full."
+        else:
+            result.status = 're-registered' if enrollment is not None else 'registered'
+            taken_courses[offering.course_id] = code
+            timetables[offering.semester_id].add(intervals[offering.pk], code)
+        seen.add(offering.pk)
+
+    if not all(result.ok for result in results):
+        for result in results:
+            if result.ok and result.status != 'promoted':
+                result.status = 'not-registered'
+                result.message = f"{result.code} was not registered because of the other courses in the cart."
+        return False, results
+
+    for result in results:
+        if result.status == 'promoted':
+            continue
+        offering = offerings[result.offering_id]
+        result.enrollment, _ = _enroll(student, offering, existing.get(offering.pk))
+        result.message = f"Successfully {result.status} for {result.code}."
+    return True, results
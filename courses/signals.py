@@ -0,0 +1,133 @@
+"""
+Signal handlers that keep data derived from enrollments in step with the
+enrollment table:
+
+* CourseOffering's denormalized enrollment counters, adjusted with F()
+  expressions on save and delete;
+* StudentSemesterSummary rows, rebuilt for the student whose grade changed.
+
+Prerequisite edits are checked for cycles before they are written, and
+the cached prerequisite graph is invalidated when courses or their
+prerequisites change. An offering's MeetingTime rows follow its schedule
+text, and cached student timetables are dropped when enrollments or
+meetings change. Seats added by raising max_students go to the waitlist.
+
+Bulk operations that bypass signals should call
+CourseOfferingQuerySet.recount_enrollments() and
+students.transcripts.refresh_summaries() afterwards.
+"""
+import logging
+
+from django.db.models import F
+from django.db.models.functions import Now
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from students.transcripts import refresh_summaries
+from .models import Course, CourseOffering, Enrollment
+from .prerequisites import check_new_prerequisites, invalidate_graph
+from .services import fill_from_waitlist
+from .schedule import ScheduleParseError, invalidate_offering_timetables, invalidate_timetables, sync_meetings
+
+logger = logging.getLogger(__name__)
+
+TRACKED_FIELDS = {'course_offering', 'course_offering_id', 'withdrawn', 'grade'}
+
+
+def _adjust_counters(offering_id, withdrawn, delta):
+    field = 'withdrawn_count' if withdrawn else 'active_enrollment_count'
+    CourseOffering.objects.filter(pk=offering_id).update(**{field: F(field) + delta, 'updated_at': Now()})
+
+
+@receiver(post_save, sender=Enrollment)
+def enrollment_saved(sender, instance, created, update_fields=None, **kwargs):
+    current = instance.tracked_state()
+    previous = getattr(instance, '_loaded_state', None)
+    instance._loaded_state = current
+
+    if created:
+        _adjust_counters(instance.course_offering_id, instance.withdrawn, 1)
+        if instance.grade:
+            refresh_summaries([instance.student_id])
+        return
+
+    if update_fields is not None and not TRACKED_FIELDS & set(update_fields):
+        return
+
+    if previous is None or None in previous[:2]:
+        # Saved without being loaded first, so the old state is unknown
+        CourseOffering.objects.filter(pk=instance.course_offering_id).recount_enrollments()
+        refresh_summaries([instance.student_id])
+        return
+
+    if previous[:2] != current[:2]:
+        _adjust_counters(previous[0], previous[1], -1)
+        _adjust_counters(current[0], current[1], 1)
+    if previous != current:
+        refresh_summaries([instance.student_id])
+
+
+@receiver(post_delete, sender=Enrollment)
+def enrollment_deleted(sender, instance, **kwargs):
+    offering_id, withdrawn, grade = getattr(instance, '_loaded_state', None) or instance.tracked_state()
+    _adjust_counters(offering_id, withdrawn, -1)
+    if grade:
+        refresh_summaries([instance.student_id])
+
+
+@receiver(m2m_changed, sender=Course.prerequisites.through)
+def prerequisites_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_add':
+        if reverse:
+            # instance becomes a prerequisite of the courses in pk_set
+            check_new_prerequisites((pk, instance.pk) for pk in pk_set)
+        else:
+            check_new_prerequisites((instance.pk, pk) for pk in pk_set)
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_graph()
+        # A course's prerequisites are part of its API representation, so
+        # bump updated_at for the ETag (pk_set is None after a reverse clear)
+        changed = (pk_set or ()) if reverse else [instance.pk]
+        if changed:
+            Course.objects.filter(pk__in=changed).update(updated_at=Now())
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def course_changed(sender, instance, **kwargs):
+    # The graph holds course codes and names, and deletes cascade to the
+    # prerequisite rows without m2m_changed
+    invalidate_graph()
+
+
+@receiver(post_save, sender=CourseOffering)
+def offering_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'schedule' not in update_fields:
+        return
+    if created and not instance.schedule:
+        return
+    try:
+        sync_meetings(instance)
+    except ScheduleParseError as e:
+        # CourseOffering.clean() rejects these in forms; other writers get no meetings
+        logger.warning("Schedule of offering %s not understood: %s", instance.pk, e)
+        instance.meetings.all().delete()
+    if not created:
+        invalidate_offering_timetables(instance)
+
+
+@receiver(post_save, sender=CourseOffering)
+def offering_capacity_changed(sender, instance, created, update_fields=None, **kwargs):
+    if created or not instance.waitlist_length:
+        return
+    if update_fields is not None and 'max_students' not in update_fields:
+        return
+    fill_from_waitlist(instance.pk)
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def enrollment_timetable_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'withdrawn', 'course_offering'} & set(update_fields):
+        return
+    invalidate_timetables(instance.student_id)
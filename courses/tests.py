@@ -1,3 +1,601 @@
-from django.test import TestCase
+import json
+from datetime import date
+from io import StringIO
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.urls import reverse
+
+from core.models import AcademicYear, Department, Semester
+from courses.analytics import offering_grade_stats
+from courses.management.commands.benchmark_registrations import race_registrations
+from courses.models import Course, CourseOffering, Enrollment, WaitlistEntry
+from courses.admin import CourseAdminForm, CourseOfferingAdmin
+from courses.prerequisites import (
+    GRAPH_VERSION_KEY, Eligibility, PrerequisiteCycleError, PrerequisiteGraph, get_graph,
+)
+from courses.services import (
+    AlreadyRegisteredError, AlreadyWaitlistedError, CourseFullError, NotRegisteredError,
+    PrerequisitesNotMetError, ScheduleConflictError, drop_student, join_waitlist, leave_waitlist,
+    register_many, register_or_waitlist, register_student,
+)
+from courses.schedule import Meeting, ScheduleParseError, Timetable, parse_schedule, student_timetable
+from students.models import Student
+from teachers.models import Teacher
+
+
+def create_catalog(max_students=10):
+    department = Department.objects.create(name='Computer Science', code='CS')
+    year = AcademicYear.objects.create(
+        year='2025-2026', is_current=True,
+        start_date=date(2025, 9, 1), end_date=date(2026, 8, 31)
+    )
+    semester = Semester.objects.create(
+        academic_year=year, name='FALL', is_current=True,
+        start_date=date(2025, 9, 1), end_date=date(2025, 12, 31)
+    )
+    teacher = Teacher.objects.create(
+        user=User.objects.create_user('teacher'), teacher_id='TCH001', department=department,
+        date_of_birth=date(1980, 1, 1), address='Campus', phone='000',
+        qualification='Ph.D.', joining_date=date(2015, 1, 1)
+    )
+    course = Course.objects.create(
+        code='CS101', name='Introduction to Programming', department=department,
+        credits=3, description='Programming basics'
+    )
+    offering = CourseOffering.objects.create(
+        course=course, semester=semester, teacher=teacher, max_students=max_students
+    )
+    return offering
+
+
+def create_students(count, department=None, prefix='student'):
+    return [
+        Student.objects.create(
+            user=User.objects.create_user(f'{prefix}{i}'), student_id=f'{prefix[:3].upper()}{i:06d}',
+            department=department, date_of_birth=date(2005, 1, 1), address='Dorm', phone='000'
+        )
+        for i in range(count)
+    ]
+
+
+class EnrollmentServiceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.offering = create_catalog(max_students=2)
+        cls.students = create_students(4)
+
+    def test_register_and_reactivate(self):
+        student = self.students[0]
+        enrollment, created = register_student(student, self.offering.pk)
+        self.assertTrue(created)
+
+        with self.assertRaises(AlreadyRegisteredError):
+            register_student(student, self.offering.pk)
+
+        drop_student(student, self.offering.pk)
+        with self.assertRaises(NotRegisteredError):
+            drop_student(student, self.offering.pk)
+
+        reactivated, created = register_student(student, self.offering.pk)
+        self.assertFalse(created)
+        self.assertEqual(reactivated.pk, enrollment.pk)
+        self.assertFalse(reactivated.withdrawn)
+        self.assertIsNone(reactivated.withdrawal_date)
+
+    def test_capacity_applies_to_reactivation(self):
+        # Two seats, overflow to int(2 * 1.2) == 2
+        first, second, third, _ = self.students
+        register_student(first, self.offering.pk)
+        register_student(third, self.offering.pk)
+        drop_student(third, self.offering.pk)
+        register_student(second, self.offering.pk)
+
+        with self.assertRaises(CourseFullError):
+            register_student(third, self.offering.pk)
+        self.offering.refresh_from_db()
+        self.assertEqual(self.offering.get_current_enrollment_count(), 2)
+
+
+class WaitlistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Two seats, overflow to int(2 * 1.2) == 2
+        cls.offering = create_catalog(max_students=2)
+        cls.students = create_students(6)
+
+    def positions(self):
+        offering = CourseOffering.objects.get(pk=self.offering.pk)
+        return {
+            entry.student.student_id: entry.sequence - offering.waitlist_offset
+            for entry in WaitlistEntry.objects.filter(course_offering=offering).select_related('student')
+        }
+
+    def fill(self):
+        for student in self.students[:2]:
+            register_student(student, self.offering.pk)
+        return [register_or_waitlist(student, self.offering.pk)[1] for student in self.students[2:5]]
+
+    def test_full_offering_waitlists_in_arrival_order(self):
+        entries = self.fill()
+        self.assertEqual([entry.get_position() for entry in entries], [1, 2, 3])
+        with self.assertRaises(CourseFullError):
+            register_student(self.students[5], self.offering.pk)
+        with self.assertRaises(AlreadyWaitlistedError):
+            join_waitlist(self.students[2], self.offering.pk)
+        with self.assertRaises(AlreadyRegisteredError):
+            join_waitlist(self.students[0], self.offering.pk)
+
+    def test_drop_promotes_head_in_same_transaction(self):
+        self.fill()
+        drop_student(self.students[0], self.offering.pk)
+
+        self.assertTrue(Enrollment.objects.filter(
+            student=self.students[2], course_offering=self.offering, withdrawn=False
+        ).exists())
+        self.assertEqual(self.positions(), {'STU000003': 1, 'STU000004': 2})
+        offering = CourseOffering.objects.get(pk=self.offering.pk)
+        self.assertEqual((offering.active_enrollment_count, offering.waitlist_length), (2, 2))
+
+        # The dropped student rejoins at the back
+        _, entry = register_or_waitlist(self.students[0], self.offering.pk)
+        self.assertEqual(entry.get_position(), 3)
+
+    def test_leaving_closes_the_gap(self):
+        self.fill()
+        leave_waitlist(self.students[3], self.offering.pk)
+        self.assertEqual(self.positions(), {'STU000002': 1, 'STU000004': 2})
+
+        drop_student(self.students[1], self.offering.pk)
+        drop_student(self.students[0], self.offering.pk)
+        self.assertEqual(self.positions(), {})
+        self.assertEqual(
+            set(Enrollment.objects.filter(withdrawn=False).values_list('student__student_id', flat=True)),
+            {'STU000002', 'STU000004'},
+        )
+
+    def test_raised_capacity_goes_to_the_waitlist(self):
+        self.fill()
+        # A third seat that no drop or signal handed out
+        CourseOffering.objects.filter(pk=self.offering.pk).update(max_students=3)
+        ok, (result,) = register_many(self.students[5], [self.offering.pk])
+        self.assertEqual((ok, result.status), (False, 'full'))
+        self.assertEqual(self.positions(), {'STU000003': 1, 'STU000004': 2})
+
+        # Raising it through save() promotes at once
+        offering = CourseOffering.objects.get(pk=self.offering.pk)
+        offering.max_students = 4
+        offering.save()
+        self.assertEqual(self.positions(), {'STU000004': 1})
+        with self.assertRaises(CourseFullError):
+            register_student(self.students[5], self.offering.pk)
+        self.assertEqual(
+            set(Enrollment.objects.filter(withdrawn=False).values_list('student__student_id', flat=True)),
+            {'STU000000', 'STU000001', 'STU000002', 'STU000003'},
+        )
+
+    def test_promotions_outlast_a_failed_registration(self):
+        self.fill()
+        CourseOffering.objects.filter(pk=self.offering.pk).update(max_students=3)
+        with self.assertRaises(CourseFullError):
+            register_student(self.students[5], self.offering.pk)
+        self.assertEqual(self.positions(), {'STU000003': 1, 'STU000004': 2})
+
+        # Entries removed behind the offering's back leave a gap, not an error
+        WaitlistEntry.objects.filter(student=self.students[3]).delete()
+        drop_student(self.students[0], self.offering.pk)
+        self.assertEqual(self.positions(), {})
+        self.assertTrue(Enrollment.objects.filter(
+            student=self.students[4], course_offering=self.offering, withdrawn=False
+        ).exists())
+
+    def test_promotion_skips_students_who_no_longer_qualify(self):
+        self.offering.schedule = 'Mon 9:00-10:00'
+        self.offering.save()
+        other = CourseOffering.objects.create(
+            course=Course.objects.create(
+                code='CS102', name='Data Structures', department=self.offering.course.department,
+                credits=3, description='Data structures'
+            ),
+            semester=self.offering.semester, max_students=10, schedule='Mon 9:30-10:30'
+        )
+        self.fill()
+        # Registering elsewhere while waiting is allowed, but clashes
+        with self.captureOnCommitCallbacks(execute=True):
+            register_student(self.students[2], other.pk)
+
+        with self.assertLogs('courses.services', 'WARNING') as logs:
+            drop_student(self.students[0], self.offering.pk)
+        self.assertIn('STU000002', logs.output[0])
+        self.assertEqual(self.positions(), {'STU000004': 1})
+        self.assertFalse(Enrollment.objects.filter(student=self.students[2], course_offering=self.offering).exists())
+        self.assertTrue(Enrollment.objects.filter(
+            student=self.students[3], course_offering=self.offering, withdrawn=False
+        ).exists())
+
+    def test_registration_page_shows_position(self):
+        self.fill()
+        self.client.force_login(self.students[3].user)
+        response = self.client.get(reverse('students:course_registration'))
+        offering, = response.context['course_offerings']
+        self.assertEqual(offering.waitlist_position, 2)
+        self.assertContains(response, 'Waitlist #2')
+
+        response = self.client.post(reverse('students:leave_waitlist', args=[self.offering.pk]))
+        self.assertRedirects(response, reverse('students:course_registration'))
+        self.assertEqual(self.positions(), {'STU000002': 1, 'STU000004': 2})
+
+
+class CartCheckoutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        first = create_catalog(max_students=1)
+        cls.semester, department = first.semester, first.course.department
+        cls.offerings = [first]
+        for i, schedule in enumerate(['Mon 9:00-10:00', 'Tue 9:00-10:00', 'mon 9:30-10:30am']):
+            course = Course.objects.create(
+                code=f'CS2{i:02d}', name=f'Course {i}', department=department, credits=3, description='Course'
+            )
+            cls.offerings.append(CourseOffering.objects.create(
+                course=course, semester=cls.semester, max_students=5, schedule=schedule
+            ))
+        cls.student, cls.other = create_students(2)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_checkout_registers_every_offering(self):
+        ids = [o.pk for o in self.offerings[:3]]
+        ok, results = register_many(self.student, ids)
+        self.assertTrue(ok)
+        self.assertEqual([r.status for r in results], ['registered'] * 3)
+        self.assertEqual(Enrollment.objects.filter(student=self.student, withdrawn=False).count(), 3)
+        self.assertEqual(CourseOffering.objects.get(pk=ids[1]).active_enrollment_count, 1)
+
+    def test_any_failure_rolls_back_the_whole_cart(self):
+        register_student(self.other, self.offerings[0].pk)
+        ids = [self.offerings[1].pk, self.offerings[0].pk, self.offerings[3].pk, self.offerings[1].pk, 0]
+        ok, results = register_many(self.student, ids)
+
+        self.assertFalse(ok)
+        self.assertEqual(
+            [r.status for r in results], ['not-registered', 'full', 'conflict', 'duplicate', 'not-found']
+        )
+        self.assertIn('same time as CS200 (Mon 09:30-10:30)', results[2].message)
+        self.assertFalse(Enrollment.objects.filter(student=self.student).exists())
+
+    def test_checkout_endpoint_returns_per_offering_results(self):
+        self.client.force_login(self.student.user)
+        url = reverse('students:checkout_courses')
+        response = self.client.post(
+            url, json.dumps({'offerings': [self.offerings[1].pk, self.offerings[2].pk]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['status'] for r in response.json()['results']], ['registered', 'registered'])
+
+        response = self.client.post(url, {'offering': [self.offerings[1].pk]})
+        self.assertRedirects(response, reverse('students:course_registration'))
+        self.assertIn(
+            'You are already registered for CS200.',
+            [message.message for message in get_messages(response.wsgi_request)],
+        )
+
+
+class ScheduleTests(TestCase):
+    def test_parse_schedule(self):
+        self.assertEqual(parse_schedule('Mon/Wed 9:00-10:30; Fri 2-3pm'), [
+            (0, 540, 630), (2, 540, 630), (4, 840, 900),
+        ])
+        self.assertEqual(parse_schedule('TTh 11-12:15pm'), [(1, 660, 735), (3, 660, 735)])
+        # "Tu" is Tuesday, not Tuesday and Sunday
+        for text in ['TuTh 10:00-11:15', 'Tu/Th 10:00-11:15']:
+            self.assertEqual(parse_schedule(text), [(1, 600, 675), (3, 600, 675)])
+        self.assertEqual(parse_schedule(''), [])
+        for text in ['TBA', 'T.B.A.', 'Online', 'By arrangement']:
+            self.assertEqual(parse_schedule(text), [])
+        for text in ['Mon 9:00', 'Mon 10-9', 'Xyz 9-10', 'Mon 9-10 room 5', 'Mon 25:00-26:00']:
+            with self.subTest(text=text), self.assertRaises(ScheduleParseError):
+                parse_schedule(text)
+
+    def test_interval_index(self):
+        timetable = Timetable([Meeting(540, 600, 'A'), Meeting(560, 900, 'B'), Meeting(1000, 1100, 'C')])
+        self.assertFalse(timetable.overlaps(900, 1000))
+        self.assertEqual(timetable.conflict(950, 1010).label, 'C')
+        # B still runs after A has ended
+        self.assertEqual(timetable.conflict(700, 710).label, 'B')
+        timetable.add([(900, 1000)], 'D')
+        self.assertTrue(timetable.overlaps(950, 960))
+
+    def test_registration_rejects_overlapping_sections(self):
+        offering = create_catalog()
+        student, = create_students(1)
+        morning, clash = [
+            CourseOffering.objects.create(
+                course=Course.objects.create(
+                    code=code, name=code, department=offering.course.department, credits=3, description=code
+                ),
+                semester=offering.semester, max_students=5, schedule=schedule,
+            )
+            for code, schedule in [('CS300', 'MWF 9:00-9:50'), ('CS301', 'Wed 9:30-11:00')]
+        ]
+        self.assertEqual(morning.meetings.count(), 3)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            register_student(student, morning.pk)
+        with self.assertRaisesMessage(ScheduleConflictError, 'same time as CS300 (Wed 09:30-11:00)'):
+            register_student(student, clash.pk)
+
+        # Moving the clashing section clears the way and refreshes the cached timetable
+        with self.captureOnCommitCallbacks(execute=True):
+            clash.schedule = 'Wed 10:00-11:00'
+            clash.save()
+            register_student(student, clash.pk)
+        self.assertEqual(len(student_timetable(student, offering.semester_id)), 4)
+
+        self.client.force_login(student.user)
+        response = self.client.get(reverse('students:timetable'))
+        wednesday = dict(response.context['days'])['Wednesday']
+        self.assertEqual([meeting.label for meeting in wednesday], ['CS300', 'CS301'])
+
+
+class PrerequisiteGraphTests(TestCase):
+    def test_transitive_closure(self):
+        graph = PrerequisiteGraph(
+            [(3, 2), (2, 1), (4, 1), (5, 3), (5, 4)],
+            {pk: (f'C{pk}', '') for pk in range(1, 6)},
+        )
+        self.assertEqual(graph.prerequisites(5), {1, 2, 3, 4})
+        self.assertEqual(graph.prerequisites(1), set())
+        # Passing C3 implies C2 and C1, leaving only C4 for C5
+        self.assertEqual(graph.missing(5, graph.satisfied({3})), ['C4'])
+        self.assertEqual(graph.ineligible(graph.satisfied({3})), {5})
+
+    def test_cycle_is_reported_with_its_path(self):
+        with self.assertRaisesMessage(PrerequisiteCycleError, 'C1 -> C3 -> C2 -> C1'):
+            PrerequisiteGraph([(1, 3), (3, 2), (2, 1), (4, 1)], {pk: (f'C{pk}', '') for pk in range(1, 5)})
+
+
+class PrerequisiteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.advanced = create_catalog()
+        cls.student, = create_students(1)
+        department, semester = cls.advanced.course.department, cls.advanced.semester
+        cls.basics = [
+            Course.objects.create(
+                code=f'CS00{i}', name=f'Basics {i}', department=department, credits=3, description='Basics'
+            )
+            for i in range(2)
+        ]
+        cls.basic_offerings = [
+            CourseOffering.objects.create(course=course, semester=semester, max_students=10)
+            for course in cls.basics
+        ]
+        # CS101 needs CS001, which needs CS000
+        cls.advanced.course.prerequisites.add(cls.basics[1])
+        cls.basics[1].prerequisites.add(cls.basics[0])
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_registration_requires_passed_prerequisites(self):
+        with self.assertRaisesMessage(PrerequisitesNotMetError, 'CS000, CS001'):
+            register_student(self.student, self.advanced.pk)
+
+        Enrollment.objects.create(student=self.student, course_offering=self.basic_offerings[1], grade='F')
+        with self.assertRaises(PrerequisitesNotMetError):
+            register_student(self.student, self.advanced.pk)
+
+        # A pass in CS001 also covers CS000
+        Enrollment.objects.filter(student=self.student).update(grade='C')
+        enrollment, created = register_student(self.student, self.advanced.pk)
+        self.assertTrue(created)
+
+    def test_graph_is_cached_until_prerequisites_change(self):
+        get_graph()
+        with self.assertNumQueries(0):
+            graph = get_graph()
+        self.assertEqual(graph.prerequisites(self.advanced.course_id), {c.pk for c in self.basics})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.basics[1].prerequisites.clear()
+        self.assertEqual(get_graph().prerequisites(self.advanced.course_id), {self.basics[1].pk})
+
+        # Changes that bypass the signals show once the version expires
+        Course.prerequisites.through.objects.filter(from_course=self.advanced.course).delete()
+        self.assertEqual(get_graph().prerequisites(self.advanced.course_id), {self.basics[1].pk})
+        cache.delete(GRAPH_VERSION_KEY)
+        self.assertEqual(get_graph().prerequisites(self.advanced.course_id), set())
+
+    def test_cycles_are_rejected_when_edited(self):
+        with self.assertRaisesMessage(PrerequisiteCycleError, 'CS101 -> CS001 -> CS000 -> CS101'):
+            with transaction.atomic():
+                self.basics[0].prerequisites.add(self.advanced.course)
+        with self.assertRaises(PrerequisiteCycleError):
+            with transaction.atomic():
+                self.advanced.course.course_set.add(self.basics[0])
+        self.assertFalse(self.basics[0].prerequisites.exists())
+
+        course = self.basics[0]
+        form = CourseAdminForm(instance=course, data={
+            'code': course.code, 'name': course.name, 'department': course.department_id,
+            'credits': course.credits, 'description': course.description,
+            'prerequisites': [self.advanced.course_id],
+        })
+        self.assertIn('prerequisites', form.errors)
+
+    def test_eligibility_for_a_listing_takes_one_query(self):
+        Enrollment.objects.create(student=self.student, course_offering=self.basic_offerings[0], grade='A')
+        get_graph()
+        offerings = CourseOffering.objects.order_by('course__code')
+        with self.assertNumQueries(2):
+            eligibility = Eligibility(self.student)
+            listed = eligibility.annotate(offerings)
+        self.assertEqual(
+            {o.course.code: o.missing_prerequisites for o in listed},
+            {'CS000': [], 'CS001': [], 'CS101': ['CS001']},
+        )
+        self.assertEqual(
+            [o.course.code for o in eligibility.filter(offerings)], ['CS000', 'CS001']
+        )
+
+
+class EnrollmentCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.offering = create_catalog()
+        cls.students = create_students(3)
+
+    def assertCounters(self, active, withdrawn):
+        self.offering.refresh_from_db()
+        self.assertEqual(
+            (self.offering.active_enrollment_count, self.offering.withdrawn_count),
+            (active, withdrawn)
+        )
+
+    def test_counters_follow_enrollment_changes(self):
+        first, second, third = self.students
+        register_student(first, self.offering.pk)
+        register_student(second, self.offering.pk)
+        Enrollment.objects.create(student=third, course_offering=self.offering, withdrawn=True)
+        self.assertCounters(2, 1)
+
+        drop_student(first, self.offering.pk)
+        self.assertCounters(1, 2)
+
+        register_student(first, self.offering.pk)
+        self.assertCounters(2, 1)
+
+        # Grade edits leave the counters alone
+        enrollment = Enrollment.objects.get(student=second, course_offering=self.offering)
+        enrollment.grade = 'A'
+        enrollment.save()
+        self.assertCounters(2, 1)
+
+        enrollment.delete()
+        self.assertCounters(1, 1)
+
+    def test_admin_save_leaves_the_counters_alone(self):
+        stale = CourseOffering.objects.get(pk=self.offering.pk)
+        register_student(self.students[0], self.offering.pk)
+
+        stale.max_students = 12
+        CourseOfferingAdmin(CourseOffering, admin.site).save_model(None, stale, None, change=True)
+        self.assertCounters(1, 0)
+        self.assertEqual(self.offering.max_students, 12)
+
+    def test_recount_command_repairs_drift(self):
+        for student in self.students:
+            register_student(student, self.offering.pk)
+        CourseOffering.objects.filter(pk=self.offering.pk).update(
+            active_enrollment_count=0, withdrawn_count=5
+        )
+
+        out = StringIO()
+        call_command('recount_enrollments', stdout=out)
+        self.assertIn('1 course offerings', out.getvalue())
+        self.assertCounters(3, 0)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class EnrollmentStressTests(TransactionTestCase):
+    """
+    Races registrations for one offering from several connections. Needs
+    row locks, so it is skipped on SQLite; run it against Oracle with
+    ``python manage.py test courses.tests.EnrollmentStressTests``, and
+    measure registrations per second with ``benchmark_registrations``.
+    """
+    threads = 8
+    attempts_per_thread = 10
+
+    def test_concurrent_registrations_do_not_overbook(self):
+        offering = create_catalog(max_students=20)
+        students = create_students(self.threads * self.attempts_per_thread)
+        outcomes, _ = race_registrations(offering, students, self.threads)
+
+        enrolled = Enrollment.objects.filter(course_offering=offering, withdrawn=False).count()
+        self.assertEqual(len(outcomes), len(students))
+        # Exactly the overflow capacity is filled, never more
+        self.assertEqual(enrolled, offering.max_students * 12 // 10)
+        self.assertEqual(enrolled, outcomes.count(True))
+
+
+class GradeAnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.offering = create_catalog(max_students=30)
+        cls.other = CourseOffering.objects.create(
+            course=cls.offering.course, semester=cls.offering.semester, max_students=30
+        )
+        cls.empty = CourseOffering.objects.create(
+            course=Course.objects.create(
+                code='CS102', name='Empty', department=cls.offering.course.department,
+                credits=3, description='Empty'
+            ),
+            semester=cls.offering.semester, max_students=30
+        )
+        students = create_students(6)
+        scores = [(30, 30, 35, 'A'), (20, 20, 30, 'C'), (10, 20, 20, 'F'), (None, None, None, 'I')]
+        for student, (assignment, midterm, final, grade) in zip(students, scores):
+            Enrollment.objects.create(
+                student=student, course_offering=cls.offering, grade=grade,
+                assignment_score=assignment, midterm_score=midterm, final_score=final
+            )
+        Enrollment.objects.create(student=students[4], course_offering=cls.offering, withdrawn=True, grade='W')
+        Enrollment.objects.create(
+            student=students[5], course_offering=cls.other, grade='B',
+            assignment_score=25, midterm_score=25, final_score=35
+        )
+
+    def setUp(self):
+        # The course detail rosters are cached fragments
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_per_offering_statistics(self):
+        with self.assertNumQueries(1):
+            stats = offering_grade_stats([self.offering.pk, self.other.pk, self.empty.pk])
+
+        offering = stats[self.offering.pk]
+        self.assertEqual(offering.total_students, 4)
+        self.assertEqual(offering.scored_students, 3)
+        self.assertEqual(offering.mean_score, 71.67)
+        self.assertEqual(offering.median_score, 70.0)
+        self.assertEqual(offering.std_score, 18.41)
+        self.assertEqual(offering.distribution, {'A': 1, 'B': 0, 'C': 1, 'D': 0, 'F': 1})
+        self.assertEqual(offering.average_grade_points, 2.0)
+        self.assertEqual(offering.pass_rate, 66.67)
+
+        self.assertEqual(stats[self.other.pk].median_score, 85.0)
+        self.assertEqual(stats[self.other.pk].pass_rate, 100.0)
+        self.assertEqual(stats[self.empty.pk].total_students, 0)
+        self.assertIsNone(stats[self.empty.pk].mean_score)
+
+    def test_course_detail_query_count_is_constant(self):
+        staff = User.objects.create_user('staff', is_staff=True)
+        self.client.force_login(staff)
+        url = reverse('courses:course_detail', args=[self.offering.course.pk])
+        with self.assertNumQueries(8):
+            response = self.client.get(url)
+        self.assertEqual(response.context['enrolled_count'], 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for student in create_students(3, prefix='extra'):
+                Enrollment.objects.create(student=student, course_offering=self.other, grade='A')
+        with self.assertNumQueries(8):
+            self.client.get(url)
+
+        # Unchanged rosters come from the fragment cache
+        with self.assertNumQueries(6):
+            response = self.client.get(url)
+        self.assertContains(response, 'EXT000002')
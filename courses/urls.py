@@ -1,10 +1,18 @@
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
 from django.urls import path
 from . import views
 
 app_name = 'courses'
 
+# The ASGI profile serves the async variant
+if settings.ASYNC_VIEWS:
+    course_detail = login_required(views.AsyncCourseDetailView.as_view())
+else:
+    course_detail = views.CourseDetailView.as_view()
+
 urlpatterns = [
     path('', views.CourseListView.as_view(), name='course_list'),
-    path('<int:pk>/', views.CourseDetailView.as_view(), name='course_detail'),
+    path('<int:pk>/', course_detail, name='course_detail'),
     path('offering/<int:pk>/', views.CourseOfferingDetailView.as_view(), name='course_offering_detail'),
 ]
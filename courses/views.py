@@ -1,35 +1,85 @@
-from django.views.generic import ListView, DetailView
+from asgiref.sync import sync_to_async
+from django.views.generic import ListView, DetailView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q
-from .models import Course, CourseOffering
+from django.db.models import Prefetch, prefetch_related_objects
+from django.shortcuts import aget_object_or_404
+from django.template.response import TemplateResponse
+from django.utils.functional import SimpleLazyObject
+from core import concurrency, fragments
+from core.search import SearchMixin
+from .analytics import offering_grade_stats
+from .models import Course, CourseOffering, Enrollment
 from teachers.models import Teacher
 
-class CourseListView(LoginRequiredMixin, ListView):
+class CourseListView(LoginRequiredMixin, SearchMixin, ListView):
     model = Course
+    search_kind = 'course'
     template_name = 'courses/course_list.html'
     context_object_name = 'courses'
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        search_term = self.request.GET.get('search')
-        if search_term:
-            queryset = queryset.filter(
-                Q(code__icontains=search_term) |
-                Q(name__icontains=search_term)
+        queryset = super().get_queryset().select_related('department').prefetch_related(
+            Prefetch(
+                'courseoffering_set',
+                queryset=CourseOffering.objects.exclude(teacher=None).select_related('teacher__user'),
+                to_attr='staffed_offerings'
             )
-        return queryset
+        )
+        return self.filter_search(queryset)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         courses = context['courses']
 
-        # Attach unique instructors to each course
+        # Attach unique instructors to each course from the prefetched offerings
         for course in courses:
-            course.unique_instructors = course.get_unique_instructors()
+            instructors = {offering.teacher_id: offering.teacher for offering in course.staffed_offerings}
+            course.unique_instructors = list(instructors.values())
 
+        context['is_student'] = hasattr(self.request.user, 'student')
         return context
 
 
+def course_detail_context(course):
+    offerings = list(
+        course.courseoffering_set.select_related('semester__academic_year', 'teacher__user')
+        .order_by('-semester__start_date')
+    )
+
+    # Rosters and grade statistics are a cached template fragment
+    # (core.fragments), loaded only when it has to be rendered
+    def load_rosters():
+        prefetch_related_objects(offerings, Prefetch(
+            'enrollment_set',
+            queryset=Enrollment.objects.select_related('student__user')
+        ))
+        stats = offering_grade_stats(offering.pk for offering in offerings)
+        for offering in offerings:
+            offering.grade_stats = stats[offering.pk]
+        return offerings
+
+    # Get unique students across all offerings for this course
+    students = (
+        course.courseoffering_set
+        .prefetch_related('enrollment_set__student__user')
+        .values(
+            'enrollment__student__student_id',
+            'enrollment__student__user__first_name',
+            'enrollment__student__user__last_name',
+            'enrollment__grade'
+        )
+        .distinct()
+    )
+
+    return {
+        'offerings': offerings,
+        'offering_rosters': SimpleLazyObject(load_rosters),
+        'enrolled_count': sum(offering.active_enrollment_count for offering in offerings),
+        'unique_instructors': course.get_unique_instructors(),
+        'students': students,
+    }
+
+
 class CourseDetailView(LoginRequiredMixin, DetailView):
     model = Course
     template_name = 'courses/course_detail.html'
@@ -37,28 +87,30 @@ class CourseDetailView(LoginRequiredMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        course = self.get_object()
-
-        context['offerings'] = course.courseoffering_set.all()
-        context['unique_instructors'] = course.get_unique_instructors()
-
-        # Get unique students across all offerings for this course
-        students = (
-            course.courseoffering_set
-            .prefetch_related('enrollment_set__student__user')
-            .values(
-                'enrollment__student__student_id',
-                'enrollment__student__user__first_name',
-                'enrollment__student__user__last_name',
-                'enrollment__grade'
-            )
-            .distinct()
-        )
-        context['students'] = students
-
+        context.update(course_detail_context(self.object))
         return context
 
 
+class AsyncCourseDetailView(View):
+    """
+    CourseDetailView for the ASGI profile. The rosters, shown to staff,
+    load in a query thread (core.concurrency) when they are not cached.
+    """
+
+    async def get(self, request, pk):
+        # Loaded already by login_required; the templates would load it again
+        request.user = await request.auser()
+        course = await aget_object_or_404(Course, pk=pk)
+        context = await sync_to_async(course_detail_context)(course)
+        if request.user.is_staff and not await sync_to_async(fragments.is_cached)(
+            ['course-rosters'], [course, *context['offerings']]
+        ):
+            await concurrency.evaluate(context['offering_rosters'])
+        return TemplateResponse(request, 'courses/course_detail.html', {
+            'object': course, 'course': course, 'view': self, **context,
+        })
+
+
 class CourseOfferingDetailView(LoginRequiredMixin, DetailView):
     model = CourseOffering
     template_name = 'courses/course_offering_detail.html'
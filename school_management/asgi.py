@@ -12,5 +12,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'school_management.settings')
+# The ASGI profile: async variants of the dashboard and detail views, and
+# pooled database connections, since an ASGI server runs each request's
+# sync code in a thread of its own that cannot keep a persistent one
+os.environ.setdefault('DJANGO_ASYNC_VIEWS', '1')
+os.environ.setdefault('DB_CONNECTION_MODE', 'pooled')
+# Several worker processes, which must share the cache (see core/caches.py)
+os.environ.setdefault('CACHE_BACKEND', 'redis')
 
 application = get_asgi_application()
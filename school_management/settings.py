@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from core.caches import caches_from_env
+from core.db.config import databases_from_env
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -41,10 +45,13 @@ INSTALLED_APPS = [
     'students',
     'teachers',
     'courses',
+    'api',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
+    'core.middleware.DatabaseRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -73,20 +80,36 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'school_management.wsgi.application'
 
+# Serve the async variants of the dashboard and detail views; set by the
+# ASGI profile (school_management/asgi.py)
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS', '') == '1'
+
+# Threads per process, each with its own database connection, running the
+# independent queries of async views concurrently (core.concurrency)
+ASYNC_QUERY_THREADS = 8
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.oracle',
-        'NAME': 'free',  # Oracle service name
-        'USER': 'vibooth',
-        'PASSWORD': '123',
-        'HOST': 'localhost',
-        'PORT': '1521',
-    }
-}
+# Connection handling (per-request, persistent or pooled) and credentials
+# come from DB_* environment variables, and an optional read replica from
+# DB_REPLICA_* ones, see core.db.config
+DATABASES = databases_from_env(os.environ, BASE_DIR)
+
+DATABASE_ROUTERS = ['core.db.routers.PrimaryReplicaRouter']
+
+# Read-only views that read from the replica, if there is one, as URL names
+# or paths with shell-style wildcards (core.middleware.DatabaseRoutingMiddleware)
+REPLICA_READ_VIEWS = [
+    'students:student_detail',
+    'teachers:teacher_detail',
+    'courses:course_detail',
+    'admin:*_changelist',
+]
+# After a write, the writer's requests read from the primary for this long,
+# which should exceed the replication lag
+REPLICA_PIN_SECONDS = 10
 
 
 # Password validation
@@ -144,6 +167,66 @@ LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
 LOGIN_URL = 'login'
 
+# List pages use keyset pagination; ?page_size= is capped at LIST_MAX_PAGE_SIZE
+LIST_PAGE_SIZE = 50
+LIST_MAX_PAGE_SIZE = 200
+
+# Process memory by default; a deployment with several worker processes
+# needs a shared one, chosen with CACHE_BACKEND and CACHE_LOCATION; see
+# core/caches.py
+CACHES = caches_from_env(os.environ)
+
+# Upper bound on how stale cached dashboard data (core.dashboard) can get
+# after bulk changes that bypass the invalidation signals
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Same for the per-student weekly timetables (courses.schedule)
+TIMETABLE_CACHE_TIMEOUT = 3600
+
+# Lifetime of the prerequisite graph version (courses.prerequisites); each
+# process rebuilds its graph at least this often
+PREREQUISITE_GRAPH_TIMEOUT = 3600
+
+# Upper bound on how stale cached template fragments (core.fragments) can
+# get after changes their version counters do not follow, e.g. a renamed
+# course in a student's grade table
+FRAGMENT_CACHE_TIMEOUT = 86400
+
+# Rows fetched per round trip by the streaming exports (core.exports)
+EXPORT_CHUNK_SIZE = 2000
+
+# Per-request SQL recording (core.middleware.QueryBudgetMiddleware). Budgets
+# are matched against URL names or paths with shell-style wildcards
+QUERY_BUDGET_ENABLED = DEBUG
+QUERY_BUDGET_STRICT = False  # raise instead of logging violations
+QUERY_BUDGET_DEFAULT = 30
+QUERY_BUDGETS = {
+    'students:student_list': 10,
+    'teachers:teacher_list': 10,
+    'courses:course_list': 10,
+    'api:*': 6,
+    'students:course_registration': 12,
+    'admin:*': None,
+}
+# A statement shape repeated this often from one line is reported as N+1
+N_PLUS_ONE_THRESHOLD = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.queries': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -19,16 +19,28 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
-from core.views import DashboardView, home_view, logout_view
+from django.contrib.auth.decorators import login_required
+from core.views import (
+    AsyncDashboardView, DashboardView, async_home_view, dashboard_metrics, export_data, home_view, logout_view,
+)
 from django.shortcuts import redirect
 
+# The ASGI profile serves the async variants
+if settings.ASYNC_VIEWS:
+    home, dashboard = async_home_view, login_required(AsyncDashboardView.as_view())
+else:
+    home, dashboard = home_view, DashboardView.as_view()
+
 urlpatterns = [
-    path('', home_view, name='home'),
-    path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('', home, name='home'),
+    path('dashboard/', dashboard, name='dashboard'),
+    path('dashboard/metrics/', dashboard_metrics, name='dashboard_metrics'),
+    path('exports/', export_data, name='export_data'),
     path('admin/', admin.site.urls),
     path('students/', include('students.urls')),
     path('teachers/', include('teachers.urls')),
     path('courses/', include('courses.urls')),
+    path('api/v1/', include('api.urls')),
     # Authentication URLs
     path('login/', auth_views.LoginView.as_view(template_name='registration/login.html'), name='login'),
     path('logout/', logout_view, name='logout'),
@@ -39,4 +51,11 @@ urlpatterns = [
     path('password_change/done/', auth_views.PasswordChangeDoneView.as_view(
         template_name='registration/password_change_done.html'
     ), name='password_change_done'),
+    # Reached through the links handed out for imported accounts (core.imports)
+    path('reset/<uidb64>/<token>/', auth_views.PasswordResetConfirmView.as_view(
+        template_name='registration/password_reset_confirm.html'
+    ), name='password_reset_confirm'),
+    path('reset/done/', auth_views.PasswordResetCompleteView.as_view(
+        template_name='registration/password_reset_complete.html'
+    ), name='password_reset_complete'),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
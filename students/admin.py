@@ -1,8 +1,17 @@
+from django import forms
 from django.contrib import admin
-from .models import Student, StudentAttendance
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from core.admin import CSVImportMixin
+from core.imports import StudentImporter
+from . import attendance
+from .models import AttendanceNote, Student, StudentAttendance, StudentSemesterSummary, StudentTermAttendance
 
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(CSVImportMixin, admin.ModelAdmin):
+    importer_class = StudentImporter
     list_display = ('student_id', 'get_full_name', 'department', 'admission_year', 'is_active')
     list_filter = ('department', 'admission_year', 'is_active')
     search_fields = ('student_id', 'user__first_name', 'user__last_name')
@@ -13,6 +22,108 @@ class StudentAdmin(admin.ModelAdmin):
 
 @admin.register(StudentAttendance)
 class StudentAttendanceAdmin(admin.ModelAdmin):
+    """
+    Legacy per-day rows, kept read-only until migrate_attendance has copied
+    them into the bitmap store; record attendance under Student term
+    attendances instead.
+    """
     list_display = ('student', 'date', 'is_present')
     list_filter = ('date', 'is_present')
     search_fields = ('student__student_id', 'student__user__first_name')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(StudentSemesterSummary)
+class StudentSemesterSummaryAdmin(admin.ModelAdmin):
+    list_display = ('student', 'semester', 'credits_attempted', 'credits_earned', 'term_gpa', 'cumulative_gpa')
+    list_filter = ('semester',)
+    search_fields = ('student__student_id',)
+    list_select_related = ('student__user', 'semester__academic_year')
+
+class RecordAttendanceForm(forms.Form):
+    STATUS_CHOICES = [('present', 'Present'), ('absent', 'Absent'), ('clear', 'Not recorded')]
+
+    student_id = forms.CharField(label='Student ID')
+    date = forms.DateField()
+    status = forms.ChoiceField(choices=STATUS_CHOICES)
+    note = forms.CharField(max_length=500, required=False, help_text='A blank note removes an existing one.')
+
+    def clean_student_id(self):
+        try:
+            return Student.objects.get(student_id=self.cleaned_data['student_id'].strip())
+        except Student.DoesNotExist:
+            raise forms.ValidationError('No student has this ID.')
+
+    def save(self):
+        student, day = self.cleaned_data['student_id'], self.cleaned_data['date']
+        status = self.cleaned_data['status']
+        if status == 'clear':
+            attendance.clear(student, day)
+        else:
+            attendance.mark(student, day, status == 'present', note=self.cleaned_data['note'])
+        return student
+
+@admin.register(StudentTermAttendance)
+class StudentTermAttendanceAdmin(admin.ModelAdmin):
+    """
+    The bitmap attendance store. Rows are created and changed one day at a
+    time with "Record attendance", which writes through students.attendance.
+    """
+    change_list_template = 'admin/students/record_attendance_change_list.html'
+    list_display = ('student', 'semester', 'present_count', 'recorded_count', 'updated_at')
+    list_filter = ('semester',)
+    search_fields = ('student__student_id',)
+    list_select_related = ('student__user', 'semester__academic_year')
+    readonly_fields = ('student', 'semester', 'present', 'recorded', 'present_count', 'recorded_count')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {'can_record': self.has_change_permission(request), **(extra_context or {})}
+        return super().changelist_view(request, extra_context)
+
+    def get_urls(self):
+        return [
+            path('record/', self.admin_site.admin_view(self.record_view),
+                 name='students_studenttermattendance_record'),
+        ] + super().get_urls()
+
+    def record_view(self, request):
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        form = RecordAttendanceForm(request.POST or None)
+        if request.method == 'POST' and form.is_valid():
+            try:
+                student = form.save()
+            except ValueError as e:
+                # A weekend, or a day outside every semester
+                form.add_error('date', str(e))
+            else:
+                self.message_user(
+                    request, f"Recorded attendance of {student.student_id} on {form.cleaned_data['date']}."
+                )
+                return redirect('admin:students_studenttermattendance_changelist')
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.opts,
+            'title': 'Record attendance',
+            'form': form,
+        }
+        return TemplateResponse(request, 'admin/students/record_attendance.html', context)
+
+@admin.register(AttendanceNote)
+class AttendanceNoteAdmin(admin.ModelAdmin):
+    list_display = ('student', 'date', 'note')
+    list_filter = ('date',)
+    search_fields = ('student__student_id',)
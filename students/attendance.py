@@ -0,0 +1,258 @@
+"""
+Bitmap attendance store.
+
+Each student has one StudentTermAttendance row per semester holding two
+bitmaps with one bit per school day (Monday to Friday from the semester
+start): ``recorded`` for the days attendance was taken and ``present``
+for the days the student attended. Rates are popcounts of the bitmaps,
+masked to the requested date range, and whole-term totals are kept in
+``present_count`` and ``recorded_count``. Notes, e.g. for excused
+absences, are the exception and live in AttendanceNote.
+
+AttendanceHistory offers the reads the per-day StudentAttendance rows
+were used for; mark(), mark_present() and clear() write. The admin
+records single days through mark() and clear() (students.admin).
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from core import fragments
+from core.models import Semester
+
+from .models import AttendanceNote, Student, StudentTermAttendance
+
+
+def school_day_index(semester, day):
+    """Bit position of ``day`` in the semester's bitmaps, or None if it is not a school day of it."""
+    if day.weekday() >= 5 or not semester.start_date <= day <= semester.end_date:
+        return None
+    weeks, rest = divmod((day - semester.start_date).days, 7)
+    first = semester.start_date.weekday()
+    return weeks * 5 + sum(1 for i in range(rest) if (first + i) % 7 < 5)
+
+
+def school_day(semester, index):
+    """The date of bit ``index`` of the semester's bitmaps."""
+    day = semester.start_date
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    weeks, rest = divmod(index, 5)
+    day += timedelta(weeks=weeks)
+    while rest:
+        day += timedelta(days=1)
+        if day.weekday() < 5:
+            rest -= 1
+    return day
+
+
+def to_int(bitmap):
+    return int.from_bytes(bitmap or b'', 'little')
+
+
+def to_bytes(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def range_mask(first, last):
+    """Bits ``first`` to ``last`` inclusive set."""
+    return (1 << (last + 1)) - (1 << first)
+
+
+def semester_for(day):
+    semester = Semester.objects.filter(start_date__lte=day, end_date__gte=day).first()
+    if semester is None:
+        raise ValueError(f"{day} is not within any semester")
+    return semester
+
+
+@dataclass
+class AttendanceRecord:
+    date: object
+    is_present: bool
+    note: str = ''
+
+    @property
+    def status(self):
+        return 'present' if self.is_present else 'absent'
+
+    @property
+    def notes(self):
+        return self.note
+
+
+@dataclass
+class AttendanceStats:
+    present: int = 0
+    recorded: int = 0
+
+    @property
+    def absent(self):
+        return self.recorded - self.present
+
+    @property
+    def rate(self):
+        return self.present / self.recorded * 100 if self.recorded else 0
+
+
+class AttendanceHistory:
+    """
+    A student's attendance between ``start`` and ``end`` (both optional),
+    loaded with one query for the bitmaps and, when records are listed,
+    one for the notes.
+    """
+
+    def __init__(self, student, start=None, end=None):
+        self.student = student
+        self.start, self.end = start, end
+        terms = StudentTermAttendance.objects.filter(student=student).select_related('semester')
+        if start:
+            terms = terms.filter(semester__end_date__gte=start)
+        if end:
+            terms = terms.filter(semester__start_date__lte=end)
+        self.terms = list(terms.order_by('semester__start_date'))
+
+    def _bits(self, term, start=None, end=None):
+        """``(present, recorded)`` bits of ``term`` limited to the date range."""
+        present, recorded = to_int(term.present), to_int(term.recorded)
+        start = max(filter(None, [start, self.start, term.semester.start_date]))
+        end = min(filter(None, [end, self.end, term.semester.end_date]))
+        if start == term.semester.start_date and end == term.semester.end_date:
+            return present, recorded
+        if start > end:
+            return 0, 0
+        while start.weekday() >= 5:
+            start += timedelta(days=1)
+        while end.weekday() >= 5:
+            end -= timedelta(days=1)
+        if start > end:
+            return 0, 0
+        mask = range_mask(school_day_index(term.semester, start), school_day_index(term.semester, end))
+        return present & mask, recorded & mask
+
+    def stats(self, start=None, end=None):
+        stats = AttendanceStats()
+        whole_terms = not any([start, end, self.start, self.end])
+        for term in self.terms:
+            if whole_terms:
+                # Whole terms: the stored counts, no bitmap decoding
+                stats.present += term.present_count
+                stats.recorded += term.recorded_count
+                continue
+            present, recorded = self._bits(term, start, end)
+            stats.present += present.bit_count()
+            stats.recorded += recorded.bit_count()
+        return stats
+
+    def term_stats(self, semester):
+        for term in self.terms:
+            if term.semester_id == semester.pk:
+                return AttendanceStats(term.present_count, term.recorded_count)
+        return AttendanceStats()
+
+    def records(self, limit=None):
+        """AttendanceRecords, newest first."""
+        notes = AttendanceNote.objects.filter(student=self.student)
+        if self.start:
+            notes = notes.filter(date__gte=self.start)
+        if self.end:
+            notes = notes.filter(date__lte=self.end)
+        notes = dict(notes.values_list('date', 'note'))
+
+        records = []
+        for term in reversed(self.terms):
+            present, recorded = self._bits(term)
+            for index in reversed(range(recorded.bit_length())):
+                if recorded >> index & 1:
+                    day = school_day(term.semester, index)
+                    records.append(AttendanceRecord(day, bool(present >> index & 1), notes.get(day, '')))
+                    if limit and len(records) >= limit:
+                        return records
+        return records
+
+
+def overall_stats(student):
+    """All-time attendance totals from the stored counts."""
+    totals = StudentTermAttendance.objects.filter(student=student).aggregate(
+        present=Sum('present_count'), recorded=Sum('recorded_count')
+    )
+    return AttendanceStats(totals['present'] or 0, totals['recorded'] or 0)
+
+
+def _set_day(term, index, is_present):
+    present, recorded = to_int(term.present), to_int(term.recorded)
+    recorded |= 1 << index
+    present = present | 1 << index if is_present else present & ~(1 << index)
+    term.present, term.recorded = to_bytes(present), to_bytes(recorded)
+    term.present_count, term.recorded_count = present.bit_count(), recorded.bit_count()
+
+
+@transaction.atomic
+def mark_many(student_ids, day, is_present=True, semester=None, batch_size=500):
+    """
+    Record one day of attendance for many students at once, e.g. a whole
+    class marked present. Returns the number of students marked.
+    """
+    semester = semester or semester_for(day)
+    index = school_day_index(semester, day)
+    if index is None:
+        raise ValueError(f"{day} is not a school day of {semester}")
+    student_ids = set(student_ids)
+
+    terms = {
+        term.student_id: term
+        for term in StudentTermAttendance.objects.select_for_update().filter(
+            semester=semester, student_id__in=student_ids
+        )
+    }
+    missing = [StudentTermAttendance(student_id=pk, semester=semester) for pk in student_ids - set(terms)]
+    for term in missing:
+        _set_day(term, index, is_present)
+    StudentTermAttendance.objects.bulk_create(missing, batch_size=batch_size)
+
+    now = timezone.now()
+    for term in terms.values():
+        _set_day(term, index, is_present)
+        term.updated_at = now  # bulk_update skips auto_now
+    StudentTermAttendance.objects.bulk_update(
+        terms.values(), ['present', 'recorded', 'present_count', 'recorded_count', 'updated_at'],
+        batch_size=batch_size,
+    )
+    # The bulk writes send no signals
+    fragments.bump(Student, *student_ids)
+    return len(student_ids)
+
+
+def mark_present(student_ids, day, semester=None):
+    """Mark every given student present on ``day``."""
+    return mark_many(student_ids, day, True, semester)
+
+
+@transaction.atomic
+def mark(student, day, is_present, note=None):
+    """Record one student's attendance on ``day``; a blank note removes an existing one."""
+    mark_many([student.pk], day, is_present)
+    if note:
+        AttendanceNote.objects.update_or_create(student=student, date=day, defaults={'note': note})
+    elif note is not None:
+        AttendanceNote.objects.filter(student=student, date=day).delete()
+
+
+@transaction.atomic
+def clear(student, day):
+    """Remove ``student``'s attendance and note for ``day``, as if it had never been taken."""
+    semester = semester_for(day)
+    index = school_day_index(semester, day)
+    if index is None:
+        raise ValueError(f"{day} is not a school day of {semester}")
+    term = StudentTermAttendance.objects.select_for_update().filter(student=student, semester=semester).first()
+    if term is not None:
+        present, recorded = to_int(term.present) & ~(1 << index), to_int(term.recorded) & ~(1 << index)
+        term.present, term.recorded = to_bytes(present), to_bytes(recorded)
+        term.present_count, term.recorded_count = present.bit_count(), recorded.bit_count()
+        term.save()
+        fragments.bump(Student, student.pk)
+    AttendanceNote.objects.filter(student=student, date=day).delete()
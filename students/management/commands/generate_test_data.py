@@ -1,337 +1,371 @@
-from django.core.management.base import BaseCommand
+import random
+import re
+import time
+from datetime import date, timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 from django.utils import timezone
-from students.models import Student, StudentAttendance
-from teachers.models import Teacher
-from core.models import Department, AcademicYear, Semester
-from courses.models import Course, CourseOffering, Enrollment
-from datetime import datetime, timedelta
-import random
 from faker import Faker
 
-fake = Faker()
+from core import dashboard, search
+from core.models import AcademicYear, Department, Semester
+from courses.models import Course, CourseOffering, Enrollment
+from courses.prerequisites import invalidate_graph
+from students.attendance import school_day_index, to_bytes
+from students.models import AttendanceNote, Student, StudentTermAttendance
+from students.transcripts import refresh_summaries
+from teachers.grading import letter_grades
+from teachers.models import Teacher
+
+DEPARTMENTS = [
+    ('Computer Science', 'CS'),
+    ('Electrical Engineering', 'EE'),
+    ('Business Administration', 'BA'),
+    ('Mathematics', 'MATH'),
+    ('Physics', 'PHY'),
+]
+
+COURSES = {
+    'CS': [
+        ('CS101', 'Introduction to Programming', 3, 'Learn the basics of programming using Python'),
+        ('CS201', 'Data Structures', 3, 'Study fundamental data structures and algorithms'),
+        ('CS301', 'Database Systems', 3, 'Introduction to database design and SQL'),
+        ('CS401', 'Software Engineering', 4, 'Software development methodologies and project management'),
+    ],
+    'EE': [
+        ('EE101', 'Circuit Analysis', 3, 'Basic concepts of electrical circuits'),
+        ('EE201', 'Digital Electronics', 3, 'Digital logic design and Boolean algebra'),
+        ('EE301', 'Signals and Systems', 3, 'Analysis of continuous and discrete-time signals'),
+    ],
+    'BA': [
+        ('BA101', 'Business Fundamentals', 3, 'Introduction to business concepts and practices'),
+        ('BA201', 'Marketing Management', 3, 'Marketing strategies and consumer behavior'),
+        ('BA301', 'Financial Accounting', 3, 'Principles of accounting and financial reporting'),
+    ],
+}
+
+# Terms of an academic year starting in September of ``year``: (name, start, end)
+TERMS = [
+    ('FALL', lambda year: date(year, 9, 1), lambda year: date(year, 12, 31)),
+    ('SPRING', lambda year: date(year + 1, 1, 15), lambda year: date(year + 1, 5, 31)),
+    ('SUMMER', lambda year: date(year + 1, 6, 1), lambda year: date(year + 1, 8, 15)),
+]
+
+GRADE_SCORES = [(15, 30), (15, 30), (20, 40)]  # assignment, midterm, final
+
+POOL_SIZE = 1000
+USERNAME_CHARS = re.compile(r'[^\w.@+-]')
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
 
 class Command(BaseCommand):
-    help = 'Generate test data for the school management system'
+    help = 'Generate a reproducible test dataset of any size with bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=50)
+        parser.add_argument('--teachers', type=int, default=20)
+        parser.add_argument('--semesters', type=int, default=6,
+                            help='Number of terms to generate, ending with the current one')
+        parser.add_argument('--days', type=int, default=90,
+                            help='Days of attendance to generate, ending today')
+        parser.add_argument('--courses-per-term', type=int, default=4,
+                            help='Offerings each student enrolls in per term')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--today', type=date.fromisoformat, default=None,
+                            help='Reference date (YYYY-MM-DD) so runs on different days match')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options['students'] < 0 or options['teachers'] < 1 or options['semesters'] < 1:
+            raise CommandError('--students must not be negative, --teachers and --semesters must be at least 1')
+        self.rng = random.Random(options['seed'])
+        self.fake = Faker()
+        self.fake.seed_instance(options['seed'])
+        self.today = options['today'] or timezone.now().date()
+        self.batch_size = options['batch_size']
+        self.password = make_password(None)
+        started = time.perf_counter()
+        total = 0
+
+        departments = self.create_departments()
+        semesters = self.create_semesters(options['semesters'])
+        teachers = self.timed('teachers', lambda: self.create_teachers(options['teachers'], departments))
+        courses = self.create_courses(departments, len(teachers))
+        offerings = self.timed('offerings', lambda: self.create_offerings(courses, semesters, teachers))
+        students = self.timed('students', lambda: self.create_students(options['students'], departments))
+        total += 2 * (len(teachers) + len(students)) + len(offerings)
+        total += self.timed('enrollments', lambda: self.create_enrollments(
+            students, offerings, semesters, options['courses_per_term']
+        ))
+        total += self.timed('attendance records', lambda: self.create_attendance(
+            students, options['days'], semesters
+        ))
+
+        self.timed('derived data', self.rebuild_derived_data)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)'
+        ))
+
+    def timed(self, label, step):
+        started = time.perf_counter()
+        result = step()
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        rows = result if isinstance(result, int) else len(result) if result is not None else None
+        if rows is None:
+            self.stdout.write(f'Rebuilt {label} in {elapsed:.1f}s')
+        else:
+            self.stdout.write(f'Created {rows} {label} in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)')
+        return result
+
+    def insert(self, model, objects, key):
+        """
+        Bulk insert ``objects`` and return them with primary keys. Backends
+        that cannot return rows from a bulk insert (Oracle) get their keys
+        from one lookup on the unique field ``key`` per batch.
+        """
+        created = []
+        for batch in chunked(objects, self.batch_size):
+            model.objects.bulk_create(batch, batch_size=self.batch_size)
+            if not connection.features.can_return_rows_from_bulk_insert:
+                pks = dict(model.objects.filter(
+                    **{f'{key}__in': [getattr(obj, key) for obj in batch]}
+                ).values_list(key, 'pk'))
+                for obj in batch:
+                    obj.pk = pks[getattr(obj, key)]
+            created.extend(batch)
+        return created
+
+    def next_number(self, model, field, prefix):
+        """Next free number of the ``PREFIX000123`` style IDs, found once up front."""
+        last = model.objects.filter(**{f'{field}__startswith': prefix}).order_by(f'-{field}').first()
+        return int(getattr(last, field)[len(prefix):]) + 1 if last else 1
 
     def create_departments(self):
-        departments = [
-            ('Computer Science', 'CS'),
-            ('Electrical Engineering', 'EE'),
-            ('Business Administration', 'BA'),
-            ('Mathematics', 'MATH'),
-            ('Physics', 'PHY')
-        ]
-        
-        created_departments = []
-        for name, code in departments:
-            dept, _ = Department.objects.get_or_create(
-                name=name,
-                code=code
-            )
-            created_departments.append(dept)
-        return created_departments
-
-    def create_academic_years(self):
-        current_year = timezone.now().year
-        years = []
-        for year in range(current_year - 2, current_year + 2):
-            year_str = f"{year}-{year + 1}"
-            start_date = datetime(year, 9, 1)  # Academic year starts in September
-            end_date = datetime(year + 1, 8, 31)  # Ends in August next year
-            
-            academic_year, _ = AcademicYear.objects.get_or_create(
-                year=year_str,
-                defaults={
-                    'is_current': year == current_year,
-                    'start_date': start_date,
-                    'end_date': end_date
-                }
-            )
-            years.append(academic_year)
-        return years
+        departments = []
+        for name, code in DEPARTMENTS:
+            department, _ = Department.objects.get_or_create(code=code, defaults={'name': name})
+            departments.append(department)
+        return departments
 
-    def create_semesters(self, academic_years):
-        semesters = []
-        current_month = timezone.now().month
+    def create_semesters(self, count):
+        # Walk back from the term containing today
+        year = self.today.year if self.today.month >= 9 else self.today.year - 1
+        term = next(i for i, (_, start, end) in reversed(list(enumerate(TERMS))) if start(year) <= self.today)
+        terms = []
+        for _ in range(count):
+            terms.append((year, term))
+            term -= 1
+            if term < 0:
+                year, term = year - 1, len(TERMS) - 1
 
-        for academic_year in academic_years:
-            year = int(academic_year.year.split('-')[0])
-            
-            # Fall semester (Sep-Dec)
-            fall, _ = Semester.objects.get_or_create(
-                academic_year=academic_year,
-                name='FALL',
+        semesters = []
+        for year, term in reversed(terms):
+            academic_year, _ = AcademicYear.objects.get_or_create(
+                year=f'{year}-{year + 1}',
                 defaults={
-                    'start_date': datetime(year, 9, 1),
-                    'end_date': datetime(year, 12, 31),
-                    'is_current': academic_year.is_current and 9 <= current_month <= 12
-                }
+                    'start_date': date(year, 9, 1),
+                    'end_date': date(year + 1, 8, 31),
+                    'is_current': year == terms[0][0],
+                },
             )
-            semesters.append(fall)
-
-            # Spring semester (Jan-May)
-            spring, _ = Semester.objects.get_or_create(
+            name, start, end = TERMS[term]
+            semester, _ = Semester.objects.get_or_create(
                 academic_year=academic_year,
-                name='SPRING',
+                name=name,
                 defaults={
-                    'start_date': datetime(year + 1, 1, 15),
-                    'end_date': datetime(year + 1, 5, 31),
-                    'is_current': academic_year.is_current and 1 <= current_month <= 5
-                }
+                    'start_date': start(year),
+                    'end_date': end(year),
+                    'is_current': (year, term) == terms[0],
+                },
             )
-            semesters.append(spring)
+            semesters.append(semester)
+        return semesters
 
-            # Summer semester (Jun-Aug)
-            summer, _ = Semester.objects.get_or_create(
-                academic_year=academic_year,
-                name='SUMMER',
-                defaults={
-                    'start_date': datetime(year + 1, 6, 1),
-                    'end_date': datetime(year + 1, 8, 15),
-                    'is_current': academic_year.is_current and 6 <= current_month <= 8
-                }
-            )
-            semesters.append(summer)
+    def pool(self, generate, count):
+        # Faker is the slowest part of the run, so draw from a seeded pool
+        return [generate() for _ in range(min(count, POOL_SIZE))]
 
-        return semesters
+    def create_people(self, model, id_field, prefix, count, departments, age_range, **extra):
+        number = self.next_number(model, id_field, prefix)
+        first_names = self.pool(self.fake.first_name, count)
+        last_names = self.pool(self.fake.last_name, count)
+        addresses = self.pool(self.fake.address, count)
+        names = [(self.rng.choice(first_names), self.rng.choice(last_names)) for _ in range(count)]
+        ids = [f'{prefix}{number + i:06d}' for i in range(count)]
 
-    def create_courses(self, departments):
-        courses_data = {
-            'CS': [
-                ('CS101', 'Introduction to Programming', 3, 'Learn the basics of programming using Python'),
-                ('CS201', 'Data Structures', 3, 'Study fundamental data structures and algorithms'),
-                ('CS301', 'Database Systems', 3, 'Introduction to database design and SQL'),
-                ('CS401', 'Software Engineering', 4, 'Software development methodologies and project management')
-            ],
-            'EE': [
-                ('EE101', 'Circuit Analysis', 3, 'Basic concepts of electrical circuits'),
-                ('EE201', 'Digital Electronics', 3, 'Digital logic design and Boolean algebra'),
-                ('EE301', 'Signals and Systems', 3, 'Analysis of continuous and discrete-time signals')
-            ],
-            'BA': [
-                ('BA101', 'Business Fundamentals', 3, 'Introduction to business concepts and practices'),
-                ('BA201', 'Marketing Management', 3, 'Marketing strategies and consumer behavior'),
-                ('BA301', 'Financial Accounting', 3, 'Principles of accounting and financial reporting')
-            ]
-        }
-
-        created_courses = []
-        for dept in departments:
-            if dept.code in courses_data:
-                for code, name, credits, description in courses_data[dept.code]:
-                    course, _ = Course.objects.get_or_create(
-                        code=code,
-                        defaults={
-                            'name': name,
-                            'department': dept,
-                            'credits': credits,
-                            'description': description
-                        }
-                    )
-                    created_courses.append(course)
-        return created_courses
-
-    def create_students(self, departments):
-        students = []
-        current_year = AcademicYear.objects.filter(is_current=True).first()
-        graduation_year = AcademicYear.objects.filter(year__startswith=str(timezone.now().year + 4)).first()
-        
-        # Get last student ID
-        last_student = Student.objects.order_by('-student_id').first()
-        if last_student:
-            last_id = int(last_student.student_id[3:])
-        else:
-            last_id = 0
-            
-        for i in range(50):  # Create 50 students
-            student_id = f'STU{last_id + i + 1:06d}'  # e.g., STU000001
-            
-            while Student.objects.filter(student_id=student_id).exists():
-                last_id += 1
-                student_id = f'STU{last_id + i + 1:06d}'
-
-            first_name = fake.first_name()
-            last_name = fake.last_name()
-            username = f'{first_name.lower()}.{last_name.lower()}'
-            
-            # Ensure unique username
-            username_count = 1
-            base_username = username
-            while User.objects.filter(username=username).exists():
-                username = f'{base_username}{username_count}'
-                username_count += 1
-            
-            user = User.objects.create(
-                username=username,
-                first_name=first_name,
-                last_name=last_name,
-                email=f'{username}@example.com'
+        users = self.insert(User, (
+            User(
+                username=USERNAME_CHARS.sub('', f'{first}.{last}.{person_id}'.lower()),
+                first_name=first,
+                last_name=last,
+                email=f'{person_id.lower()}@example.com',
+                password=self.password,
             )
+            for (first, last), person_id in zip(names, ids)
+        ), 'username')
 
-            student = Student.objects.create(
+        return self.insert(model, (
+            model(
                 user=user,
-                student_id=student_id,
-                department=random.choice(departments),
-                date_of_birth=fake.date_of_birth(minimum_age=18, maximum_age=25),
-                address=fake.address(),
-                phone=fake.phone_number()[:15],
-                admission_year=current_year,
-                graduation_year=graduation_year,
-                is_active=True
+                department=self.rng.choice(departments),
+                date_of_birth=self.today - timedelta(days=self.rng.randint(*age_range) * 365),
+                address=self.rng.choice(addresses),
+                phone=self.fake.numerify('###-###-####'),
+                **{id_field: person_id},
+                **{name: value() for name, value in extra.items()},
             )
-            students.append(student)
-        return students
-
-    def create_attendance(self, students, current_semester):
-        # Get course offerings for the current semester
-        course_offerings = CourseOffering.objects.filter(semester=current_semester)
-        
-        # Generate attendance for the last 90 days
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=90)
-        current_date = start_date
-
-        while current_date <= end_date:
-            if current_date.weekday() < 5:  # Monday to Friday
-                for student in students:
-                    enrolled_offerings = Enrollment.objects.filter(
-                        student=student,
-                        course_offering__in=course_offerings,
-                        withdrawn=False
-                    ).select_related('course_offering')
-
-                    for enrollment in enrolled_offerings:
-                        # 85% chance of being present, 10% absent, 5% late
-                        rand = random.random()
-                        if rand < 0.85:
-                            is_present = True
-                            note = ''
-                        else:
-                            is_present = False
-                            note = 'Excused absence'
-
-                        StudentAttendance.objects.get_or_create(
-                            student=student,
-                            date=current_date,
-                            defaults={
-                                'is_present': is_present,
-                                'note': note
-                            }
-                        )
-            current_date += timedelta(days=1)
-
-    def create_enrollments(self, students, courses, semesters):
-        grades = ['A', 'B', 'C', 'D', 'F', 'W', 'I']
-        weights = [0.15, 0.3, 0.3, 0.1, 0.05, 0.05, 0.05]  # Distribution of grades
-        active_offerings = []
-        for semester in semesters:
-            for course in courses:
-                # Create a unique teacher for each course
-                first_name = fake.first_name()
-                last_name = fake.last_name()
-                username = f'teacher_{course.code.lower()}'
-                email = f'{username}@example.com'
-                teacher, _ = User.objects.get_or_create(
-                    username=username,
-                    defaults={
-                        'first_name': first_name,
-                        'last_name': last_name,
-                        'email': email
-                    }
-                )
-                teacher_id = f'TCH{course.code}'
-                teacher_profile, _ = Teacher.objects.get_or_create(
-                    user=teacher,
-                    defaults={
-                        'teacher_id': teacher_id,
-                        'phone': fake.phone_number()[:15],
-                        'address': fake.address(),
-                        'department': course.department,
-                        'date_of_birth': fake.date_of_birth(minimum_age=30, maximum_age=60),
-                        'qualification': random.choice(['Ph.D.', 'Master', 'Bachelor']),
-                        'joining_date': timezone.now().date() - timedelta(days=random.randint(365, 3650))
-                    }
-                )
-                # Ensure at least 5 active offerings with positive max_students
-                is_active = True if len(active_offerings) < 5 else random.choice([True, False])
-                max_students = random.randint(10, 50)
-                offering, _ = CourseOffering.objects.get_or_create(
-                    course=course,
-                    semester=semester,
-                    teacher=teacher_profile,
-                    defaults={
-                        'max_students': max_students,
-                        'is_active': is_active
-                    }
-                )
-                if is_active:
-                    active_offerings.append(offering)
-                # Enroll random students
-                for student in random.sample(students, k=random.randint(15, 30)):
-                    enrollment, created = Enrollment.objects.get_or_create(
-                        student=student,
-                        course_offering=offering,
-                        defaults={
-                            'withdrawn': False,
-                            'enrollment_date': timezone.now()
-                        }
-                    )
-                    # Only add grades for past semesters
-                    if semester.end_date < timezone.now().date():
-                        is_withdrawn = random.random() < 0.05  # 5% chance of withdrawal
-                        if is_withdrawn:
+            for user, person_id in zip(users, ids)
+        ), id_field)
+
+    def create_teachers(self, count, departments):
+        return self.create_people(
+            Teacher, 'teacher_id', 'TCH', count, departments, (30, 60),
+            qualification=lambda: self.rng.choice(['Ph.D.', 'Master', 'Bachelor']),
+            joining_date=lambda: self.today - timedelta(days=self.rng.randint(365, 3650)),
+        )
+
+    def create_students(self, count, departments):
+        admission_year = AcademicYear.objects.filter(is_current=True).first()
+        return self.create_people(
+            Student, 'student_id', 'STU', count, departments, (18, 25),
+            admission_year=lambda: admission_year,
+        )
+
+    def create_courses(self, departments, teacher_count):
+        # The standard catalog, extended so every teacher has a course to teach
+        catalog = [(code, name, credits, description, department)
+                   for department in departments
+                   for code, name, credits, description in COURSES.get(department.code, [])]
+        for n in range(max(0, teacher_count - len(catalog))):
+            department = departments[n % len(departments)]
+            number = 500 + n // len(departments)
+            name = f'{department.name} Topics {number}'
+            catalog.append((f'{department.code}{number}', name, 3, name, department))
+
+        existing = {course.code: course for course in Course.objects.filter(code__in=[c[0] for c in catalog])}
+        Course.objects.bulk_create([
+            Course(code=code, name=name, credits=credits, description=description, department=department)
+            for code, name, credits, description, department in catalog
+            if code not in existing
+        ])
+        return list(Course.objects.filter(code__in=[c[0] for c in catalog]).order_by('code'))
+
+    def create_offerings(self, courses, semesters, teachers):
+        existing = set(CourseOffering.objects.filter(semester__in=semesters).values_list('course_id', 'semester_id'))
+        CourseOffering.objects.bulk_create([
+            CourseOffering(
+                course=course,
+                semester=semester,
+                teacher=teachers[i % len(teachers)],
+                max_students=self.rng.randint(30, 60),
+                is_active=semester.end_date >= self.today,
+            )
+            for semester in semesters
+            for i, course in enumerate(courses)
+            if (course.pk, semester.pk) not in existing
+        ], batch_size=self.batch_size)
+        return list(
+            CourseOffering.objects.filter(semester__in=semesters)
+            .select_related('semester')
+            .order_by('semester__start_date', 'course__code')
+        )
+
+    def create_enrollments(self, students, offerings, semesters, per_term):
+        by_semester = {}
+        for offering in offerings:
+            by_semester.setdefault(offering.semester_id, []).append(offering)
+        taken = set(Enrollment.objects.filter(course_offering__in=offerings).values_list('student_id', 'course_offering_id'))
+
+        def rows():
+            for semester in semesters:
+                term_offerings = by_semester.get(semester.pk, [])
+                graded = semester.end_date < self.today
+                for chunk in chunked(students, self.batch_size):
+                    picks = [
+                        (student, offering)
+                        for student in chunk
+                        for offering in self.rng.sample(term_offerings, min(per_term, len(term_offerings)))
+                        if (student.pk, offering.pk) not in taken
+                    ]
+                    scores = [[self.rng.uniform(*bounds) for bounds in GRADE_SCORES] for _ in picks]
+                    letters = letter_grades(scores) if picks else []
+                    for (student, offering), score, letter in zip(picks, scores, letters):
+                        enrollment = Enrollment(student=student, course_offering=offering)
+                        if graded and self.rng.random() < 0.05:
                             enrollment.withdrawn = True
-                            enrollment.withdrawal_date = semester.end_date - timedelta(days=random.randint(1, 30))
+                            enrollment.withdrawal_date = semester.end_date - timedelta(days=self.rng.randint(1, 30))
                             enrollment.grade = 'W'
-                        else:
-                            # Generate assignment scores (30% of total grade)
-                            assignment_score = max(0, random.uniform(15, 30))  # Out of 30, non-negative
-                            # Generate midterm score (30% of total grade)
-                            midterm_score = max(0, random.uniform(15, 30))  # Out of 30, non-negative
-                            # Generate final score (40% of total grade)
-                            final_score = max(0, random.uniform(20, 40))  # Out of 40, non-negative
-                            # Calculate total score
-                            total_score = assignment_score + midterm_score + final_score
-                            # Assign letter grade based on total score
-                            if total_score >= 90:
-                                letter_grade = 'A'
-                            elif total_score >= 80:
-                                letter_grade = 'B'
-                            elif total_score >= 70:
-                                letter_grade = 'C'
-                            elif total_score >= 60:
-                                letter_grade = 'D'
-                            else:
-                                letter_grade = 'F'
-                            enrollment.assignment_score = assignment_score
-                            enrollment.midterm_score = midterm_score
-                            enrollment.final_score = final_score
-                            enrollment.grade = letter_grade
-                        enrollment.save()
-
-    def handle(self, *args, **kwargs):
-        self.stdout.write('Creating departments...')
-        departments = self.create_departments()
-
-        self.stdout.write('Creating academic years...')
-        academic_years = self.create_academic_years()
+                        elif graded:
+                            enrollment.assignment_score, enrollment.midterm_score, enrollment.final_score = (
+                                round(value, 1) for value in score
+                            )
+                            enrollment.grade = letter
+                        yield enrollment
 
-        self.stdout.write('Creating semesters...')
-        semesters = self.create_semesters(academic_years)
+        created = 0
+        for batch in chunked(rows(), self.batch_size):
+            with transaction.atomic():
+                Enrollment.objects.bulk_create(batch)
+            created += len(batch)
+        return created
 
-        self.stdout.write('Creating courses...')
-        courses = self.create_courses(departments)
+    def create_attendance(self, students, days, semesters):
+        """Bitmap attendance for the school days of the last ``days`` days, one row per student and term."""
+        start = self.today - timedelta(days=days)
+        terms = []
+        for semester in semesters:
+            indexed = [
+                (index, day) for day in (start + timedelta(days=n) for n in range(days + 1))
+                if (index := school_day_index(semester, day)) is not None
+            ]
+            if indexed:
+                terms.append((semester, indexed))
 
-        self.stdout.write('Creating students...')
-        students = self.create_students(departments)
+        notes = []
 
-        self.stdout.write('Creating enrollments...')
-        self.create_enrollments(students, courses, semesters)
+        def rows():
+            for student in students:
+                for semester, indexed in terms:
+                    present = recorded = 0
+                    for index, day in indexed:
+                        recorded |= 1 << index
+                        if self.rng.random() < 0.85:
+                            present |= 1 << index
+                        elif self.rng.random() < 0.3:
+                            notes.append(AttendanceNote(student=student, date=day, note='Excused absence'))
+                    yield StudentTermAttendance(
+                        student=student, semester=semester,
+                        present=to_bytes(present), recorded=to_bytes(recorded),
+                        present_count=present.bit_count(), recorded_count=recorded.bit_count(),
+                    )
 
-        current_semester = Semester.objects.filter(is_current=True).first()
-        if current_semester:
-            self.stdout.write('Creating attendance records...')
-            self.create_attendance(students, current_semester)
+        created = 0
+        for batch in chunked(rows(), self.batch_size):
+            with transaction.atomic():
+                StudentTermAttendance.objects.bulk_create(batch)
+                AttendanceNote.objects.bulk_create(notes, batch_size=self.batch_size)
+            created += len(batch) + len(notes)
+            notes.clear()
+        return created
 
-        self.stdout.write(self.style.SUCCESS('Successfully generated test data'))
+    def rebuild_derived_data(self):
+        # bulk_create skips the signals that maintain these
+        CourseOffering.objects.recount_enrollments()
+        student_ids = list(Student.objects.order_by('pk').values_list('pk', flat=True))
+        for batch in chunked(student_ids, self.batch_size):
+            refresh_summaries(batch)
+        for kind in search.INDEXES:
+            search.index_objects(kind, batch_size=self.batch_size)
+        search.update_statistics()
+        dashboard.invalidate_counters()
+        invalidate_graph()
@@ -0,0 +1,101 @@
+from bisect import bisect_right
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Semester
+from students.attendance import school_day_index, to_bytes, to_int
+from students.models import AttendanceNote, StudentAttendance, StudentTermAttendance
+
+
+class Command(BaseCommand):
+    help = 'Copy per-day StudentAttendance rows into the bitmap attendance store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of students converted per transaction')
+        parser.add_argument('--delete-rows', action='store_true',
+                            help='Delete the per-day rows once they are converted')
+
+    def handle(self, *args, **options):
+        self.semesters = list(Semester.objects.order_by('start_date'))
+        self.starts = [semester.start_date for semester in self.semesters]
+        self.skipped = 0
+
+        rows = StudentAttendance.objects.order_by('student_id', 'date').values_list(
+            'student_id', 'date', 'is_present', 'note'
+        ).iterator(chunk_size=10000)
+
+        students = converted = 0
+        batch = []
+        for student_id, days in groupby(rows, key=lambda row: row[0]):
+            batch.append((student_id, list(days)))
+            if len(batch) >= options['batch_size']:
+                converted += self.convert(batch, options['delete_rows'])
+                students += len(batch)
+                batch = []
+        if batch:
+            converted += self.convert(batch, options['delete_rows'])
+            students += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Converted {converted} attendance rows for {students} students'
+        ))
+        if self.skipped:
+            outcome = 'deleted' if options['delete_rows'] else 'kept'
+            self.stdout.write(self.style.WARNING(
+                f'Skipped {self.skipped} rows on weekends or outside every semester; they were {outcome}'
+            ))
+
+    def semester_for(self, day):
+        i = bisect_right(self.starts, day) - 1
+        if i >= 0 and day <= self.semesters[i].end_date:
+            return self.semesters[i]
+        return None
+
+    @transaction.atomic
+    def convert(self, batch, delete_rows):
+        student_ids = [student_id for student_id, _ in batch]
+        # Merge into bitmaps that already hold days marked through the new store
+        terms = {
+            (term.student_id, term.semester_id): term
+            for term in StudentTermAttendance.objects.select_for_update().filter(student_id__in=student_ids)
+        }
+        bits = {key: [to_int(term.present), to_int(term.recorded)] for key, term in terms.items()}
+        existing_notes = set(AttendanceNote.objects.filter(student_id__in=student_ids).values_list('student_id', 'date'))
+
+        notes = []
+        converted = 0
+        for student_id, days in batch:
+            for _, day, is_present, note in days:
+                semester = self.semester_for(day)
+                index = school_day_index(semester, day) if semester else None
+                if index is None:
+                    self.skipped += 1
+                    continue
+                present, recorded = bits.setdefault((student_id, semester.pk), [0, 0])
+                bits[student_id, semester.pk] = [present | is_present << index, recorded | 1 << index]
+                if note and (student_id, day) not in existing_notes:
+                    notes.append(AttendanceNote(student_id=student_id, date=day, note=note))
+                converted += 1
+
+        new_terms, changed_terms = [], []
+        for (student_id, semester_id), (present, recorded) in bits.items():
+            term = terms.get((student_id, semester_id))
+            if term is None:
+                term = StudentTermAttendance(student_id=student_id, semester_id=semester_id)
+                new_terms.append(term)
+            else:
+                changed_terms.append(term)
+            term.present, term.recorded = to_bytes(present), to_bytes(recorded)
+            term.present_count, term.recorded_count = present.bit_count(), recorded.bit_count()
+
+        StudentTermAttendance.objects.bulk_create(new_terms, batch_size=500)
+        StudentTermAttendance.objects.bulk_update(
+            changed_terms, ['present', 'recorded', 'present_count', 'recorded_count'], batch_size=500
+        )
+        AttendanceNote.objects.bulk_create(notes, batch_size=500)
+        if delete_rows:
+            StudentAttendance.objects.filter(student_id__in=student_ids).delete()
+        return converted
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from students.models import Student
+from students.transcripts import refresh_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialized semester GPA summaries for all students'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of students rebuilt per transaction')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        student_ids = list(Student.objects.order_by('pk').values_list('pk', flat=True))
+
+        summaries = 0
+        for start in range(0, len(student_ids), batch_size):
+            summaries += len(refresh_summaries(student_ids[start:start + batch_size]))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {summaries} semester summaries for {len(student_ids)} students'
+        ))
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_search_index'),
+        ('students', '0004_studentsemestersummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceNote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('note', models.CharField(max_length=500)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_notes', to='students.student')),
+            ],
+            options={
+                'unique_together': {('student', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentTermAttendance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('present', models.BinaryField(default=bytes)),
+                ('recorded', models.BinaryField(default=bytes)),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('recorded_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('semester', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.semester')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='term_attendance', to='students.student')),
+            ],
+            options={
+                'unique_together': {('student', 'semester')},
+            },
+        ),
+    ]
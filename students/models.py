@@ -1,6 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
-from core.models import Department, AcademicYear
+from core.models import Department, AcademicYear, Semester
 
 class Student(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -30,3 +30,59 @@ class StudentAttendance(models.Model):
     
     def __str__(self):
         return f"{self.student.user.get_full_name()} - {self.date}"
+
+
+class StudentSemesterSummary(models.Model):
+    """
+    Materialized transcript totals for one student and semester, maintained
+    by students.transcripts whenever enrollment grades change.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='semester_summaries')
+    semester = models.ForeignKey(Semester, on_delete=models.CASCADE)
+    credits_attempted = models.PositiveIntegerField(default=0)
+    credits_earned = models.PositiveIntegerField(default=0)
+    quality_points = models.FloatField(default=0)
+    term_gpa = models.FloatField(default=0)
+    cumulative_gpa = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['student', 'semester']
+
+    def __str__(self):
+        return f"{self.student.student_id} - {self.semester}: {self.term_gpa:.2f}"
+
+
+class StudentTermAttendance(models.Model):
+    """
+    One student's attendance for a whole semester, one bit per school day
+    (Monday to Friday from the semester start). ``recorded`` marks the days
+    attendance was taken and ``present`` the days the student was there.
+    Maintained through students.attendance.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='term_attendance')
+    semester = models.ForeignKey(Semester, on_delete=models.CASCADE)
+    present = models.BinaryField(default=bytes)
+    recorded = models.BinaryField(default=bytes)
+    present_count = models.PositiveIntegerField(default=0)
+    recorded_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['student', 'semester']
+
+    def __str__(self):
+        return f"{self.student.student_id} - {self.semester}: {self.present_count}/{self.recorded_count}"
+
+
+class AttendanceNote(models.Model):
+    """Note attached to one day of a student's bitmap attendance, e.g. an excused absence."""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_notes')
+    date = models.DateField()
+    note = models.CharField(max_length=500)
+
+    class Meta:
+        unique_together = ['student', 'date']
+
+    def __str__(self):
+        return f"{self.student.student_id} - {self.date}: {self.note}"
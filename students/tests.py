@@ -1,3 +1,308 @@
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+
+from core.models import AcademicYear, Department, Semester
+from courses.models import Course, CourseOffering, Enrollment
+from courses.prerequisites import get_graph
+from students.attendance import AttendanceHistory, clear, mark, mark_present, school_day, school_day_index
+from students.models import Student, StudentAttendance, StudentSemesterSummary, StudentTermAttendance
+from teachers.models import Teacher
+
+
+class CourseRegistrationViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='Computer Science', code='CS')
+        year = AcademicYear.objects.create(
+            year='2025-2026', is_current=True,
+            start_date=date(2025, 9, 1), end_date=date(2026, 8, 31)
+        )
+        cls.semester = Semester.objects.create(
+            academic_year=year, name='FALL', is_current=True,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31)
+        )
+        teacher_user = User.objects.create_user('teacher', password='secret-pass-123')
+        cls.teacher = Teacher.objects.create(
+            user=teacher_user, teacher_id='TCH001', department=cls.department,
+            date_of_birth=date(1980, 1, 1), address='Campus', phone='000',
+            qualification='Ph.D.', joining_date=date(2015, 1, 1)
+        )
+        cls.user = User.objects.create_user('student', password='secret-pass-123')
+        cls.student = Student.objects.create(
+            user=cls.user, student_id='STU000001', department=cls.department,
+            date_of_birth=date(2005, 1, 1), address='Dorm', phone='000', admission_year=year
+        )
+        cls.others = [
+            Student.objects.create(
+                user=User.objects.create_user(f'other{i}'), student_id=f'STU1000{i:02d}',
+                department=cls.department, date_of_birth=date(2005, 1, 1),
+                address='Dorm', phone='000', admission_year=year
+            )
+            for i in range(10)
+        ]
+
+    def create_offerings(self, count, max_students=10):
+        offerings = []
+        for i in range(count):
+            course = Course.objects.create(
+                code=f'CS{Course.objects.count():03d}', name=f'Course {i}',
+                department=self.department, credits=3, description='Course'
+            )
+            offerings.append(CourseOffering.objects.create(
+                course=course, semester=self.semester, teacher=self.teacher,
+                max_students=max_students
+            ))
+        return offerings
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        # Start from a freshly loaded prerequisite graph
+        cache.clear()
+        self.addCleanup(cache.clear)
+        get_graph()
+
+    def get_page(self):
+        return self.client.get(reverse('students:course_registration'))
+
+    def test_query_count_does_not_grow_with_offerings(self):
+        offerings = self.create_offerings(2)
+        Enrollment.objects.create(student=self.student, course_offering=offerings[0])
+        with self.assertNumQueries(7):
+            self.get_page()
+
+        offerings += self.create_offerings(20)
+        for offering in offerings[2:]:
+            Enrollment.objects.create(student=self.others[0], course_offering=offering)
+        with self.assertNumQueries(7):
+            self.get_page()
+
+    def test_capacity_annotations_match_model_methods(self):
+        offering, = self.create_offerings(1, max_students=10)
+        for other in self.others[:9]:
+            Enrollment.objects.create(student=other, course_offering=offering)
+        Enrollment.objects.create(student=self.others[9], course_offering=offering, withdrawn=True)
+
+        annotated = CourseOffering.objects.with_capacity(student=self.student).get(pk=offering.pk)
+        plain = CourseOffering.objects.get(pk=offering.pk)
+        self.assertEqual(annotated.current_enrollment_count, 9)
+        # 9 of 10 seats taken triggers the 120% overflow capacity
+        self.assertEqual(annotated.effective_capacity, 12)
+        self.assertEqual(annotated.available_slots, 3)
+        self.assertFalse(annotated.is_at_capacity)
+        self.assertFalse(annotated.is_registered)
+        self.assertEqual(annotated.get_effective_capacity(), plain.get_effective_capacity())
+        self.assertEqual(annotated.get_available_slots(), plain.get_available_slots())
+        self.assertEqual(annotated.is_full(), plain.is_full())
+
+        response = self.get_page()
+        listed, = response.context['course_offerings']
+        self.assertEqual(listed.available_slots, 3)
+
+
+class SemesterSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Mathematics', code='MATH')
+        year = AcademicYear.objects.create(
+            year='2024-2025', start_date=date(2024, 9, 1), end_date=date(2025, 8, 31)
+        )
+        cls.fall = Semester.objects.create(
+            academic_year=year, name='FALL', start_date=date(2024, 9, 1), end_date=date(2024, 12, 31)
+        )
+        cls.spring = Semester.objects.create(
+            academic_year=year, name='SPRING', is_current=True,
+            start_date=date(2025, 1, 15), end_date=date(2025, 5, 31)
+        )
+        cls.user = User.objects.create_user('student')
+        cls.student = Student.objects.create(
+            user=cls.user, student_id='STU000001', department=department,
+            date_of_birth=date(2005, 1, 1), address='Dorm', phone='000', admission_year=year
+        )
+        cls.offerings = {}
+        for code, credits, semester in [('M101', 3, cls.fall), ('M102', 4, cls.fall), ('M201', 3, cls.spring)]:
+            course = Course.objects.create(
+                code=code, name=code, department=department, credits=credits, description=code
+            )
+            cls.offerings[code] = CourseOffering.objects.create(
+                course=course, semester=semester, max_students=30
+            )
+
+    def enroll(self, code, grade):
+        return Enrollment.objects.create(
+            student=self.student, course_offering=self.offerings[code], grade=grade
+        )
+
+    def test_summaries_follow_grade_changes(self):
+        self.enroll('M101', 'A')
+        self.enroll('M102', 'C')
+        spring = self.enroll('M201', 'F')
+
+        fall_summary = self.student.semester_summaries.get(semester=self.fall)
+        self.assertEqual(fall_summary.credits_attempted, 7)
+        self.assertEqual(fall_summary.quality_points, 20.0)
+        self.assertEqual(fall_summary.term_gpa, 2.86)
+        spring_summary = self.student.semester_summaries.get(semester=self.spring)
+        self.assertEqual(spring_summary.credits_earned, 0)
+        self.assertEqual(spring_summary.cumulative_gpa, 2.0)
+
+        spring = Enrollment.objects.get(pk=spring.pk)
+        spring.grade = 'B'
+        spring.save()
+        spring_summary = self.student.semester_summaries.get(semester=self.spring)
+        self.assertEqual(spring_summary.term_gpa, 3.0)
+        self.assertEqual(spring_summary.cumulative_gpa, 2.9)
+
+        spring.grade = 'W'
+        spring.save()
+        self.assertFalse(self.student.semester_summaries.filter(semester=self.spring).exists())
+
+    def test_dashboard_reads_summary(self):
+        self.enroll('M101', 'A')
+        self.enroll('M201', 'B')
+        StudentSemesterSummary.objects.all().delete()
+        call_command('rebuild_semester_summaries', stdout=StringIO())
+        self.assertEqual(StudentSemesterSummary.objects.count(), 2)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('students:dashboard'))
+        self.assertEqual(response.context['gpa'], 3.5)
+
+
+class StudentListViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Physics', code='PHY')
+        cls.user = User.objects.create_user('viewer')
+        for i in range(7):
+            Student.objects.create(
+                user=User.objects.create_user(f'student{i}', first_name='Student', last_name=str(i)),
+                student_id=f'STU{i:06d}', department=department,
+                date_of_birth=date(2005, 1, 1), address='Dorm', phone='000'
+            )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get_page(self, **params):
+        response = self.client.get(reverse('students:student_list'), {'page_size': 3, **params})
+        return response.context['page_obj'], [s.student_id for s in response.context['students']]
+
+    def test_keyset_pages_walk_forward_and_back(self):
+        page, ids = self.get_page()
+        self.assertEqual(ids, ['STU000000', 'STU000001', 'STU000002'])
+        self.assertTrue(page.has_next)
+        self.assertFalse(page.has_previous)
+
+        page, ids = self.get_page(after=page.next_cursor)
+        self.assertEqual(ids, ['STU000003', 'STU000004', 'STU000005'])
+        page, ids = self.get_page(after=page.next_cursor)
+        self.assertEqual(ids, ['STU000006'])
+        self.assertFalse(page.has_next)
+
+        page, ids = self.get_page(before=page.previous_cursor)
+        self.assertEqual(ids, ['STU000003', 'STU000004', 'STU000005'])
+        self.assertTrue(page.has_previous)
+
+    def test_query_count_does_not_depend_on_page(self):
+        with self.assertNumQueries(3):
+            self.get_page()
+        with self.assertNumQueries(3):
+            self.get_page(after='STU000005')
+
+
+class BitmapAttendanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        year = AcademicYear.objects.create(
+            year='2025-2026', start_date=date(2025, 9, 1), end_date=date(2026, 8, 31)
+        )
+        # Starts on a Wednesday
+        cls.semester = Semester.objects.create(
+            academic_year=year, name='FALL', is_current=True,
+            start_date=date(2025, 9, 3), end_date=date(2025, 12, 31)
+        )
+        cls.students = [
+            Student.objects.create(
+                user=User.objects.create_user(f'student{i}'), student_id=f'STU{i:06d}',
+                date_of_birth=date(2005, 1, 1), address='Dorm', phone='000'
+            )
+            for i in range(3)
+        ]
+
+    def test_school_day_index_round_trips(self):
+        self.assertEqual(school_day_index(self.semester, date(2025, 9, 3)), 0)
+        self.assertEqual(school_day_index(self.semester, date(2025, 9, 8)), 3)
+        self.assertIsNone(school_day_index(self.semester, date(2025, 9, 6)))
+        for index in range(60):
+            self.assertEqual(school_day_index(self.semester, school_day(self.semester, index)), index)
+
+    def test_bulk_mark_present_and_history(self):
+        student = self.students[0]
+        ids = [s.pk for s in self.students]
+        with self.assertNumQueries(4):  # savepoint, lock, insert, update
+            mark_present(ids, date(2025, 9, 3), semester=self.semester)
+        mark_present(ids, date(2025, 9, 4))
+        mark(student, date(2025, 9, 5), False, note='Sick')
+
+        term = StudentTermAttendance.objects.get(student=student)
+        self.assertEqual((term.present_count, term.recorded_count), (2, 3))
+
+        history = AttendanceHistory(student)
+        self.assertEqual(history.stats().rate, 2 / 3 * 100)
+        self.assertEqual(history.stats(start=date(2025, 9, 4)).present, 1)
+        records = history.records(limit=2)
+        self.assertEqual([(r.date, r.status, r.notes) for r in records], [
+            (date(2025, 9, 5), 'absent', 'Sick'),
+            (date(2025, 9, 4), 'present', ''),
+        ])
+
+    def test_clear_removes_a_day(self):
+        student = self.students[0]
+        mark_present([student.pk], date(2025, 9, 3))
+        mark(student, date(2025, 9, 4), False, note='Sick')
+        clear(student, date(2025, 9, 4))
+
+        history = AttendanceHistory(student)
+        self.assertEqual((history.stats().present, history.stats().recorded), (1, 1))
+        self.assertFalse(student.attendance_notes.exists())
+
+    def test_admin_records_through_the_bitmap_store(self):
+        student = self.students[2]
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        url = reverse('admin:students_studenttermattendance_record')
+        self.assertContains(self.client.get(reverse('admin:students_studenttermattendance_changelist')), url)
+
+        response = self.client.post(url, {
+            'student_id': student.student_id, 'date': '2025-09-04', 'status': 'absent', 'note': 'Excused',
+        })
+        self.assertRedirects(response, reverse('admin:students_studenttermattendance_changelist'))
+        records = AttendanceHistory(student).records()
+        self.assertEqual([(r.date, r.status, r.notes) for r in records], [(date(2025, 9, 4), 'absent', 'Excused')])
+
+        self.client.post(url, {'student_id': student.student_id, 'date': '2025-09-04', 'status': 'clear'})
+        self.assertEqual(AttendanceHistory(student).stats().recorded, 0)
+
+        # Weekends are not school days
+        response = self.client.post(url, {'student_id': student.student_id, 'date': '2025-09-06', 'status': 'present'})
+        self.assertIn('not a school day', response.context['form'].errors['date'][0])
+        # The legacy per-day rows can no longer be edited
+        self.assertEqual(self.client.get(reverse('admin:students_studentattendance_add')).status_code, 403)
+
+    def test_migrate_attendance_matches_rows(self):
+        student = self.students[1]
+        StudentAttendance.objects.bulk_create([
+            StudentAttendance(student=student, date=date(2025, 9, 3), is_present=True),
+            StudentAttendance(student=student, date=date(2025, 9, 4), is_present=False, note='Excused'),
+            StudentAttendance(student=student, date=date(2025, 9, 6), is_present=True),  # Saturday
+        ])
+        call_command('migrate_attendance', stdout=StringIO())
 
-# Create your tests here.
+        history = AttendanceHistory(student)
+        self.assertEqual((history.stats().present, history.stats().recorded), (1, 2))
+        self.assertEqual(history.records()[0].note, 'Excused')
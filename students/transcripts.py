@@ -0,0 +1,86 @@
+"""
+Maintenance of the StudentSemesterSummary table.
+
+Summaries are rebuilt per student from one grouped aggregate over that
+student's graded enrollments, so a grade change costs a couple of queries
+regardless of how many semesters or courses the student has, and the
+dashboards read precomputed rows instead of iterating enrollments.
+"""
+from django.db import transaction
+from django.db.models import Case, F, FloatField, IntegerField, Sum, Value, When
+
+from .models import StudentSemesterSummary
+
+GRADE_POINTS = {'A': 4.0, 'B': 3.0, 'C': 2.0, 'D': 1.0, 'F': 0.0}
+PASSING_GRADES = ['A', 'B', 'C', 'D']
+
+
+def semester_totals(student_ids):
+    """
+    Per student and semester credit and quality point totals for graded,
+    non-withdrawn enrollments, in chronological order.
+    """
+    from courses.models import Enrollment
+
+    credits = F('course_offering__course__credits')
+    return (
+        Enrollment.objects
+        .filter(student_id__in=student_ids, withdrawn=False, grade__in=list(GRADE_POINTS))
+        .values('student_id', 'course_offering__semester_id')
+        .annotate(
+            credits_attempted=Sum(credits),
+            credits_earned=Sum(Case(
+                When(grade__in=PASSING_GRADES, then=credits),
+                default=Value(0),
+                output_field=IntegerField(),
+            )),
+            quality_points=Sum(Case(
+                *[When(grade=grade, then=credits * Value(points)) for grade, points in GRADE_POINTS.items()],
+                output_field=FloatField(),
+            )),
+        )
+        .order_by('student_id', 'course_offering__semester__start_date')
+    )
+
+
+def build_summaries(student_ids):
+    summaries = []
+    running = {}
+    for row in semester_totals(student_ids):
+        attempted, points = running.get(row['student_id'], (0, 0.0))
+        attempted += row['credits_attempted']
+        points += row['quality_points']
+        running[row['student_id']] = (attempted, points)
+        summaries.append(StudentSemesterSummary(
+            student_id=row['student_id'],
+            semester_id=row['course_offering__semester_id'],
+            credits_attempted=row['credits_attempted'],
+            credits_earned=row['credits_earned'],
+            quality_points=row['quality_points'],
+            term_gpa=gpa(row['quality_points'], row['credits_attempted']),
+            cumulative_gpa=gpa(points, attempted),
+        ))
+    return summaries
+
+
+def gpa(quality_points, credits_attempted):
+    return round(quality_points / credits_attempted, 2) if credits_attempted else 0
+
+
+@transaction.atomic
+def refresh_summaries(student_ids, batch_size=1000):
+    """
+    Rebuild the semester summaries of the given students. Cumulative GPA
+    depends on every earlier term, so a student's rows are rebuilt together.
+    """
+    student_ids = list(student_ids)
+    summaries = build_summaries(student_ids)
+    StudentSemesterSummary.objects.filter(student_id__in=student_ids).delete()
+    StudentSemesterSummary.objects.bulk_create(summaries, batch_size=batch_size)
+    return summaries
+
+
+def current_gpa(student):
+    """Cumulative GPA as of the student's most recent graded semester."""
+    latest = student.semester_summaries.order_by('-semester__start_date').first()
+    return latest.cumulative_gpa if latest else 0
@@ -1,15 +1,26 @@
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
 from django.urls import path
 from . import views
 
 app_name = 'students'
 
+# The ASGI profile serves the async variant
+if settings.ASYNC_VIEWS:
+    student_detail = login_required(views.AsyncStudentDetailView.as_view())
+else:
+    student_detail = views.StudentDetailView.as_view()
+
 urlpatterns = [
     path('', views.StudentDashboardView.as_view(), name='dashboard'),
     path('list/', views.StudentListView.as_view(), name='student_list'),
-    path('<int:pk>/', views.StudentDetailView.as_view(), name='student_detail'),
+    path('<int:pk>/', student_detail, name='student_detail'),
     path('courses/registration/', views.CourseRegistrationView.as_view(), name='course_registration'),
     path('courses/register/<int:offering_id>/', views.register_course, name='register_course'),
     path('courses/drop/<int:offering_id>/', views.drop_course, name='drop_course'),
+    path('courses/checkout/', views.checkout_courses, name='checkout_courses'),
+    path('timetable/', views.TimetableView.as_view(), name='timetable'),
+    path('courses/waitlist/<int:offering_id>/leave/', views.leave_course_waitlist, name='leave_waitlist'),
     path('register/', views.student_registration, name='registration'),
     path('grade/<int:pk>/', views.StudentGradeDetailView.as_view(), name='grade_detail'),
 ]
@@ -1,36 +1,57 @@
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, TemplateView
+from asgiref.sync import sync_to_async
+from django.views.generic import ListView, DetailView, CreateView, UpdateView, TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.shortcuts import get_object_or_404, redirect, render
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect, render
+from django.template.response import TemplateResponse
 from django.contrib import messages
 from django.urls import reverse_lazy
-from django.db.models import Q, Avg, Count
+from django.db.models import Avg, Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseRedirect
+import json
+from django.http import Http404, HttpResponseBadRequest, HttpResponseRedirect, JsonResponse
 from django.urls import reverse
 from django.views.decorators.csrf import csrf_protect
+from core import concurrency, fragments
+from core.concurrency import once
+from core.pagination import KeysetPaginationMixin
+from core.search import SearchMixin, search_ids
 from .models import Student
+from .attendance import AttendanceHistory, overall_stats
+from .transcripts import current_gpa
 from django.contrib.auth.models import User
+from courses.attendance import course_attendance_rates
 from courses.models import CourseOffering, Enrollment
+from courses.prerequisites import Eligibility
+from courses.schedule import student_timetable
+from courses.services import (
+    AlreadyRegisteredError, AlreadyWaitlistedError, EnrollmentError, drop_student, leave_waitlist,
+    register_many, register_or_waitlist,
+)
 from core.models import Department, Semester, AcademicYear
 from django import forms
 from django.utils.decorators import method_decorator
 
-class StudentListView(LoginRequiredMixin, ListView):
+class StudentListView(LoginRequiredMixin, SearchMixin, KeysetPaginationMixin, ListView):
     model = Student
     template_name = 'students/student_list.html'
     context_object_name = 'students'
+    keyset_field = 'student_id'
+    search_kind = 'student'
     
     def get_queryset(self):
-        queryset = super().get_queryset()
-        search_term = self.request.GET.get('search')
-        if search_term:
-            queryset = queryset.filter(
-                Q(student_id__icontains=search_term) |
-                Q(user__first_name__icontains=search_term) |
-                Q(user__last_name__icontains=search_term)
-            )
-        return queryset
+        # Correlated count subquery rather than JOIN + GROUP BY, so only the
+        # rows of the requested page are counted
+        active_enrollments = Enrollment.objects.filter(
+            student=OuterRef('pk'),
+            withdrawn=False
+        ).order_by().values('student').annotate(total=Count('pk')).values('total')
+        queryset = super().get_queryset().select_related('user', 'department').annotate(
+            course_count=Coalesce(Subquery(active_enrollments, output_field=IntegerField()), Value(0))
+        )
+        return self.filter_search(queryset)
 
 class StudentDashboardView(LoginRequiredMixin, TemplateView):
     template_name = 'students/dashboard.html'
@@ -59,29 +80,11 @@ class StudentDashboardView(LoginRequiredMixin, TemplateView):
                 'course_offering__teacher__user'
             )
 
-        # Calculate attendance percentage
-        attendance_count = student.studentattendance_set.count()
-        if attendance_count > 0:
-            present_count = student.studentattendance_set.filter(is_present=True).count()
-            attendance_percentage = (present_count / attendance_count) * 100
-        else:
-            attendance_percentage = 0
-
-        # Calculate GPA
-        enrolled_courses = Enrollment.objects.filter(
-            student=student,
-            grade__isnull=False
-        ).exclude(grade__in=['W', 'I'])
-        if enrolled_courses.exists():
-            grade_points = {
-                'A': 4.0, 'B': 3.0, 'C': 2.0, 'D': 1.0, 'F': 0.0
-            }
-            total_points = sum(grade_points.get(enrollment.grade, 0) * enrollment.course_offering.course.credits 
-                             for enrollment in enrolled_courses)
-            total_credits = sum(enrollment.course_offering.course.credits for enrollment in enrolled_courses)
-            gpa = total_points / total_credits if total_credits > 0 else 0
-        else:
-            gpa = 0
+        # Attendance percentage from the per-term totals
+        attendance_percentage = overall_stats(student).rate
+
+        # Cumulative GPA from the materialized semester summaries
+        gpa = current_gpa(student)
 
         context.update({
             'student': student,
@@ -93,112 +96,152 @@ class StudentDashboardView(LoginRequiredMixin, TemplateView):
         })
         return context
 
-class StudentDetailView(LoginRequiredMixin, DetailView):
-    model = Student
-    template_name = 'students/student_detail.html'
-    context_object_name = 'student'
+class TimetableView(LoginRequiredMixin, TemplateView):
+    template_name = 'students/timetable.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        student = self.get_object()
-        current_semester = Semester.objects.filter(is_current=True).first()
+        student = get_object_or_404(Student, user=self.request.user)
+        semester_id = self.request.GET.get('semester')
+        semesters = Semester.objects.select_related('academic_year').order_by('-start_date')
+        if semester_id and semester_id.isdigit():
+            semester = get_object_or_404(semesters, pk=semester_id)
+        else:
+            semester = semesters.filter(is_current=True).first()
+        timetable = student_timetable(student, semester.pk) if semester else None
+        context.update({
+            'student': student,
+            'semester': semester,
+            'semesters': semesters,
+            'days': timetable.by_day() if timetable else [],
+        })
+        return context
 
-        # Get all enrolled courses
-        all_enrolled_courses = student.enrolled_courses.all().select_related('course', 'semester', 'teacher')
-        
-        # Get current enrollments and grades
-        current_grades = student.enrollment_set.filter(
-            course_offering__semester=current_semester,
+def student_detail_context(student):
+    """
+    Context of the student detail page. Its grade and attendance tables
+    are cached template fragments (core.fragments), so everything they
+    show is computed lazily and a cache hit runs none of these queries.
+    """
+    @once
+    def current_semester():
+        return Semester.objects.filter(is_current=True).first()
+
+    # Get all enrolled courses
+    all_enrolled_courses = student.enrolled_courses.all().select_related('course', 'semester', 'teacher')
+
+    # Get current enrollments and grades
+    @once
+    def current_grades():
+        return list(student.enrollment_set.filter(
+            course_offering__semester=current_semester(),
             withdrawn=False
-        ).select_related('course_offering__course')
-
-        # Calculate attendance statistics
-        attendance_stats = student.studentattendance_set.filter(
-            date__gte=timezone.now() - timezone.timedelta(days=90)  # Last 90 days
-        ).aggregate(
-            present_count=Count('id', filter=Q(is_present=True)),
-            absent_count=Count('id', filter=Q(is_present=False))
-        )
-        
-        # Get attendance logs
-        attendance_logs = student.studentattendance_set.all().order_by('-date')[:30]  # Last 30 records
-        
-        # Calculate attendance rate per course
-        attendance_summary = []
-        for enrollment in current_grades:
-            course_attendance = student.studentattendance_set.filter(
-                course_offering=enrollment.course_offering
-            ).aggregate(
-                total=Count('id'),
-                present=Count('id', filter=Q(is_present=True))
-            )
-            
-            if course_attendance['total'] > 0:
-                rate = (course_attendance['present'] / course_attendance['total']) * 100
-            else:
-                rate = 0
-                
-            attendance_summary.append({
+        ).select_related('course_offering__course'))
+
+    # Attendance for the last 90 days and the current term, from one bitmap query
+    today = timezone.now().date()
+
+    @once
+    def attendance():
+        window_start = today - timezone.timedelta(days=90)
+        if current_semester():
+            window_start = min(window_start, current_semester().start_date)
+        return AttendanceHistory(student, start=window_start)
+
+    # Per-course rates from the teachers' roll calls, one grouped query
+    def attendance_summary():
+        course_rates = course_attendance_rates(student, [e.course_offering_id for e in current_grades()])
+        return [
+            {
                 'course': enrollment.course_offering.course,
-                'rate': rate
-            })
-        
-        # Prepare attendance chart data
-        attendance_chart_data = [
-            attendance_stats.get('present_count', 0),
-            attendance_stats.get('absent_count', 0),
+                'rate': round(course_rates[enrollment.course_offering_id].rate, 1),
+            }
+            for enrollment in current_grades()
+        ]
+
+    # Prepare attendance chart data
+    def attendance_chart_data():
+        recent = attendance().stats(start=today - timezone.timedelta(days=90))
+        return [
+            recent.present,
+            recent.absent,
             0  # We don't have 'late' status in current model
         ]
-        
-        # Get grade history
-        grade_history = student.enrollment_set.filter(
-            withdrawn=False,
-            grade__isnull=False
-        ).exclude(
-            grade__in=['W', 'I']
-        ).order_by(
-            'course_offering__semester__start_date'
-        ).select_related(
-            'course_offering__course',
-            'course_offering__semester'
+
+    # All enrollments, with their grades
+    enrollments = student.enrollment_set.select_related(
+        'course_offering__course', 'course_offering__teacher__user'
+    )
+
+    # Get grade history
+    grade_history = student.enrollment_set.filter(
+        withdrawn=False,
+        grade__isnull=False
+    ).exclude(
+        grade__in=['W', 'I']
+    ).order_by(
+        'course_offering__semester__start_date'
+    ).select_related(
+        'course_offering__course',
+        'course_offering__semester'
+    )
+
+    # Prepare grade history chart data from the materialized semester summaries
+    semesters = Semester.objects.all().order_by('-start_date')
+
+    @once
+    def summaries():
+        return list(
+            student.semester_summaries.select_related('semester__academic_year').order_by('-semester__start_date')
         )
-        
-        # Prepare grade history chart data
-        semesters = Semester.objects.all().order_by('-start_date')
-        grade_history_data = []
-        grade_history_labels = []
-        
-        grade_points = {'A': 4.0, 'B': 3.0, 'C': 2.0, 'D': 1.0, 'F': 0.0}
-        
-        for semester in semesters:
-            semester_enrollments = grade_history.filter(course_offering__semester=semester)
-            if semester_enrollments.exists():
-                semester_points = sum(
-                    grade_points.get(enrollment.grade, 0) * enrollment.course_offering.course.credits 
-                    for enrollment in semester_enrollments
-                )
-                semester_credits = sum(
-                    enrollment.course_offering.course.credits 
-                    for enrollment in semester_enrollments
-                )
-                semester_gpa = semester_points / semester_credits if semester_credits > 0 else 0
-                
-                grade_history_labels.append(str(semester))
-                grade_history_data.append(round(semester_gpa, 2))
-        
-        context.update({
-            'current_grades': current_grades,
-            'grade_history': grade_history,
-            'semesters': semesters,
-            'attendance_summary': attendance_summary,
-            'attendance_logs': attendance_logs,
-            'attendance_stats': attendance_chart_data,
-            'grade_history_labels': grade_history_labels,
-            'grade_history_data': grade_history_data,
-            'all_enrolled_courses': all_enrolled_courses,
-        })
+
+    return {
+        'current_grades': SimpleLazyObject(current_grades),
+        'enrollments': enrollments,
+        'grade_history': grade_history,
+        'semesters': semesters,
+        'attendance_summary': SimpleLazyObject(attendance_summary),
+        'attendance_logs': SimpleLazyObject(lambda: attendance().records(limit=30)),
+        'attendance_stats': SimpleLazyObject(attendance_chart_data),
+        'grade_history_labels': SimpleLazyObject(lambda: [str(summary.semester) for summary in summaries()]),
+        'grade_history_data': SimpleLazyObject(lambda: [summary.term_gpa for summary in summaries()]),
+        'gpa': SimpleLazyObject(lambda: summaries()[0].cumulative_gpa if summaries() else 0),
+        'all_enrolled_courses': all_enrolled_courses,
+    }
+
+
+# The {% cachefragment %} names in students/student_detail.html
+STUDENT_DETAIL_FRAGMENTS = ['student-summary', 'student-grades', 'student-history', 'student-charts']
+
+
+class StudentDetailView(LoginRequiredMixin, DetailView):
+    model = Student
+    template_name = 'students/student_detail.html'
+    context_object_name = 'student'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(student_detail_context(self.object))
         return context
 
+
+class AsyncStudentDetailView(View):
+    """
+    StudentDetailView for the ASGI profile: unless the page's fragments are
+    cached, its independent queries run concurrently (core.concurrency).
+    """
+
+    async def get(self, request, pk):
+        # Loaded already by login_required; the templates would load it again
+        request.user = await request.auser()
+        student = await aget_object_or_404(Student, pk=pk)
+        context = student_detail_context(student)
+        if not await sync_to_async(fragments.is_cached)(STUDENT_DETAIL_FRAGMENTS, [student]):
+            await concurrency.evaluate(*context.values())
+        return TemplateResponse(request, 'students/student_detail.html', {
+            'object': student, 'student': student, 'view': self, **context,
+        })
+
 class StudentGradeDetailView(LoginRequiredMixin, DetailView):
     model = Enrollment
     template_name = 'students/grade_detail.html'
@@ -215,13 +258,17 @@ class CourseRegistrationView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         student = get_object_or_404(Student, user=self.request.user)
-        current_semester = Semester.objects.filter(is_current=True).first()
+        current_semester = Semester.objects.select_related('academic_year').filter(is_current=True).first()
         
-        # Get available course offerings
+        # Get available course offerings with capacity and registration
+        # status annotated in the same query
         course_offerings = CourseOffering.objects.filter(
             semester=current_semester,
             is_active=True
-        )
+        ).select_related(
+            'course',
+            'teacher__user'
+        ).with_capacity(student=student)
 
         # Apply filters
         search = self.request.GET.get('search')
@@ -229,10 +276,7 @@ class CourseRegistrationView(LoginRequiredMixin, TemplateView):
         credits = self.request.GET.get('credits')
 
         if search:
-            course_offerings = course_offerings.filter(
-                Q(course__code__icontains=search) |
-                Q(course__name__icontains=search)
-            )
+            course_offerings = course_offerings.filter(course_id__in=search_ids('course', search))
         
         if department:
             course_offerings = course_offerings.filter(course__department_id=department)
@@ -240,22 +284,16 @@ class CourseRegistrationView(LoginRequiredMixin, TemplateView):
         if credits:
             course_offerings = course_offerings.filter(course__credits=credits)
 
-        # Add registration status and available slots
-        for offering in course_offerings:
-            offering.is_registered = Enrollment.objects.filter(
-                student=student,
-                course_offering=offering,
-                withdrawn=False
-            ).exists()
-            
-            # Use the model methods to get capacity information
-            offering.available_slots = offering.get_available_slots()
-            offering.is_full = offering.is_full()
-            offering.increased_max = offering.get_effective_capacity()
+        # Prerequisites come from the cached graph instead of a prefetch
+        eligibility = Eligibility(student)
+        eligible = self.request.GET.get('eligible')
+        if eligible:
+            course_offerings = eligibility.filter(course_offerings)
 
         context.update({
             'current_semester': current_semester,
-            'course_offerings': course_offerings,
+            'course_offerings': eligibility.annotate(course_offerings),
+            'eligible': eligible,
             'departments': Department.objects.all()
         })
         return context
@@ -265,48 +303,29 @@ class CourseRegistrationView(LoginRequiredMixin, TemplateView):
 @csrf_protect
 def register_course(request, offering_id):
     """
-    View function to register a student for a course offering
+    View function to register a student for a course offering, or to put
+    them on its waitlist when it is full
     """
     if request.method == 'POST':
         student = get_object_or_404(Student, user=request.user)
-        course_offering = get_object_or_404(CourseOffering, id=offering_id)
-        
-        # Check if already registered (active enrollment)
-        if Enrollment.objects.filter(student=student, course_offering=course_offering, withdrawn=False).exists():
-            messages.warning(request, f"You are already registered for {course_offering.course.code}.")
-            return HttpResponseRedirect(reverse('students:course_registration'))
-        
-        # Check if a withdrawn enrollment exists and reactivate it instead of creating a new one
-        existing_enrollment = Enrollment.objects.filter(
-            student=student, 
-            course_offering=course_offering, 
-            withdrawn=True
-        ).first()
-        
-        if existing_enrollment:
-            # Reactivate the enrollment
-            existing_enrollment.withdrawn = False
-            existing_enrollment.withdrawal_date = None
-            existing_enrollment.enrollment_date = timezone.now().date()
-            existing_enrollment.save()
-            messages.success(request, f"Successfully re-registered for {course_offering.course.code}.")
-            return HttpResponseRedirect(reverse('students:course_registration'))
-        
-        # Check if course is full using the model method
-        if course_offering.is_full():
-            messages.error(request, f"Course {course_offering.course.code} is full.")
-            return HttpResponseRedirect(reverse('students:course_registration'))
-        
+
         try:
-            # Create enrollment
-            Enrollment.objects.create(
-                student=student,
-                course_offering=course_offering
-            )
-            messages.success(request, f"Successfully registered for {course_offering.course.code}.")
-        except Exception as e:
-            # Handle any database errors, including IntegrityError
-            messages.error(request, f"Error registering for course: {str(e)}")
+            enrollment, entry = register_or_waitlist(student, offering_id)
+        except CourseOffering.DoesNotExist:
+            raise Http404("No course offering matches the given query.")
+        except (AlreadyRegisteredError, AlreadyWaitlistedError) as e:
+            messages.warning(request, str(e))
+        except EnrollmentError as e:
+            messages.error(request, str(e))
+        else:
+            if entry is not None:
+                messages.info(
+                    request,
+                    f"{entry.course_offering.course.code} is full. You are number {entry.get_position()} "
+                    "on the waitlist and will be registered automatically when a seat opens."
+                )
+            else:
+                messages.success(request, f"Successfully registered for {enrollment.course_offering.course.code}.")
         
     return HttpResponseRedirect(reverse('students:course_registration'))
 
@@ -319,28 +338,87 @@ def drop_course(request, offering_id):
     """
     if request.method == 'POST':
         student = get_object_or_404(Student, user=request.user)
-        course_offering = get_object_or_404(CourseOffering, id=offering_id)
-        
-        # Find the enrollment
+
         try:
-            enrollment = Enrollment.objects.get(
-                student=student,
-                course_offering=course_offering,
-                withdrawn=False
-            )
-            
-            # Mark as withdrawn
-            enrollment.withdrawn = True
-            enrollment.withdrawal_date = timezone.now().date()
-            enrollment.save()
-            
-            messages.success(request, f"Successfully dropped {course_offering.course.code}.")
-        except Enrollment.DoesNotExist:
-            messages.warning(request, f"You are not registered for {course_offering.course.code}.")
+            enrollment = drop_student(student, offering_id)
+        except CourseOffering.DoesNotExist:
+            raise Http404("No course offering matches the given query.")
+        except EnrollmentError as e:
+            messages.warning(request, str(e))
+        else:
+            messages.success(request, f"Successfully dropped {enrollment.course_offering.course.code}.")
     
     return HttpResponseRedirect(reverse('students:course_registration'))
 
 
+@login_required
+@csrf_protect
+def checkout_courses(request):
+    """
+    Register for a cart of course offerings at once: all of them or none.
+    Takes ``offering`` form values, or a JSON body ``{"offerings": [...]}``
+    to which the per-offering results are returned as JSON.
+    """
+    if request.method != 'POST':
+        return HttpResponseRedirect(reverse('students:course_registration'))
+    student = get_object_or_404(Student, user=request.user)
+
+    is_json = request.content_type == 'application/json'
+    try:
+        if is_json:
+            offering_ids = [int(pk) for pk in json.loads(request.body)['offerings']]
+        else:
+            offering_ids = [int(pk) for pk in request.POST.getlist('offering')]
+    except (ValueError, TypeError, KeyError):
+        return HttpResponseBadRequest("Expected a list of course offering ids.")
+    if not offering_ids:
+        if is_json:
+            return HttpResponseBadRequest("Expected a list of course offering ids.")
+        messages.warning(request, "Select the courses to register for first.")
+        return HttpResponseRedirect(reverse('students:course_registration'))
+
+    ok, results = register_many(student, offering_ids)
+
+    if is_json:
+        return JsonResponse({
+            'ok': ok,
+            'results': [
+                {'offering': r.offering_id, 'course': r.code, 'status': r.status, 'message': r.message}
+                for r in results
+            ],
+        }, status=200 if ok else 409)
+
+    if ok:
+        messages.success(request, f"Successfully registered for {', '.join(r.code for r in results)}.")
+    else:
+        messages.error(request, "No courses were registered:")
+        for result in results:
+            if result.status != 'not-registered':
+                messages.error(request, result.message)
+    return HttpResponseRedirect(reverse('students:course_registration'))
+
+
+@login_required
+@csrf_protect
+def leave_course_waitlist(request, offering_id):
+    """
+    View function to leave the waitlist of a course offering
+    """
+    if request.method == 'POST':
+        student = get_object_or_404(Student, user=request.user)
+
+        try:
+            leave_waitlist(student, offering_id)
+        except CourseOffering.DoesNotExist:
+            raise Http404("No course offering matches the given query.")
+        except EnrollmentError as e:
+            messages.warning(request, str(e))
+        else:
+            messages.success(request, "You have left the waitlist.")
+
+    return HttpResponseRedirect(reverse('students:course_registration'))
+
+
 class StudentRegistrationForm(forms.Form):
     username = forms.CharField(max_length=150, required=True)
     password = forms.CharField(widget=forms.PasswordInput(), required=True)
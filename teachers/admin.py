@@ -1,8 +1,11 @@
 from django.contrib import admin
+from core.admin import CSVImportMixin
+from core.imports import TeacherImporter
 from .models import Teacher, TeacherAttendance
 
 @admin.register(Teacher)
-class TeacherAdmin(admin.ModelAdmin):
+class TeacherAdmin(CSVImportMixin, admin.ModelAdmin):
+    importer_class = TeacherImporter
     list_display = ('teacher_id', 'get_full_name', 'department', 'qualification', 'is_active')
     list_filter = ('department', 'is_active')
     search_fields = ('teacher_id', 'user__first_name', 'user__last_name')
@@ -0,0 +1,137 @@
+"""
+Bulk grade entry for a course offering.
+
+Grades are validated as a whole set, letter grades are derived from the
+scores in one vectorized pass, and only rows that actually changed are
+written, through a single bulk_update inside one transaction.
+"""
+import csv
+import io
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from core import fragments
+from courses.models import CourseOffering, Enrollment
+from students.models import Student
+from students.transcripts import refresh_summaries
+
+GRADE_FIELDS = ['grade', 'assignment_score', 'midterm_score', 'final_score']
+SCORE_FIELDS = ['assignment_score', 'midterm_score', 'final_score']
+
+# Total score (assignment 30 + midterm 30 + final 40) lower bounds for D, C, B, A
+GRADE_THRESHOLDS = np.array([60, 70, 80, 90])
+LETTERS = np.array(['F', 'D', 'C', 'B', 'A'])
+
+# Manually assigned grades that are never replaced by computed ones
+MANUAL_GRADES = {'W', 'I'}
+
+CSV_COLUMNS = {
+    'student_id': None,
+    'assignment': 'assignment_score',
+    'midterm': 'midterm_score',
+    'final': 'final_score',
+    'grade': 'grade',
+}
+
+
+class GradeImportError(Exception):
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} invalid rows")
+        self.errors = errors
+
+
+def grade_values(enrollment):
+    return tuple(getattr(enrollment, field) for field in GRADE_FIELDS)
+
+
+def letter_grades(scores):
+    """
+    Letter grades for an (n, 3) array of assignment, midterm and final
+    scores. Rows with a missing score (NaN) get None.
+    """
+    scores = np.asarray(scores, dtype=float).reshape(-1, len(SCORE_FIELDS))
+    complete = ~np.isnan(scores).any(axis=1)
+    letters = LETTERS[np.digitize(np.nan_to_num(scores).sum(axis=1), GRADE_THRESHOLDS)]
+    return np.where(complete, letters, None).tolist()
+
+
+def assign_letter_grades(enrollments, overwrite=False):
+    """
+    Set letter grades computed from scores. Blank grades are always filled
+    in; with ``overwrite`` existing letter grades are recomputed as well.
+    Withdrawn and incomplete grades are left alone.
+    """
+    scores = [
+        [np.nan if getattr(e, field) is None else getattr(e, field) for field in SCORE_FIELDS]
+        for e in enrollments
+    ]
+    for enrollment, letter in zip(enrollments, letter_grades(scores)):
+        if letter is None or enrollment.grade in MANUAL_GRADES:
+            continue
+        if overwrite or not enrollment.grade:
+            enrollment.grade = letter
+
+
+@transaction.atomic
+def save_grades(enrollments, originals, batch_size=500):
+    """
+    Write the enrollments whose grade fields differ from ``originals``
+    (a mapping of pk to grade_values()) and return them.
+    """
+    changed = [e for e in enrollments if grade_values(e) != originals[e.pk]]
+    if changed:
+        now = timezone.now()
+        for enrollment in changed:
+            enrollment.updated_at = now  # bulk_update skips auto_now
+        Enrollment.objects.bulk_update(changed, GRADE_FIELDS + ['updated_at'], batch_size=batch_size)
+        # bulk_update bypasses the Enrollment signals
+        refresh_summaries({e.student_id for e in changed})
+        fragments.bump(Student, *{e.student_id for e in changed})
+        fragments.bump(CourseOffering, *{e.course_offering_id for e in changed})
+    return changed
+
+
+def apply_csv(csv_file, enrollments, form_class):
+    """
+    Validate an uploaded ``student_id,assignment,midterm,final,grade`` CSV
+    against the roster and apply it to the enrollment instances in memory.
+
+    The file is read row by row and each row is validated with
+    ``form_class``, which applies it to the instance. GradeImportError lists
+    every invalid row, or reports a file that is not UTF-8; callers must
+    then discard the instances unsaved.
+    """
+    roster = {e.student.student_id: e for e in enrollments}
+    reader = csv.DictReader(io.TextIOWrapper(csv_file, encoding='utf-8-sig', newline=''))
+    try:
+        missing = set(CSV_COLUMNS) - set(reader.fieldnames or [])
+        if missing:
+            raise GradeImportError([f"Missing columns: {', '.join(sorted(missing))}"])
+
+        errors = []
+        seen = set()
+        for row in reader:
+            line = reader.line_num
+            student_id = (row['student_id'] or '').strip()
+            enrollment = roster.get(student_id)
+            if enrollment is None:
+                errors.append(f"Line {line}: {student_id or 'blank student ID'} is not enrolled in this course")
+                continue
+            if student_id in seen:
+                errors.append(f"Line {line}: duplicate row for {student_id}")
+                continue
+            seen.add(student_id)
+
+            data = {field: (row[column] or '').strip() for column, field in CSV_COLUMNS.items() if field}
+            form = form_class(data=data, instance=enrollment)
+            if not form.is_valid():
+                for field, messages in form.errors.items():
+                    errors.append(f"Line {line}: {field}: {' '.join(messages)}")
+    except UnicodeDecodeError:
+        # Excel's plain "CSV" is in the Windows code page
+        raise GradeImportError(['The file is not UTF-8 text. Save it as "CSV UTF-8" and upload it again.'])
+
+    if errors:
+        raise GradeImportError(errors)
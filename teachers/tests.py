@@ -1,3 +1,250 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from django.urls import reverse
+
+from core.models import AcademicYear, Department, Semester
+from courses.attendance import course_attendance_rates
+from courses.models import AttendanceSession, Course, CourseAttendance, CourseOffering, Enrollment
+from students.models import Student
+from teachers.grading import letter_grades
+from teachers.models import Teacher
+
+
+class LetterGradeTests(TestCase):
+    def test_vectorized_letter_grades(self):
+        scores = [
+            [30, 30, 40],
+            [25, 25, 30],
+            [20, 20, 19.5],
+            [10, float('nan'), 40],
+        ]
+        self.assertEqual(letter_grades(scores), ['A', 'B', 'F', None])
+
+
+class TeacherTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Physics', code='PHY')
+        year = AcademicYear.objects.create(
+            year='2025-2026', start_date=date(2025, 9, 1), end_date=date(2026, 8, 31)
+        )
+        semester = Semester.objects.create(
+            academic_year=year, name='FALL', is_current=True,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31)
+        )
+        cls.teacher_user = User.objects.create_user('teacher')
+        teacher = Teacher.objects.create(
+            user=cls.teacher_user, teacher_id='TCH001', department=department,
+            date_of_birth=date(1980, 1, 1), address='Campus', phone='000',
+            qualification='Ph.D.', joining_date=date(2015, 1, 1)
+        )
+        course = Course.objects.create(
+            code='PHY101', name='Mechanics', department=department, credits=4, description='Mechanics'
+        )
+        cls.offering = CourseOffering.objects.create(
+            course=course, semester=semester, teacher=teacher, max_students=300
+        )
+        cls.enrollments = [
+            Enrollment.objects.create(
+                student=Student.objects.create(
+                    user=User.objects.create_user(f'student{i}'), student_id=f'STU{i:06d}',
+                    date_of_birth=date(2005, 1, 1), address='Dorm', phone='000'
+                ),
+                course_offering=cls.offering
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.teacher_user)
+
+
+class TeacherDetailViewTests(TeacherTestCase):
+    def test_teaching_history_query_count_is_constant(self):
+        url = reverse('teachers:teacher_detail', args=[self.offering.teacher.pk])
+        with self.assertNumQueries(7):
+            response = self.client.get(url)
+        history, = response.context['teaching_history']
+        self.assertEqual(history['total_students'], 3)
+
+        for code in ['PHY102', 'PHY103']:
+            CourseOffering.objects.create(
+                course=Course.objects.create(
+                    code=code, name=code, department=self.offering.course.department,
+                    credits=3, description=code
+                ),
+                semester=self.offering.semester, teacher=self.offering.teacher, max_students=30
+            )
+        with self.assertNumQueries(7):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['teaching_history']), 3)
+
+
+class TeacherListViewTests(TeacherTestCase):
+    def test_list_is_paginated_with_annotated_course_counts(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('teachers:teacher_list'), {'page_size': 1})
+        teacher, = response.context['teachers']
+        self.assertEqual(teacher.course_count, 1)
+        self.assertFalse(response.context['page_obj'].has_next)
+        self.assertContains(response, 'Mechanics')
+
+
+class ManageGradesTests(TeacherTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('teachers:manage_grades', args=[self.offering.pk])
+
+    def upload(self, content, encoding='utf-8', **data):
+        csv_file = SimpleUploadedFile('grades.csv', content.encode(encoding), content_type='text/csv')
+        return self.client.post(self.url, {'csv_file': csv_file, **data})
+
+    def test_csv_import_updates_changed_rows_in_bulk(self):
+        response = self.upload(
+            "student_id,assignment,midterm,final,grade\n"
+            "STU000000,28,27,38,\n"
+            "STU000001,20,20,25,\n"
+            "STU000002,,,,I\n"
+        )
+        self.assertRedirects(response, self.url)
+
+        grades = dict(Enrollment.objects.values_list('student__student_id', 'grade'))
+        self.assertEqual(grades, {'STU000000': 'A', 'STU000001': 'D', 'STU000002': 'I'})
+        # Transcript summaries are refreshed although bulk_update skips signals
+        self.assertEqual(self.enrollments[0].student.semester_summaries.get().term_gpa, 4.0)
+
+    def test_csv_import_rejects_whole_file_on_errors(self):
+        response = self.upload(
+            "student_id,assignment,midterm,final,grade\n"
+            "STU000000,28,27,38,A\n"
+            "STU999999,10,10,10,F\n"
+            "STU000001,abc,20,25,\n"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['import_errors']), 2)
+        self.assertFalse(Enrollment.objects.exclude(grade=None).exists())
+
+    def test_csv_import_reports_non_utf8_file(self):
+        # As saved by Excel's plain "CSV" format on Windows
+        response = self.upload(
+            "student_id,assignment,midterm,final,grade\n"
+            "STU000000,28,27,38,A\n"
+            "STU000001,20,20,25,\u2013\n",
+            encoding='cp1252'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['import_errors']), 1)
+        self.assertIn('UTF-8', response.context['import_errors'][0])
+        self.assertFalse(Enrollment.objects.exclude(grade=None).exists())
+
+    def formset_data(self):
+        data = {
+            'form-TOTAL_FORMS': '3',
+            'form-INITIAL_FORMS': '3',
+            'form-MIN_NUM_FORMS': '0',
+            'form-MAX_NUM_FORMS': '1000',
+        }
+        for i, enrollment in enumerate(self.enrollments):
+            data.update({
+                f'form-{i}-id': enrollment.pk,
+                f'form-{i}-grade': '',
+                f'form-{i}-assignment_score': '',
+                f'form-{i}-midterm_score': '',
+                f'form-{i}-final_score': '',
+            })
+        return data
+
+    def test_formset_writes_only_changed_rows(self):
+        data = self.formset_data()
+        data.update({
+            'form-1-assignment_score': '30',
+            'form-1-midterm_score': '25',
+            'form-1-final_score': '30',
+        })
+        response = self.client.post(self.url, data)
+        self.assertRedirects(response, self.url)
+
+        self.assertEqual(Enrollment.objects.get(pk=self.enrollments[1].pk).grade, 'B')
+        self.assertEqual(Enrollment.objects.exclude(grade=None).count(), 1)
+
+    def test_formset_ignores_added_forms(self):
+        data = self.formset_data()
+        data.update({'form-TOTAL_FORMS': '4', 'form-3-grade': 'A', 'form-3-final_score': '40'})
+        response = self.client.post(self.url, data)
+        self.assertRedirects(response, self.url)
+        self.assertEqual(Enrollment.objects.count(), 3)
+        self.assertFalse(Enrollment.objects.exclude(grade=None).exists())
+
+
+class RollCallTests(TeacherTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('teachers:roll_call', args=[self.offering.pk])
+        self.students = [e.student for e in self.enrollments]
+
+    def take(self, day, present, **notes):
+        data = {'date': day, 'present': [s.pk for s in present]}
+        data.update({f'note-{self.students[int(i)].pk}': note for i, note in notes.items()})
+        return self.client.post(self.url, data)
+
+    def test_roll_call_marks_whole_section_in_one_insert(self):
+        with self.assertNumQueries(11):
+            response = self.take('2025-09-08', self.students[:2])
+        self.assertRedirects(response, f'{self.url}?date=2025-09-08')
+        marks = dict(CourseAttendance.objects.values_list('student__student_id', 'is_present'))
+        self.assertEqual(marks, {'STU000000': True, 'STU000001': True, 'STU000002': False})
+        self.assertEqual(AttendanceSession.objects.get().taken_by, self.offering.teacher)
+
+    def test_second_roll_call_for_a_day_replaces_the_marks(self):
+        self.take('2025-09-08', self.students[:2])
+        self.take('2025-09-08', self.students[2:], **{'0': 'Sick'})
+        self.assertEqual(AttendanceSession.objects.count(), 1)
+        marks = {
+            r.student.student_id: (r.is_present, r.note)
+            for r in CourseAttendance.objects.select_related('student')
+        }
+        self.assertEqual(marks, {
+            'STU000000': (False, 'Sick'), 'STU000001': (False, ''), 'STU000002': (True, ''),
+        })
+
+    def test_roster_is_prefilled_from_earlier_roll_call(self):
+        self.take('2025-09-08', self.students[1:])
+        response = self.client.get(self.url, {'date': '2025-09-08'})
+        self.assertEqual([row['present'] for row in response.context['roster']], [False, True, True])
+
+    def test_date_outside_semester_is_rejected(self):
+        response = self.take('2026-02-02', self.students)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('date', response.context['form'].errors)
+        self.assertFalse(AttendanceSession.objects.exists())
+
+    def test_other_users_are_redirected(self):
+        self.client.force_login(self.enrollments[0].student.user)
+        response = self.take('2025-09-08', self.students)
+        self.assertRedirects(response, reverse('teachers:teacher_detail', args=[self.offering.teacher.pk]))
+        self.assertFalse(AttendanceSession.objects.exists())
+
+    def test_per_course_rates_come_from_one_grouped_query(self):
+        for day in ['2025-09-08', '2025-09-09', '2025-09-10', '2025-09-11']:
+            self.take(day, self.students[:1] if day == '2025-09-11' else self.students)
+        other = CourseOffering.objects.create(
+            course=Course.objects.create(
+                code='PHY102', name='Optics', department=self.offering.course.department,
+                credits=3, description='Optics'
+            ),
+            semester=self.offering.semester, teacher=self.offering.teacher, max_students=30
+        )
+        with self.assertNumQueries(1):
+            rates = course_attendance_rates(self.students[1], [self.offering.pk, other.pk])
+        self.assertEqual(rates[self.offering.pk].rate, 75)
+        self.assertEqual(rates[other.pk].recorded, 0)
 
-# Create your tests here.
+    def test_student_detail_shows_per_course_rates(self):
+        self.take('2025-09-08', self.students[:1])
+        self.take('2025-09-09', self.students)
+        response = self.client.get(reverse('students:student_detail', args=[self.students[1].pk]))
+        summary, = response.context['attendance_summary']
+        self.assertEqual((summary['course'].code, summary['rate']), ('PHY101', 50.0))
@@ -7,4 +7,5 @@ urlpatterns = [
     path('', views.TeacherListView.as_view(), name='teacher_list'),
     path('<int:pk>/', views.TeacherDetailView.as_view(), name='teacher_detail'),
     path('manage-grades/<int:offering_id>/', views.manage_grades, name='manage_grades'),
+    path('roll-call/<int:offering_id>/', views.roll_call, name='roll_call'),
 ]
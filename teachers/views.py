@@ -1,60 +1,73 @@
 from django.views.generic import ListView, DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce
+from core.pagination import KeysetPaginationMixin
+from core.search import SearchMixin
 from .models import Teacher
+from .grading import GradeImportError, apply_csv, assign_letter_grades, grade_values, save_grades
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth.decorators import login_required
-from courses.models import CourseOffering, Enrollment
+from courses.analytics import offering_grade_stats
+from courses.attendance import record_roll_call
+from courses.models import CourseAttendance, CourseOffering, Enrollment
 from django.contrib import messages
 from django.urls import reverse
 from django import forms
-from django.db import models
+from django.utils import timezone
 
-class TeacherListView(LoginRequiredMixin, ListView):
+class TeacherListView(LoginRequiredMixin, SearchMixin, KeysetPaginationMixin, ListView):
     model = Teacher
     template_name = 'teachers/teacher_list.html'
     context_object_name = 'teachers'
+    keyset_field = 'teacher_id'
+    search_kind = 'teacher'
     
     def get_queryset(self):
-        queryset = super().get_queryset()
-        search_term = self.request.GET.get('search')
-        if search_term:
-            queryset = queryset.filter(
-                Q(teacher_id__icontains=search_term) |
-                Q(user__first_name__icontains=search_term) |
-                Q(user__last_name__icontains=search_term)
-            )
-        return queryset
+        offerings = CourseOffering.objects.filter(
+            teacher=OuterRef('pk')
+        ).order_by().values('teacher').annotate(total=Count('pk')).values('total')
+        queryset = super().get_queryset().select_related('user', 'department').annotate(
+            course_count=Coalesce(Subquery(offerings, output_field=IntegerField()), Value(0))
+        ).prefetch_related(
+            Prefetch('teaching_courses', queryset=CourseOffering.objects.select_related('course'))
+        )
+        return self.filter_search(queryset)
 
 class TeacherDetailView(LoginRequiredMixin, DetailView):
     model = Teacher
     template_name = 'teachers/teacher_detail.html'
     context_object_name = 'teacher'
 
+    def get_queryset(self):
+        return super().get_queryset().select_related('user', 'department')
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        teacher = self.get_object()
+        teacher = self.object
         from core.models import Semester
         current_semester = Semester.objects.filter(is_current=True).first()
         if current_semester:
             courses = teacher.teaching_courses.filter(semester=current_semester)
         else:
             courses = teacher.teaching_courses.all()
-        context['courses'] = courses.select_related('course', 'semester')
-        # Teaching history: group by semester and course, count students, average grade
-        from courses.models import Enrollment
-        teaching_history = []
-        for offering in teacher.teaching_courses.select_related('course', 'semester').all():
-            enrollments = Enrollment.objects.filter(course_offering=offering, withdrawn=False)
-            total_students = enrollments.count()
-            avg_grade = enrollments.exclude(grade__in=['W', 'I']).aggregate(avg=models.Avg('grade'))['avg']
-            teaching_history.append({
+        context['courses'] = courses.select_related('course', 'semester__academic_year')
+        # Teaching history: per-offering student counts and grade statistics,
+        # computed for all offerings at once
+        offerings = list(
+            teacher.teaching_courses.select_related('course', 'semester__academic_year')
+            .order_by('-semester__start_date', 'course__code')
+        )
+        stats = offering_grade_stats(offering.pk for offering in offerings)
+        context['teaching_history'] = [
+            {
                 'term': str(offering.semester),
                 'course': offering.course,
-                'total_students': total_students,
-                'average_grade': avg_grade or 0,
-            })
-        context['teaching_history'] = teaching_history
+                'total_students': stats[offering.pk].total_students,
+                'stats': stats[offering.pk],
+            }
+            for offering in offerings
+        ]
         return context
 
 class GradeForm(forms.ModelForm):
@@ -62,27 +75,135 @@ class GradeForm(forms.ModelForm):
         model = Enrollment
         fields = ['grade', 'assignment_score', 'midterm_score', 'final_score']
 
+
+class GradeImportForm(forms.Form):
+    csv_file = forms.FileField(
+        label="Grades CSV",
+        help_text="Columns: student_id,assignment,midterm,final,grade"
+    )
+    recompute_letters = forms.BooleanField(required=False)
+
+
+def _forbidden_redirect(teacher):
+    if teacher is None:
+        return redirect('courses:course_list')
+    return redirect('teachers:teacher_detail', pk=teacher.pk)
+
+
 @login_required
 def manage_grades(request, offering_id):
-    offering = get_object_or_404(CourseOffering, id=offering_id)
+    offering = get_object_or_404(CourseOffering.objects.select_related('course', 'semester'), id=offering_id)
     teacher = offering.teacher
     if not (request.user.is_staff or (teacher and teacher.user == request.user)):
         messages.error(request, "You do not have permission to manage grades for this course.")
-        return redirect('teachers:teacher_detail', pk=teacher.pk)
+        return _forbidden_redirect(teacher)
 
     enrollments = Enrollment.objects.filter(course_offering=offering, withdrawn=False).select_related('student__user')
-    GradeFormSet = forms.modelformset_factory(Enrollment, form=GradeForm, extra=0)
+    GradeFormSet = forms.modelformset_factory(Enrollment, form=GradeForm, extra=0, edit_only=True)
+    formset = GradeFormSet(queryset=enrollments)
+    import_form = GradeImportForm()
+    import_errors = []
 
     if request.method == 'POST':
-        formset = GradeFormSet(request.POST, queryset=enrollments)
-        if formset.is_valid():
-            formset.save()
-            messages.success(request, "Grades updated successfully.")
-            return redirect(reverse('teachers:manage_grades', args=[offering_id]))
-    else:
-        formset = GradeFormSet(queryset=enrollments)
+        recompute = bool(request.POST.get('recompute_letters'))
+        if 'csv_file' in request.FILES:
+            import_form = GradeImportForm(request.POST, request.FILES)
+            rows = list(enrollments)
+            originals = {e.pk: grade_values(e) for e in rows}
+            if import_form.is_valid():
+                try:
+                    apply_csv(import_form.cleaned_data['csv_file'], rows, GradeForm)
+                except GradeImportError as e:
+                    import_errors = e.errors
+                else:
+                    assign_letter_grades(rows, overwrite=recompute)
+                    changed = save_grades(rows, originals)
+                    messages.success(request, f"Imported grades: {len(changed)} enrollments updated.")
+                    return redirect(reverse('teachers:manage_grades', args=[offering_id]))
+        else:
+            formset = GradeFormSet(request.POST, queryset=enrollments)
+            originals = {e.pk: grade_values(e) for e in formset.get_queryset()}
+            if formset.is_valid():
+                # Forms added by raising form-TOTAL_FORMS have no enrollment behind them
+                rows = [form.instance for form in formset.forms if form.instance.pk is not None]
+                assign_letter_grades(rows, overwrite=recompute)
+                changed = save_grades(rows, originals)
+                messages.success(request, f"Grades updated successfully: {len(changed)} enrollments changed.")
+                return redirect(reverse('teachers:manage_grades', args=[offering_id]))
 
     return render(request, 'teachers/manage_grades.html', {
         'offering': offering,
         'formset': formset,
+        'import_form': import_form,
+        'import_errors': import_errors,
+    })
+
+
+class RollCallForm(forms.Form):
+    date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+
+
+@login_required
+def roll_call(request, offering_id):
+    offering = get_object_or_404(CourseOffering.objects.select_related('course', 'semester', 'teacher'), id=offering_id)
+    teacher = offering.teacher
+    is_teacher = teacher is not None and teacher.user_id == request.user.pk
+    if not (request.user.is_staff or is_teacher):
+        messages.error(request, "You do not have permission to take attendance for this course.")
+        return _forbidden_redirect(teacher)
+
+    enrollments = list(
+        Enrollment.objects.filter(course_offering=offering, withdrawn=False)
+        .select_related('student__user').order_by('student__student_id')
+    )
+    today = timezone.now().date()
+    if request.method == 'POST':
+        form = RollCallForm(request.POST)
+    elif 'date' in request.GET:
+        form = RollCallForm(request.GET)
+    else:
+        form = RollCallForm(initial={'date': today})
+
+    if request.method == 'POST' and form.is_valid():
+        day = form.cleaned_data['date']
+        if not offering.semester.start_date <= day <= offering.semester.end_date:
+            form.add_error('date', "The date is outside the offering's semester.")
+        else:
+            enrolled = {e.student_id for e in enrollments}
+            present_ids = {int(pk) for pk in request.POST.getlist('present') if pk.isdigit()} & enrolled
+            notes = {
+                e.student_id: request.POST.get(f'note-{e.student_id}', '').strip()[:500]
+                for e in enrollments
+            }
+            record_roll_call(
+                offering, day, present_ids, notes,
+                taken_by=teacher if is_teacher else None, student_ids=list(enrolled),
+            )
+            messages.success(
+                request, f"Attendance for {day} saved: {len(present_ids)} of {len(enrollments)} present."
+            )
+            return redirect(f"{reverse('teachers:roll_call', args=[offering_id])}?date={day.isoformat()}")
+
+    # Pre-fill the roster from an earlier roll call of the selected day
+    day = form.cleaned_data.get('date') if form.is_bound and form.is_valid() else today
+    marks = {
+        record.student_id: record
+        for record in CourseAttendance.objects.filter(session__course_offering=offering, session__date=day)
+    }
+    roster = [
+        {
+            'enrollment': e,
+            'present': marks[e.student_id].is_present if e.student_id in marks else True,
+            'note': marks[e.student_id].note if e.student_id in marks else '',
+        }
+        for e in enrollments
+    ]
+    sessions = offering.attendance_sessions.order_by('-date')[:10]
+
+    return render(request, 'teachers/roll_call.html', {
+        'offering': offering,
+        'form': form,
+        'day': day,
+        'roster': roster,
+        'sessions': sessions,
     })